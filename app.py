@@ -1,18 +1,44 @@
-from flask import Flask, request, jsonify, send_file
+from flask import Flask, request, jsonify, send_from_directory, g, has_request_context
 from flask_cors import CORS
 import jwt
 import datetime
 import os
-import hashlib
+import uuid
+import time
+import threading
 from functools import wraps
+from werkzeug.middleware.proxy_fix import ProxyFix
 from werkzeug.utils import secure_filename
 import pandas as pd
 import pyodbc
+import sqlite3
+from deferred import WriteBehindExecutor
+from token_cache import TokenCache
+from revocation import RevocationList
+from passwords import PasswordHasher, PoolBusy
+from ratelimit import RateLimiter, MemoryBucketStore, SQLiteBucketStore
+from loadshed import LoadShedder
+from metrics import Metrics, StatsListener, RequestStats
+from dbwrap import InstrumentedConnection
+from sqltrace import SqlTraceListener, RequestTrace, report_repeats
+from profiling import SampledProfiler
+from sampler import StackSampler
+import sqlite_backend
+import migrations
+from compression import ResponseCompressor
+from fastjson import FastJSONProvider
+from uploads import StreamingUploadRequest, spool_upload, sharded_path
+from blobstore import BlobStore
+from resumable import ResumableUploads, UploadSessionError
+from downloads import FileMetadataCache, send_stored_file, stream_zip, archive_names
+from tracing import Tracer, TraceListener, FileSpanExporter, OTLPHttpExporter, SPAN_KIND_SERVER
 
 app = Flask(__name__)
+app.request_class = StreamingUploadRequest
 CORS(app)
 
 SECRET_KEY = "hospital_secret_key_change_in_production"
+TOKEN_LIFETIME = datetime.timedelta(hours=8)
 UPLOAD_FOLDER = 'uploads'
 ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg', 'pdf', 'dcm', 'xlsx', 'xls', 'csv'}
 
@@ -23,6 +49,116 @@ os.makedirs(os.path.join(UPLOAD_FOLDER, 'patient_imports'), exist_ok=True)
 
 app.config['UPLOAD_FOLDER'] = UPLOAD_FOLDER
 app.config['MAX_CONTENT_LENGTH'] = 50 * 1024 * 1024  # 50MB max file size
+app.config['CHUNKED_UPLOAD_CHUNK_SIZE'] = 8 * 1024 * 1024  # bytes per PUT; must stay under MAX_CONTENT_LENGTH
+app.config['CHUNKED_UPLOAD_MAX_SIZE'] = 4 * 1024 * 1024 * 1024  # largest file a chunked upload may create
+app.config['CHUNKED_UPLOAD_TTL'] = 24 * 3600  # seconds an idle upload session is kept
+app.config['CHUNKED_UPLOAD_GC_INTERVAL'] = 600  # seconds between stale session sweeps
+app.config['DOWNLOAD_OFFLOAD'] = None  # 'x-accel-redirect' (nginx) or 'x-sendfile' (Apache, lighttpd)
+app.config['DOWNLOAD_ACCEL_PREFIX'] = '/protected-files/'  # nginx internal location aliased to UPLOAD_FOLDER
+app.config['FILE_METADATA_CACHE_SIZE'] = 10000  # download lookups kept per worker
+app.config['FILE_METADATA_CACHE_TTL'] = 60  # seconds; bounds how long another worker's delete goes unseen
+app.config['ARCHIVE_MAX_BYTES'] = 2 * 1024 * 1024 * 1024  # largest total file size one ZIP download may hold
+app.config['DB_BACKEND'] = 'mssql'  # 'sqlite' for local benchmarks and offline development
+app.config['SQLITE_PATH'] = 'hospital.db'
+app.config['SCHEMA_CHECK'] = True  # refuse to start unless the database is at the latest migration
+app.config['SCHEMA_AUTO_MIGRATE'] = False  # apply pending migrations at startup instead
+app.config['WRITE_BEHIND_FLUSH_INTERVAL'] = 2.0  # seconds between batched flushes
+app.config['WRITE_BEHIND_MAX_PENDING'] = 10000
+app.config['TOKEN_CACHE_SIZE'] = 10000  # verified tokens kept until they expire
+app.config['REVOCATION_SYNC_INTERVAL'] = 5.0  # seconds for a revocation to reach every worker
+app.config['PASSWORD_HASH_ITERATIONS'] = 260000
+app.config['PASSWORD_HASH_WORKERS'] = 4
+app.config['PASSWORD_HASH_MAX_QUEUE'] = 32
+app.config['PASSWORD_HASH_QUEUE_TIMEOUT'] = 0.5  # seconds a login waits for a hashing slot
+app.config['RATE_LIMITS'] = {
+    # Per attempted username and client, so users behind one NAT or proxy don't share a bucket
+    "auth": {"per_minute": 10, "burst": 5, "endpoints": ["login", "register_patient"], "key": "username"},
+    "import": {"per_minute": 2, "burst": 2, "endpoints": ["import_patients"]},
+    "list": {"per_minute": 60, "burst": 20,
+             "endpoints": ["get_patients", "get_doctors", "get_visits", "get_all_records", "get_prescriptions"]},
+}
+app.config['RATE_LIMIT_STORAGE'] = None  # path to a SQLite file to share buckets across worker processes
+app.config['TRUSTED_PROXIES'] = 0  # reverse proxies in front (e.g. nginx); their X-Forwarded-* headers are used
+app.config['SHED_MAX_IN_FLIGHT'] = 64  # concurrent requests per worker before shedding starts
+app.config['SHED_DB_WAIT_BUDGET'] = 0.5  # seconds, mean time to get a DB connection
+app.config['SHED_LATENCY_BUDGET'] = 2.0  # seconds, mean request latency
+app.config['SHED_LOW_PRIORITY'] = ["get_all_records", "import_patients", "download_file", "download_patient_archive"]
+app.config['SHED_CRITICAL'] = ["home", "login", "logout", "dispense_prescription"]
+app.config['SQL_SLOW_THRESHOLD'] = 0.5  # seconds; slower statements go to the sql.slow log
+app.config['SQL_REPEAT_THRESHOLD'] = 10  # same statement more often than this in one request is flagged
+app.config['SQL_SUMMARY_HEADER'] = False  # always on in debug mode
+app.config['PROFILE_ENABLED'] = False
+app.config['PROFILE_DIR'] = 'profiles'
+app.config['PROFILE_SAMPLE_EVERY'] = 100  # profile one matching request in N
+app.config['PROFILE_ROUTES'] = ["/api/"]  # path prefixes eligible for profiling
+# Regexes of paths never profiled: the profiler buffers the whole response, which breaks streaming
+app.config['PROFILE_EXCLUDE'] = [r"^/api/files/(upload|uploads|download)\b", r"^/api/files/patient/\d+/archive$"]
+app.config['PROFILE_MAX_FILES'] = 200
+app.config['SAMPLER_ENABLED'] = False  # stacks for /api/admin/profiles/samples; measure with tools.bench --sampler
+app.config['SAMPLER_HZ'] = 100
+app.config['SAMPLER_RETENTION'] = 600  # seconds of stack samples kept in memory
+app.config['TRACING_ENABLED'] = False  # a server span per request plus one per SQL execute and fetch
+app.config['TRACE_SERVICE_NAME'] = 'hospital-api'
+app.config['TRACE_EXPORT_FILE'] = os.path.join('traces', 'spans.jsonl')
+app.config['TRACE_EXPORT_MAX_BYTES'] = 100 * 1024 * 1024  # then rotated to spans.jsonl.1
+app.config['TRACE_OTLP_ENDPOINT'] = None  # e.g. http://localhost:4318/v1/traces; overrides the file
+app.config['COMPRESS_ENABLED'] = True
+app.config['COMPRESS_MIN_SIZE'] = 1024  # bytes; smaller bodies are sent as is
+app.config['COMPRESS_LEVEL'] = 6
+app.config['COMPRESS_CACHE_BYTES'] = 32 * 1024 * 1024  # compressed bodies kept for identical responses
+
+# =================================================
+# INSTRUMENTATION
+# =================================================
+metrics = Metrics()
+
+
+def current_request_stats():
+    return g.get("request_stats") if has_request_context() else None
+
+
+def current_sql_trace():
+    return g.get("sql_trace") if has_request_context() else None
+
+
+tracer = Tracer(
+    OTLPHttpExporter(app.config['TRACE_OTLP_ENDPOINT'], app.config['TRACE_SERVICE_NAME'])
+    if app.config['TRACE_OTLP_ENDPOINT']
+    else FileSpanExporter(app.config['TRACE_EXPORT_FILE'], app.config['TRACE_SERVICE_NAME'],
+                          max_bytes=app.config['TRACE_EXPORT_MAX_BYTES'])
+)
+
+db_listeners = [
+    StatsListener(current_request_stats),
+    SqlTraceListener(current_sql_trace, slow_threshold=app.config['SQL_SLOW_THRESHOLD']),
+]
+if app.config['TRACING_ENABLED']:
+    db_listeners.append(TraceListener(tracer, db_system=app.config['DB_BACKEND']))
+
+
+class InstrumentedJSONProvider(FastJSONProvider):
+    def response(self, *args, **kwargs):
+        started = time.perf_counter()
+        try:
+            return super().response(*args, **kwargs)
+        finally:
+            elapsed = time.perf_counter() - started
+            tracer.record("serialize", elapsed)
+            stats = current_request_stats()
+            if stats is not None:
+                stats.serialize_time += elapsed
+
+
+app.json = InstrumentedJSONProvider(app)
+
+load_shedder = LoadShedder(
+    max_in_flight=app.config['SHED_MAX_IN_FLIGHT'],
+    db_wait_budget=app.config['SHED_DB_WAIT_BUDGET'],
+    latency_budget=app.config['SHED_LATENCY_BUDGET'],
+    low_priority=app.config['SHED_LOW_PRIORITY'],
+    critical=app.config['SHED_CRITICAL'],
+)
+
 
 # Database connection
 def get_db_connection():
@@ -38,27 +174,144 @@ def get_db_connection():
             f"Trusted_Connection=yes;"
             f"autocommit=False;"
         )
-        conn = pyodbc.connect(connection_string)
+        started = time.perf_counter()
+        if app.config['DB_BACKEND'] == 'sqlite':
+            conn = sqlite_backend.connect(app.config['SQLITE_PATH'])
+        else:
+            conn = pyodbc.connect(connection_string)
+        waited = time.perf_counter() - started
+        load_shedder.record_db_wait(waited)
+        metrics.db_connect_wait.observe(waited)
+        tracer.record("db.connect", waited)
         if conn.autocommit:
             conn.autocommit = False
-        return conn
+        return InstrumentedConnection(conn, db_listeners)
     except Exception as e:
         print(f"Database connection error: {e}")
         raise Exception("Unable to connect to database")
 
 
+def verify_schema():
+    """
+    Startup check that the database is at the schema version this code
+    expects (see migrations.py); raises SchemaVersionError otherwise.
+    """
+    if not app.config['SCHEMA_CHECK'] and not app.config['SCHEMA_AUTO_MIGRATE']:
+        return
+    conn = get_db_connection()
+    try:
+        if app.config['SCHEMA_AUTO_MIGRATE']:
+            migrations.migrate(conn, app.config['DB_BACKEND'])
+        migrations.check(conn, app.config['DB_BACKEND'])
+    finally:
+        conn.close()
+
+
+_schema_verified = threading.Event()
+_schema_lock = threading.Lock()
+
+
+@app.before_request
+def ensure_schema():
+    """
+    Runs verify_schema() before a worker's first request, so the API is
+    checked the same way under a WSGI server as under `python app.py`.
+    Until it passes every request fails with the version mismatch.
+    """
+    if _schema_verified.is_set():
+        return
+    with _schema_lock:
+        if not _schema_verified.is_set():
+            verify_schema()
+            _schema_verified.set()
+
+
+# =================================================
+# WRITE-BEHIND SIDE EFFECTS
+# =================================================
+write_behind = WriteBehindExecutor(
+    flush_interval=app.config['WRITE_BEHIND_FLUSH_INTERVAL'],
+    max_pending=app.config['WRITE_BEHIND_MAX_PENDING'],
+    logger=app.logger,
+)
+
+
+def flush_last_login(batch):
+    # batch is {user_id: None}; repeated logins collapse to one update. LastLogin keeps
+    # the database's clock, as before it was deferred, and lags by at most a flush interval
+    conn = get_db_connection()
+    cur = conn.cursor()
+    try:
+        cur.fast_executemany = True
+        cur.executemany("UPDATE Users SET LastLogin = GETDATE() WHERE UserID = ?",
+                        [(user_id,) for user_id in batch])
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cur.close()
+        conn.close()
+
+
+def flush_password_upgrades(batch):
+    # batch is {user_id: (new_hash, old_hash)}; skip rows whose password changed meanwhile
+    conn = get_db_connection()
+    cur = conn.cursor()
+    try:
+        cur.fast_executemany = True
+        cur.executemany("UPDATE Users SET PasswordHash = ? WHERE UserID = ? AND PasswordHash = ?",
+                        [(new_hash, user_id, old_hash) for user_id, (new_hash, old_hash) in batch.items()])
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cur.close()
+        conn.close()
+
+
+write_behind.register("last_login", flush_last_login)
+write_behind.register("password_upgrade", flush_password_upgrades)
+
+
 def allowed_file(filename):
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
 
 
+password_hasher = PasswordHasher(
+    iterations=app.config['PASSWORD_HASH_ITERATIONS'],
+    workers=app.config['PASSWORD_HASH_WORKERS'],
+    max_queue=app.config['PASSWORD_HASH_MAX_QUEUE'],
+    queue_timeout=app.config['PASSWORD_HASH_QUEUE_TIMEOUT'],
+)
+
+
 def hash_password(password):
-    # Simple hash for demo - use bcrypt in production
-    return hashlib.sha256(password.encode()).hexdigest()
+    # PBKDF2 on the dedicated hashing pool; raises PoolBusy when saturated
+    return password_hasher.hash(password)
+
+
+def busy_response():
+    return jsonify({"error": "Server busy, please retry"}), 503, {"Retry-After": "1"}
 
 
 # =================================================
 # TOKEN DECORATOR
 # =================================================
+token_cache = TokenCache(max_entries=app.config['TOKEN_CACHE_SIZE'])
+revoked_tokens = RevocationList(get_db_connection, sync_interval=app.config['REVOCATION_SYNC_INTERVAL'])
+
+
+def verify_token(token):
+    return jwt.decode(token, SECRET_KEY, algorithms=["HS256"])
+
+
+def decode_token(token):
+    # Parallel calls from the same page share one signature check
+    return token_cache.get_or_verify(token, verify_token)
+
+
 def token_required(f):
     @wraps(f)
     def wrapper(*args, **kwargs):
@@ -68,14 +321,219 @@ def token_required(f):
         
         try:
             token = header.split(" ")[1]
-            request.user = jwt.decode(token, SECRET_KEY, algorithms=["HS256"])
+            request.user = decode_token(token)
         except Exception as e:
             return jsonify({"error": "Invalid token"}), 401
         
+        if revoked_tokens.is_revoked(request.user):
+            return jsonify({"error": "Token revoked"}), 401
+        
         return f(*args, **kwargs)
     return wrapper
 
 
+# =================================================
+# TRACING
+# =================================================
+@app.before_request
+def start_trace():
+    if not app.config['TRACING_ENABLED']:
+        return
+    
+    route = request.url_rule.rule if request.url_rule else request.path
+    span = tracer.start_span(f"{request.method} {route}", kind=SPAN_KIND_SERVER,
+                             traceparent=request.headers.get("traceparent"),
+                             attributes={"http.method": request.method, "http.route": route})
+    g.trace_span = span
+    g.trace_token = tracer.activate(span)
+
+
+@app.after_request
+def tag_trace(response):
+    span = g.get("trace_span")
+    if span is not None:
+        span.attributes["http.status_code"] = response.status_code
+        span.error = response.status_code >= 500
+        response.headers["traceparent"] = span.traceparent()
+    return response
+
+
+@app.teardown_request
+def finish_trace(exc):
+    span = g.pop("trace_span", None)
+    if span is not None:
+        tracer.deactivate(g.pop("trace_token"))
+        tracer.finish(span)
+
+
+# =================================================
+# METRICS
+# =================================================
+@app.before_request
+def start_request_metrics():
+    g.request_started = time.perf_counter()
+    g.request_stats = RequestStats()
+    g.sql_trace = RequestTrace()
+
+
+@app.after_request
+def record_request_metrics(response):
+    started = g.pop("request_started", None)
+    if started is None or request.endpoint == "get_metrics":
+        return response
+    
+    route = request.url_rule.rule if request.url_rule else "<unmatched>"
+    metrics.observe_request(route, request.method, response.status_code,
+                            time.perf_counter() - started, response.content_length,
+                            g.request_stats)
+    
+    repeat_threshold = app.config['SQL_REPEAT_THRESHOLD']
+    report_repeats(g.sql_trace, route, repeat_threshold)
+    if app.debug or app.config['SQL_SUMMARY_HEADER']:
+        response.headers["X-SQL-Summary"] = g.sql_trace.summary(repeat_threshold)
+    return response
+
+
+@app.route("/metrics", methods=["GET"])
+def get_metrics():
+    cache_stats = token_cache.stats()
+    file_cache_stats = file_metadata.stats()
+    body = metrics.render({
+        "http_requests_in_flight": load_shedder.in_flight,
+        "http_requests_shed_total": load_shedder.shed_count,
+        "token_cache_hits_total": cache_stats["hits"],
+        "token_cache_misses_total": cache_stats["misses"],
+        "file_metadata_cache_hits_total": file_cache_stats["hits"],
+        "file_metadata_cache_misses_total": file_cache_stats["misses"],
+        "write_behind_pending": write_behind.pending_count(),
+        "write_behind_dropped_total": write_behind.dropped,
+        "compress_cache_hits_total": compressor.cache.hits if compressor.cache else 0,
+        "compress_cache_bytes": compressor.cache.size if compressor.cache else 0,
+    })
+    return app.response_class(body, mimetype="text/plain; version=0.0.4")
+
+
+# =================================================
+# COMPRESSION
+# =================================================
+compressor = ResponseCompressor(
+    min_size=app.config['COMPRESS_MIN_SIZE'],
+    level=app.config['COMPRESS_LEVEL'],
+    cache_bytes=app.config['COMPRESS_CACHE_BYTES'],
+)
+
+
+# Registered after the metrics hook: Flask runs after_request hooks in reverse, so this
+# runs first and record_request_metrics sees the compressed (wire) size
+@app.after_request
+def compress_response(response):
+    if not app.config['COMPRESS_ENABLED'] or request.method == "HEAD":
+        return response
+    started = time.perf_counter()
+    response = compressor.compress(response, request.accept_encodings)
+    tracer.record("compress", time.perf_counter() - started)
+    return response
+
+
+# =================================================
+# LOAD SHEDDING
+# =================================================
+@app.before_request
+def shed_load():
+    if request.method == "OPTIONS":
+        return None
+    
+    if not load_shedder.try_enter(request.endpoint):
+        return jsonify({"error": "Server overloaded, please retry"}), 503, {"Retry-After": "2"}
+    g.shed_started = time.perf_counter()
+    return None
+
+
+def call_on_body_close(response, callback):
+    """
+    response.call_on_close() that also fires for direct_passthrough responses
+    (send_file), whose body werkzeug hands to the server without ever closing
+    the response. Their callback is chained onto the body's own close(), so
+    the server's wsgi.file_wrapper (sendfile) is kept.
+    """
+    if not response.direct_passthrough:
+        response.call_on_close(callback)
+        return
+    body = response.response
+    close = getattr(body, "close", None)
+
+    def closing():
+        try:
+            if close is not None:
+                close()
+        finally:
+            callback()
+
+    body.close = closing
+
+
+@app.after_request
+def release_load_on_close(response):
+    # A streamed body (archives, downloads) keeps its slot until it has been sent
+    started = g.pop("shed_started", None)
+    if started is not None:
+        endpoint = request.endpoint
+        call_on_body_close(response, lambda: load_shedder.leave(endpoint, time.perf_counter() - started))
+    return response
+
+
+@app.teardown_request
+def release_load(exc):
+    # Only left set when no response got as far as release_load_on_close
+    started = g.pop("shed_started", None)
+    if started is not None:
+        load_shedder.leave(request.endpoint, time.perf_counter() - started)
+
+
+# =================================================
+# RATE LIMITING
+# =================================================
+rate_limiter = RateLimiter(
+    app.config['RATE_LIMITS'],
+    store=(SQLiteBucketStore(app.config['RATE_LIMIT_STORAGE']) if app.config['RATE_LIMIT_STORAGE']
+           else MemoryBucketStore()),
+)
+
+
+if app.config['TRUSTED_PROXIES']:
+    # remote_addr is then the client the nearest trusted proxy saw, not the proxy itself
+    hops = app.config['TRUSTED_PROXIES']
+    app.wsgi_app = ProxyFix(app.wsgi_app, x_for=hops, x_proto=hops, x_host=hops)
+
+
+def rate_limit_key(key=None):
+    if key == "username":
+        data = request.get_json(silent=True)
+        username = data.get("username") if isinstance(data, dict) else None
+        if isinstance(username, str) and username:
+            return f"name:{username.lower()}@{request.remote_addr}"
+
+    # Authenticated clients are limited per user, everyone else per IP
+    header = request.headers.get("Authorization")
+    if header:
+        try:
+            return f"user:{decode_token(header.split(' ')[1])['user_id']}"
+        except Exception:
+            pass
+    return f"ip:{request.remote_addr}"
+
+
+@app.before_request
+def enforce_rate_limits():
+    if request.method == "OPTIONS":
+        return None
+    
+    retry_after = rate_limiter.check(request.endpoint, rate_limit_key)
+    if retry_after:
+        return jsonify({"error": "Too many requests"}), 429, {"Retry-After": str(retry_after)}
+    return None
+
+
 # =================================================
 # HOME
 # =================================================
@@ -110,9 +568,16 @@ def login():
         
         user = cur.fetchone()
         
-        if not user or user.PasswordHash != data["password"]:
+        if not password_hasher.verify(data["password"], user.PasswordHash if user else None):
             return jsonify({"error": "Invalid credentials"}), 401
         
+        # Legacy plaintext/SHA-256 and weaker hashes are rehashed in the background
+        if password_hasher.needs_upgrade(user.PasswordHash):
+            user_id, old_hash = user.UserID, user.PasswordHash
+            password_hasher.upgrade_later(
+                data["password"],
+                lambda new_hash: write_behind.submit("password_upgrade", user_id, (new_hash, old_hash)))
+        
         token = jwt.encode({
             "user_id": user.UserID,
             "username": user.Username,
@@ -121,12 +586,13 @@ def login():
             "patient_id": user.PatientID,
             "doctor_id": user.DoctorID,
             "pharmacist_id": user.PharmacistID,
-            "exp": datetime.datetime.utcnow() + datetime.timedelta(hours=8)
+            "jti": uuid.uuid4().hex,
+            "iat": time.time(),  # not truncated to the second, see RevocationList.is_revoked
+            "exp": datetime.datetime.utcnow() + TOKEN_LIFETIME
         }, SECRET_KEY, algorithm="HS256")
         
-        # Update last login
-        cur.execute("UPDATE Users SET LastLogin = GETDATE() WHERE UserID = ?", user.UserID)
-        conn.commit()
+        # Update last login off the request path
+        write_behind.submit("last_login", user.UserID)
         
         return jsonify({
             "token": token,
@@ -137,6 +603,8 @@ def login():
             }
         })
     
+    except PoolBusy:
+        return busy_response()
     except Exception as e:
         return jsonify({"error": str(e)}), 500
     finally:
@@ -144,6 +612,18 @@ def login():
         conn.close()
 
 
+# Logout
+@app.route("/api/auth/logout", methods=["POST"])
+@token_required
+def logout():
+    try:
+        revoked_tokens.revoke_token(request.user)
+        return jsonify({"message": "Logged out"})
+    
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+
 # Patient Registration
 @app.route("/api/auth/register", methods=["POST"])
 def register_patient():
@@ -154,6 +634,12 @@ def register_patient():
         if field not in data:
             return jsonify({"error": f"Missing required field: {field}"}), 400
     
+    # Hash before opening the transaction so no locks are held during the KDF
+    try:
+        password_hash = hash_password(data["password"])
+    except PoolBusy:
+        return busy_response()
+    
     conn = get_db_connection()
     cur = conn.cursor()
     
@@ -180,7 +666,7 @@ def register_patient():
         cur.execute("""
             INSERT INTO Users (Username, PasswordHash, Email, Role, PatientID)
             VALUES (?, ?, ?, 'Patient', ?)
-        """, (data["username"], data["password"], data["email"], patient_id))
+        """, (data["username"], password_hash, data["email"], patient_id))
         
         conn.commit()
         
@@ -247,20 +733,8 @@ def get_patients():
             ORDER BY CreatedAt DESC
         """)
         
-        rows = cur.fetchall()
         cols = [c[0] for c in cur.description]
-        
-        patients = []
-        for row in rows:
-            patient = {}
-            for i, col in enumerate(cols):
-                val = row[i]
-                if isinstance(val, (datetime.datetime, datetime.date)):
-                    val = val.isoformat()
-                patient[col] = val
-            patients.append(patient)
-        
-        return jsonify(patients)
+        return app.json.rows_response(cols, cur.fetchall())
     
     except Exception as e:
         return jsonify({"error": str(e)}), 500
@@ -289,14 +763,7 @@ def get_patient(pid):
             return jsonify({"error": "Patient not found"}), 404
         
         cols = [c[0] for c in cur.description]
-        patient = {}
-        for i, col in enumerate(cols):
-            val = row[i]
-            if isinstance(val, (datetime.datetime, datetime.date)):
-                val = val.isoformat()
-            patient[col] = val
-        
-        return jsonify(patient)
+        return jsonify(dict(zip(cols, row)))
     
     except Exception as e:
         return jsonify({"error": str(e)}), 500
@@ -354,17 +821,8 @@ def get_doctors():
             ORDER BY DoctorName
         """)
         
-        rows = cur.fetchall()
         cols = [c[0] for c in cur.description]
-        
-        doctors = []
-        for row in rows:
-            doctor = {}
-            for i, col in enumerate(cols):
-                doctor[col] = row[i]
-            doctors.append(doctor)
-        
-        return jsonify(doctors)
+        return app.json.rows_response(cols, cur.fetchall())
     
     except Exception as e:
         return jsonify({"error": str(e)}), 500
@@ -394,20 +852,8 @@ def get_visits():
             ORDER BY v.VisitDate DESC
         """)
         
-        rows = cur.fetchall()
         cols = [c[0] for c in cur.description]
-        
-        visits = []
-        for row in rows:
-            visit = {}
-            for i, col in enumerate(cols):
-                val = row[i]
-                if isinstance(val, (datetime.datetime, datetime.date)):
-                    val = val.isoformat()
-                visit[col] = val
-            visits.append(visit)
-        
-        return jsonify(visits)
+        return app.json.rows_response(cols, cur.fetchall())
     
     except Exception as e:
         return jsonify({"error": str(e)}), 500
@@ -460,20 +906,8 @@ def get_all_records():
     try:
         cur.execute("EXEC sp_GetAllRecords")
         
-        rows = cur.fetchall()
         cols = [c[0] for c in cur.description]
-        
-        records = []
-        for row in rows:
-            record = {}
-            for i, col in enumerate(cols):
-                val = row[i]
-                if isinstance(val, (datetime.datetime, datetime.date)):
-                    val = val.isoformat()
-                record[col] = val
-            records.append(record)
-        
-        return jsonify(records)
+        return app.json.rows_response(cols, cur.fetchall())
     
     except Exception as e:
         return jsonify({"error": str(e)}), 500
@@ -496,20 +930,8 @@ def get_my_records():
     try:
         cur.execute("EXEC sp_GetPatientRecords ?", patient_id)
         
-        rows = cur.fetchall()
         cols = [c[0] for c in cur.description]
-        
-        records = []
-        for row in rows:
-            record = {}
-            for i, col in enumerate(cols):
-                val = row[i]
-                if isinstance(val, (datetime.datetime, datetime.date)):
-                    val = val.isoformat()
-                record[col] = val
-            records.append(record)
-        
-        return jsonify(records)
+        return app.json.rows_response(cols, cur.fetchall())
     
     except Exception as e:
         return jsonify({"error": str(e)}), 500
@@ -612,22 +1034,11 @@ def get_prescriptions():
     cur = conn.cursor()
     
     try:
-        cur.execute("EXEC sp_GetPrescriptionsForPharmacy ?", only_pending)
+        # The pending filter is a parameter; plan per value rather than reuse the first one's plan
+        cur.execute("EXEC sp_GetPrescriptionsForPharmacy ? WITH RECOMPILE", only_pending)
         
-        rows = cur.fetchall()
         cols = [c[0] for c in cur.description]
-        
-        prescriptions = []
-        for row in rows:
-            prescription = {}
-            for i, col in enumerate(cols):
-                val = row[i]
-                if isinstance(val, (datetime.datetime, datetime.date)):
-                    val = val.isoformat()
-                prescription[col] = val
-            prescriptions.append(prescription)
-        
-        return jsonify(prescriptions)
+        return app.json.rows_response(cols, cur.fetchall())
     
     except Exception as e:
         return jsonify({"error": str(e)}), 500
@@ -699,6 +1110,40 @@ def dispense_prescription(pid):
 # =================================================
 # FILE UPLOAD ENDPOINTS
 # =================================================
+blob_store = BlobStore(
+    os.path.join(app.config['UPLOAD_FOLDER'], 'medical_files'),
+    integrity_errors=(pyodbc.IntegrityError, sqlite3.IntegrityError),
+)
+resumable_uploads = ResumableUploads(
+    get_db_connection,
+    os.path.join(app.config['UPLOAD_FOLDER'], 'incoming'),
+    chunk_size=app.config['CHUNKED_UPLOAD_CHUNK_SIZE'],
+    max_size=app.config['CHUNKED_UPLOAD_MAX_SIZE'],
+    ttl=app.config['CHUNKED_UPLOAD_TTL'],
+    gc_interval=app.config['CHUNKED_UPLOAD_GC_INTERVAL'],
+)
+file_metadata = FileMetadataCache(
+    max_entries=app.config['FILE_METADATA_CACHE_SIZE'],
+    ttl=app.config['FILE_METADATA_CACHE_TTL'],
+)
+
+
+def record_medical_file(cur, patient_id, visit_id, file_type, filename, file_ext, description, size, sha256):
+    """
+    Inserts the MedicalFiles row for one upload and takes its reference on
+    the content's blob, in the caller's transaction. Returns (file_id,
+    deduplicated).
+    """
+    deduplicated = blob_store.acquire(cur, sha256, size)
+    cur.execute("""
+        INSERT INTO MedicalFiles (PatientID, VisitID, UploadedBy, FileType, FileName, 
+                                 FileExtension, FilePath, FileSize, Description, ContentHash)
+        OUTPUT INSERTED.FileID
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+    """, (patient_id, visit_id if visit_id else None, request.user['user_id'], 
+          file_type, filename, file_ext, blob_store.path(sha256), size, description, sha256))
+    return cur.fetchone()[0], deduplicated
+
 
 # Upload medical file
 @app.route("/api/files/upload", methods=["POST"])
@@ -723,43 +1168,156 @@ def upload_medical_file():
         return jsonify({"error": "Patient ID required"}), 400
     
     filename = secure_filename(file.filename)
-    timestamp = datetime.datetime.now().strftime('%Y%m%d_%H%M%S')
-    unique_filename = f"{timestamp}_{filename}"
-    filepath = os.path.join(app.config['UPLOAD_FOLDER'], 'medical_files', unique_filename)
-    
-    file.save(filepath)
-    file_size = os.path.getsize(filepath)
     file_ext = filename.rsplit('.', 1)[1].lower() if '.' in filename else ''
     
+    # The body was streamed to disk and hashed while parsing; only new content is kept
+    spool = spool_upload(file)
+    file_size, sha256 = spool.size, spool.hexdigest()
+    filepath = blob_store.path(sha256)
+    
     conn = get_db_connection()
     cur = conn.cursor()
     
     try:
-        cur.execute("""
-            INSERT INTO MedicalFiles (PatientID, VisitID, UploadedBy, FileType, FileName, 
-                                     FileExtension, FilePath, FileSize, Description)
-            OUTPUT INSERTED.FileID
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
-        """, (patient_id, visit_id if visit_id else None, request.user['user_id'], 
-              file_type, filename, file_ext, filepath, file_size, description))
-        
-        file_id = cur.fetchone()[0]
+        file_id, deduplicated = record_medical_file(cur, patient_id, visit_id, file_type, filename, file_ext,
+                                                    description, file_size, sha256)
         conn.commit()
-        
-        return jsonify({
-            "message": "File uploaded successfully",
-            "file_id": file_id,
-            "filename": unique_filename
-        }), 201
     
     except Exception as e:
         conn.rollback()
-        if os.path.exists(filepath):
-            os.remove(filepath)
+        spool.close()
         return jsonify({"error": str(e)}), 500
     finally:
         cur.close()
         conn.close()
+    
+    # After the commit, so the collector cannot remove the blob underneath this row
+    with tracer.span("file.write", path=filepath):
+        blob_store.place(spool, sha256)
+    
+    return jsonify({
+        "message": "File uploaded successfully",
+        "file_id": file_id,
+        "filename": filename,
+        "size": file_size,
+        "sha256": sha256,
+        "deduplicated": deduplicated
+    }), 201
+
+
+# Start a chunked upload
+@app.route("/api/files/uploads", methods=["POST"])
+@token_required
+def create_chunked_upload():
+    data = request.json or {}
+    filename = secure_filename(data.get('filename', ''))
+    
+    if not filename:
+        return jsonify({"error": "No file selected"}), 400
+    if not allowed_file(filename):
+        return jsonify({"error": "File type not allowed"}), 400
+    if not data.get('patient_id'):
+        return jsonify({"error": "Patient ID required"}), 400
+    
+    try:
+        session = resumable_uploads.create(
+            request.user['user_id'], data['patient_id'], data.get('visit_id') or None,
+            data.get('file_type', 'Other'), filename, filename.rsplit('.', 1)[1].lower(),
+            data.get('description', ''), data.get('size'), data.get('sha256'))
+    except UploadSessionError as e:
+        return jsonify({"error": str(e)}), e.status
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+    
+    return jsonify(session), 201
+
+
+# Send one chunk: raw body at ?offset=, with its SHA-256 in X-Chunk-SHA256
+@app.route("/api/files/uploads/<upload_id>", methods=["PUT"])
+@token_required
+def put_upload_chunk(upload_id):
+    offset = request.args.get('offset', type=int)
+    if offset is None:
+        return jsonify({"error": "Offset must be an integer"}), 400
+    
+    try:
+        with tracer.span("file.write", upload_id=upload_id, offset=offset):
+            result = resumable_uploads.write_chunk(upload_id, request.user['user_id'], offset,
+                                                   request.get_data(cache=False),
+                                                   request.headers.get('X-Chunk-SHA256'))
+        return jsonify(result)
+    except UploadSessionError as e:
+        return jsonify({"error": str(e)}), e.status
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+
+# Upload progress: bytes received and the offsets still missing
+@app.route("/api/files/uploads/<upload_id>", methods=["GET"])
+@token_required
+def get_upload_status(upload_id):
+    try:
+        return jsonify(resumable_uploads.status(upload_id, request.user['user_id']))
+    except UploadSessionError as e:
+        return jsonify({"error": str(e)}), e.status
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+
+# Cancel a chunked upload
+@app.route("/api/files/uploads/<upload_id>", methods=["DELETE"])
+@token_required
+def abort_chunked_upload(upload_id):
+    try:
+        resumable_uploads.abort(upload_id, request.user['user_id'])
+        return jsonify({"message": "Upload cancelled"})
+    except UploadSessionError as e:
+        return jsonify({"error": str(e)}), e.status
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+
+# Finish a chunked upload: verify it and record it like a regular upload
+@app.route("/api/files/uploads/<upload_id>/complete", methods=["POST"])
+@token_required
+def complete_chunked_upload(upload_id):
+    try:
+        with tracer.span("file.verify", upload_id=upload_id):
+            session, part, file_size, sha256 = resumable_uploads.assemble(upload_id, request.user['user_id'])
+    except UploadSessionError as e:
+        return jsonify({"error": str(e)}), e.status
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+    
+    conn = get_db_connection()
+    cur = conn.cursor()
+    
+    try:
+        file_id, deduplicated = record_medical_file(
+            cur, session.PatientID, session.VisitID, session.FileType, session.FileName,
+            session.FileExtension, session.Description, file_size, sha256)
+        resumable_uploads.finish(cur, upload_id)
+        conn.commit()
+    
+    except Exception as e:
+        conn.rollback()
+        resumable_uploads.reopen(upload_id)
+        return jsonify({"error": str(e)}), 500
+    finally:
+        cur.close()
+        conn.close()
+    
+    with tracer.span("file.write", path=blob_store.path(sha256)):
+        blob_store.place(part, sha256)
+    
+    return jsonify({
+        "message": "File uploaded successfully",
+        "file_id": file_id,
+        "filename": session.FileName,
+        "size": file_size,
+        "sha256": sha256,
+        "deduplicated": deduplicated
+    }), 201
 
 
 # Get patient files
@@ -772,20 +1330,8 @@ def get_patient_files(pid):
     try:
         cur.execute("EXEC sp_GetPatientFiles ?", pid)
         
-        rows = cur.fetchall()
         cols = [c[0] for c in cur.description]
-        
-        files = []
-        for row in rows:
-            file_info = {}
-            for i, col in enumerate(cols):
-                val = row[i]
-                if isinstance(val, (datetime.datetime, datetime.date)):
-                    val = val.isoformat()
-                file_info[col] = val
-            files.append(file_info)
-        
-        return jsonify(files)
+        return app.json.rows_response(cols, cur.fetchall())
     
     except Exception as e:
         return jsonify({"error": str(e)}), 500
@@ -794,29 +1340,191 @@ def get_patient_files(pid):
         conn.close()
 
 
-# Download file
-@app.route("/api/files/download/<int:fid>", methods=["GET"])
+def stat_archive_files(rows):
+    """
+    Resolves [(FileID, FileName, FilePath)] to the files on disk, in order.
+    A file not at its path is looked up again once, in case
+    tools/migrate_layout.py moved it since the rows were read. Returns
+    ([(FileID, FileName, FilePath, size)], [FileID of each file that is
+    missing]). Nothing is opened here.
+    """
+    found, missing = [], []
+    for file_id, filename, filepath in rows:
+        for _ in range(2):
+            try:
+                found.append((file_id, filename, filepath, os.stat(filepath).st_size))
+                break
+            except FileNotFoundError:
+                result = load_file_metadata(file_id)
+                if not result or result[0] == filepath:
+                    missing.append(file_id)
+                    break
+                filepath = result[0]
+        else:
+            missing.append(file_id)
+    return found, missing
+
+
+def open_archive_entries(found):
+    """
+    Yields (archive name, open file) for stream_zip, opening each file only
+    when the archive reaches it, so one descriptor is open at a time.
+    """
+    names = archive_names([filename for _, filename, _, _ in found])
+    for name, (file_id, _, filepath, _) in zip(names, found):
+        try:
+            source = open(filepath, "rb")
+        except FileNotFoundError:
+            # Moved since it was stat'ed; a file deleted meanwhile ends the stream
+            result = load_file_metadata(file_id)
+            if not result:
+                raise
+            source = open(result[0], "rb")
+        yield name, source
+
+
+# Download a patient's files as one ZIP, streamed as it is built; ?ids=1,2,3 selects files
+@app.route("/api/files/patient/<int:pid>/archive", methods=["GET"])
 @token_required
-def download_file(fid):
+def download_patient_archive(pid):
+    try:
+        selected = {int(i) for i in request.args.get('ids', '').split(',') if i.strip()}
+    except ValueError:
+        return jsonify({"error": "ids must be a comma-separated list of file IDs"}), 400
+    
     conn = get_db_connection()
     cur = conn.cursor()
     
     try:
-        cur.execute("SELECT FilePath, FileName FROM MedicalFiles WHERE FileID = ?", fid)
+        cur.execute("""
+            SELECT FileID, FileName, FilePath FROM MedicalFiles
+            WHERE PatientID = ? ORDER BY UploadedAt
+        """, pid)
+        files = [row for row in cur.fetchall() if not selected or row[0] in selected]
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+    finally:
+        cur.close()
+        conn.close()
+    
+    if selected and len(files) != len(selected):
+        return jsonify({"error": "File not found"}), 404
+    if not files:
+        return jsonify({"error": "No files to download"}), 404
+    
+    try:
+        found, missing = stat_archive_files(files)
+    except OSError as e:
+        return jsonify({"error": str(e)}), 500
+    
+    if (selected and missing) or not found:
+        return jsonify({"error": "File not found on server", "missing_file_ids": missing}), 404
+    
+    total = sum(size for _, _, _, size in found)
+    if total > app.config['ARCHIVE_MAX_BYTES']:
+        return jsonify({"error": f"Selected files total {total} bytes, over the "
+                                 f"{app.config['ARCHIVE_MAX_BYTES']} byte archive limit"}), 413
+    
+    # stream_zip closes each file once written, and on close if the stream is abandoned
+    response = app.response_class(stream_zip(open_archive_entries(found)), mimetype="application/zip")
+    response.headers.set("Content-Disposition", "attachment", filename=f"patient_{pid}_files.zip")
+    if missing:
+        # The whole-patient archive still goes out; say which files it lacks
+        response.headers["X-Missing-File-IDs"] = ",".join(map(str, missing))
+    return response
+
+
+# Download file
+def load_file_metadata(fid):
+    conn = get_db_connection()
+    cur = conn.cursor()
+    try:
+        cur.execute("SELECT FilePath, FileName, ContentHash FROM MedicalFiles WHERE FileID = ?", fid)
         result = cur.fetchone()
+        return tuple(result) if result else None
+    finally:
+        cur.close()
+        conn.close()
+
+
+@app.route("/api/files/download/<int:fid>", methods=["GET"])
+@token_required
+def download_file(fid):
+    try:
+        result = file_metadata.get_or_load(fid, load_file_metadata)
         
         if not result:
             return jsonify({"error": "File not found"}), 404
         
-        filepath, filename = result
+        filepath, filename, content_hash = result
         
         if not os.path.exists(filepath):
-            return jsonify({"error": "File not found on server"}), 404
+            # The cached path may predate a move by tools/migrate_layout.py; look again once
+            file_metadata.invalidate(fid)
+            result = file_metadata.get_or_load(fid, load_file_metadata)
+            if not result or not os.path.exists(result[0]):
+                return jsonify({"error": "File not found on server"}), 404
+            filepath, filename, content_hash = result
         
-        return send_file(filepath, as_attachment=True, download_name=filename)
+        # Blobs are named by their SHA-256, which makes it a strong validator
+        return send_stored_file(filepath, filename, etag=content_hash)
     
     except Exception as e:
         return jsonify({"error": str(e)}), 500
+
+
+# Delete file
+@app.route("/api/files/<int:fid>", methods=["DELETE"])
+@token_required
+def delete_file(fid):
+    if request.user.get("role") not in ("Admin", "Doctor"):
+        return jsonify({"error": "Doctor or admin access required"}), 403
+    
+    conn = get_db_connection()
+    cur = conn.cursor()
+    
+    try:
+        # tools/migrate_layout.py may rewrite the row between the read and the delete;
+        # the delete only applies to the values read, so the right blob is released
+        for _ in range(3):
+            cur.execute("SELECT FilePath, ContentHash FROM MedicalFiles WHERE FileID = ?", fid)
+            result = cur.fetchone()
+            
+            if not result:
+                return jsonify({"error": "File not found"}), 404
+            
+            filepath, content_hash = result
+            
+            if content_hash:
+                cur.execute("DELETE FROM MedicalFiles WHERE FileID = ? AND FilePath = ? AND ContentHash = ?",
+                            (fid, filepath, content_hash))
+            else:
+                cur.execute("DELETE FROM MedicalFiles WHERE FileID = ? AND FilePath = ? AND ContentHash IS NULL",
+                            (fid, filepath))
+            if cur.rowcount == 1:
+                break
+            conn.rollback()
+        else:
+            return jsonify({"error": "File is being moved, please retry"}), 409
+        if content_hash:
+            blob_store.release(cur, content_hash)
+        conn.commit()
+        file_metadata.invalidate(fid)
+        
+        # The blob goes only when this was its last reference
+        if content_hash:
+            blob_store.collect(conn, [content_hash])
+        else:
+            # Stored before the blob store as its own copy, unless a same-second upload reused the name
+            cur.execute("SELECT COUNT(*) FROM MedicalFiles WHERE FilePath = ?", filepath)
+            if not cur.fetchone()[0] and os.path.exists(filepath):
+                os.remove(filepath)
+        
+        return jsonify({"message": "File deleted"})
+    
+    except Exception as e:
+        conn.rollback()
+        return jsonify({"error": str(e)}), 500
     finally:
         cur.close()
         conn.close()
@@ -845,9 +1553,14 @@ def import_patients():
     filename = secure_filename(file.filename)
     timestamp = datetime.datetime.now().strftime('%Y%m%d_%H%M%S')
     unique_filename = f"{timestamp}_{filename}"
-    filepath = os.path.join(app.config['UPLOAD_FOLDER'], 'patient_imports', unique_filename)
     
-    file.save(filepath)
+    # Sharded by content hash, which was computed while the body streamed to disk
+    spool = spool_upload(file)
+    filepath = sharded_path(os.path.join(app.config['UPLOAD_FOLDER'], 'patient_imports'), spool.hexdigest(),
+                            unique_filename)
+    
+    with tracer.span("file.write", path=filepath):
+        spool.commit(filepath)
     
     conn = get_db_connection()
     cur = conn.cursor()
@@ -921,6 +1634,102 @@ def import_patients():
         conn.close()
 
 
+# =================================================
+# USER MANAGEMENT (ADMIN)
+# =================================================
+
+@app.route("/api/admin/users/<int:uid>/deactivate", methods=["POST"])
+@token_required
+def deactivate_user(uid):
+    if request.user.get("role") != "Admin":
+        return jsonify({"error": "Admin access required"}), 403
+    
+    conn = get_db_connection()
+    cur = conn.cursor()
+    
+    try:
+        cur.execute("UPDATE Users SET IsActive = 0 WHERE UserID = ?", uid)
+        if cur.rowcount == 0:
+            conn.rollback()
+            return jsonify({"error": "User not found"}), 404
+        
+        conn.commit()
+        
+        # Outstanding tokens stop working on every worker within one sync interval
+        revoked_tokens.revoke_user(uid, TOKEN_LIFETIME)
+        
+        return jsonify({"message": "User deactivated"})
+    
+    except Exception as e:
+        conn.rollback()
+        return jsonify({"error": str(e)}), 500
+    finally:
+        cur.close()
+        conn.close()
+
+
+# =================================================
+# PROFILING (ADMIN)
+# =================================================
+
+def admin_profile_requested(environ):
+    # Admins can force a profile with "X-Profile-Request: 1"
+    if environ.get("HTTP_X_PROFILE_REQUEST") != "1":
+        return False
+    try:
+        claims = decode_token(environ.get("HTTP_AUTHORIZATION", "").split(" ")[1])
+    except Exception:
+        return False
+    return claims.get("role") == "Admin" and not revoked_tokens.is_revoked(claims)
+
+
+profiler = SampledProfiler(
+    app.wsgi_app,
+    profile_dir=app.config['PROFILE_DIR'],
+    every=app.config['PROFILE_SAMPLE_EVERY'],
+    routes=app.config['PROFILE_ROUTES'],
+    force=admin_profile_requested,
+    max_files=app.config['PROFILE_MAX_FILES'],
+    exclude=app.config['PROFILE_EXCLUDE'],
+)
+if app.config['PROFILE_ENABLED']:
+    app.wsgi_app = profiler
+
+
+stack_sampler = StackSampler(hz=app.config['SAMPLER_HZ'], retention=app.config['SAMPLER_RETENTION'])
+if app.config['SAMPLER_ENABLED']:
+    stack_sampler.start()
+
+
+@app.route("/api/admin/profiles", methods=["GET"])
+@token_required
+def list_profiles():
+    if request.user.get("role") != "Admin":
+        return jsonify({"error": "Admin access required"}), 403
+    
+    return jsonify(profiler.list_profiles())
+
+
+@app.route("/api/admin/profiles/<name>", methods=["GET"])
+@token_required
+def download_profile(name):
+    if request.user.get("role") != "Admin":
+        return jsonify({"error": "Admin access required"}), 403
+    
+    return send_from_directory(os.path.abspath(app.config['PROFILE_DIR']), name, as_attachment=True)
+
+
+# Collapsed stacks for the last ?seconds=N (default 60), ready for flamegraph.pl or speedscope
+@app.route("/api/admin/profiles/samples", methods=["GET"])
+@token_required
+def get_stack_samples():
+    if request.user.get("role") != "Admin":
+        return jsonify({"error": "Admin access required"}), 403
+    
+    seconds = min(request.args.get("seconds", 60, type=int), app.config['SAMPLER_RETENTION'])
+    return app.response_class(stack_sampler.collapsed(seconds), mimetype="text/plain")
+
+
 # =================================================
 # RUN
 # =================================================
@@ -935,5 +1744,7 @@ if __name__ == "__main__":
     print("   - Prescriptions: /api/prescriptions/*")
     print("   - Files: /api/files/*")
     print("   - Admin: /api/admin/*")
+    verify_schema()
+    _schema_verified.set()
     print("✅ Ready!")
     app.run(debug=True, host='0.0.0.0', port=5000)
\ No newline at end of file
@@ -0,0 +1,135 @@
+import argparse
+import os
+import time
+
+from uploads import sharded_path
+
+# Medical file contents are stored once per distinct SHA-256, at
+# <root>/<hash[:2]>/<hash[2:4]>/<hash>. FileBlobs.RefCount counts the MedicalFiles rows pointing at
+# each blob; a blob whose count drops to zero is collected. While a blob is
+# being collected its count is -1 and new references wait for the row to go,
+# so an upload can never be matched against a file that is about to vanish.
+
+
+class BlobBusy(Exception):
+    pass
+
+
+class BlobStore:
+    """
+    Content-addressed, reference-counted store for medical files.
+
+    acquire() and release() run inside the caller's transaction, next to
+    the MedicalFiles insert or delete they account for. place() puts the
+    upload's bytes in the store after that transaction commits and
+    collect() removes unreferenced blobs.
+    """
+
+    def __init__(self, root, integrity_errors=(), busy_timeout=5.0):
+        self.root = root
+        self.integrity_errors = tuple(integrity_errors)
+        self.busy_timeout = busy_timeout
+
+    def path(self, content_hash):
+        return sharded_path(self.root, content_hash)
+
+    def flat_path(self, content_hash):
+        # Where blobs were kept before the sharded layout; see tools/migrate_layout.py
+        return os.path.join(self.root, content_hash)
+
+    def acquire(self, cur, content_hash, size):
+        """
+        Adds a reference to the blob, creating its row on first use.
+        Returns True if the content was already in the store.
+        """
+        deadline = time.monotonic() + self.busy_timeout
+        while True:
+            cur.execute("UPDATE FileBlobs SET RefCount = RefCount + 1 WHERE ContentHash = ? AND RefCount >= 0",
+                        content_hash)
+            if cur.rowcount == 1:
+                return True
+            try:
+                cur.execute("""
+                    INSERT INTO FileBlobs (ContentHash, FileSize, RefCount)
+                    SELECT ?, ?, 1 WHERE NOT EXISTS (SELECT 1 FROM FileBlobs WHERE ContentHash = ?)
+                """, (content_hash, size, content_hash))
+                if cur.rowcount == 1:
+                    return False
+            except self.integrity_errors:
+                pass  # another upload of the same content created the row first
+            if time.monotonic() > deadline:
+                raise BlobBusy(f"Blob {content_hash} is being collected")
+            time.sleep(0.01)
+
+    def release(self, cur, content_hash):
+        cur.execute("UPDATE FileBlobs SET RefCount = RefCount - 1 WHERE ContentHash = ? AND RefCount > 0",
+                    content_hash)
+
+    def place(self, spool, content_hash):
+        """
+        Moves a committed upload's HashingFile into the store, or drops it
+        if the content is already there. Returns the blob path.
+        """
+        path = self.path(content_hash)
+        if os.path.exists(path):
+            spool.close()
+        else:
+            spool.commit(path)
+        return path
+
+    def collect(self, conn, content_hashes=None):
+        """
+        Deletes unreferenced blobs (all of them, or only `content_hashes`)
+        and returns the hashes removed. A blob whose file cannot be
+        removed, e.g. one still open for a download on Windows, is left
+        for the next run.
+        """
+        cur = conn.cursor()
+        removed = []
+        try:
+            if content_hashes is None:
+                cur.execute("SELECT ContentHash FROM FileBlobs WHERE RefCount = 0")
+                content_hashes = [row[0] for row in cur.fetchall()]
+
+            for content_hash in content_hashes:
+                cur.execute("UPDATE FileBlobs SET RefCount = -1 WHERE ContentHash = ? AND RefCount = 0",
+                            content_hash)
+                claimed = cur.rowcount == 1
+                conn.commit()
+                if not claimed:
+                    continue
+                try:
+                    for path in (self.path(content_hash), self.flat_path(content_hash)):
+                        if os.path.exists(path):
+                            os.remove(path)
+                except OSError:
+                    cur.execute("UPDATE FileBlobs SET RefCount = 0 WHERE ContentHash = ? AND RefCount = -1",
+                                content_hash)
+                    conn.commit()
+                    continue
+                cur.execute("DELETE FROM FileBlobs WHERE ContentHash = ? AND RefCount = -1", content_hash)
+                conn.commit()
+                removed.append(content_hash)
+        finally:
+            cur.close()
+        return removed
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Remove medical file blobs no MedicalFiles row refers to")
+    parser.add_argument("--sqlite", help="SQLite database file (default: the SQL Server database in db.py)")
+    parser.add_argument("--root", default=os.path.join("uploads", "medical_files"), help="blob directory")
+    args = parser.parse_args()
+
+    if args.sqlite:
+        import sqlite_backend
+        conn = sqlite_backend.connect(args.sqlite)
+    else:
+        import db
+        conn = db.get_db_connection()
+
+    try:
+        removed = BlobStore(args.root).collect(conn)
+        print(f"Removed {len(removed)} unreferenced blob(s)")
+    finally:
+        conn.close()
@@ -0,0 +1,126 @@
+import collections
+import hashlib
+import threading
+import zlib
+
+# zlib wbits per Content-Encoding: gzip framing, or the zlib stream HTTP calls "deflate"
+_WBITS = {"gzip": 31, "deflate": 15}
+
+
+class CompressedCache:
+    """
+    LRU of compressed bodies keyed by (encoding, digest of the plain body),
+    bounded by total size. Hashing is an order of magnitude cheaper than
+    deflate, so identical hot responses are compressed once.
+    """
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            data = self._entries.get(key)
+            if data is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return data
+
+    def put(self, key, data):
+        if len(data) > self.max_bytes:
+            return
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self.size -= len(old)
+            self._entries[key] = data
+            self.size += len(data)
+            while self.size > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self.size -= len(evicted)
+
+
+class ResponseCompressor:
+    """
+    Negotiated gzip/deflate for Flask responses. Bodies under `min_size`,
+    non-text types, file responses (send_file, with byte ranges) and
+    responses that already have a Content-Encoding are left alone; streamed
+    responses are compressed chunk by chunk.
+    """
+
+    def __init__(self, min_size=1024, level=6, cache_bytes=32 * 1024 * 1024,
+                 mimetypes=("application/json", "text/plain", "text/html", "text/csv", "text/css",
+                            "application/javascript")):
+        self.min_size = min_size
+        self.level = level
+        self.mimetypes = frozenset(mimetypes)
+        self.cache = CompressedCache(cache_bytes) if cache_bytes else None
+
+    def compress(self, response, accept_encodings):
+        """
+        Compresses `response` in place for the best encoding the client
+        accepts (werkzeug's request.accept_encodings) and returns it.
+        """
+        mimetype = response.mimetype or ""
+        if ((mimetype not in self.mimetypes and not mimetype.endswith("+json")) or response.status_code < 200
+                or response.status_code in (204, 206, 304) or "Content-Encoding" in response.headers):
+            return response
+        # Files from send_file: their ETag and byte ranges describe the stored bytes, which
+        # If-None-Match and If-Range must keep matching
+        if response.direct_passthrough or "Accept-Ranges" in response.headers:
+            return response
+        response.vary.add("Accept-Encoding")
+
+        encoding = accept_encodings.best_match(list(_WBITS))
+        if encoding is None:
+            return response
+
+        if response.is_streamed:
+            response.response = self._stream(response.response, encoding)
+            response.headers.pop("Content-Length", None)
+        else:
+            body = response.get_data()
+            if len(body) < self.min_size:
+                return response
+            response.set_data(self._compress_body(body, encoding))
+
+        response.headers["Content-Encoding"] = encoding
+        etag, weak = response.get_etag()
+        if etag:
+            response.set_etag(f"{etag}-{encoding}", weak)
+        return response
+
+    def _compress_body(self, body, encoding):
+        if self.cache is None:
+            return self._deflate(body, encoding)
+        key = (encoding, hashlib.blake2b(body, digest_size=16).digest())
+        data = self.cache.get(key)
+        if data is None:
+            data = self._deflate(body, encoding)
+            self.cache.put(key, data)
+        return data
+
+    def _deflate(self, body, encoding):
+        compressor = zlib.compressobj(self.level, zlib.DEFLATED, _WBITS[encoding])
+        return compressor.compress(body) + compressor.flush()
+
+    def _stream(self, chunks, encoding):
+        compressor = zlib.compressobj(self.level, zlib.DEFLATED, _WBITS[encoding])
+        try:
+            for chunk in chunks:
+                if isinstance(chunk, str):
+                    chunk = chunk.encode()
+                data = compressor.compress(chunk)
+                if data:
+                    yield data
+            yield compressor.flush()
+        finally:
+            close = getattr(chunks, "close", None)
+            if close is not None:
+                close()
@@ -0,0 +1,85 @@
+import time
+
+
+class InstrumentedCursor:
+    """
+    Wraps a pyodbc cursor and reports every execute and fetch to listeners.
+
+    Listeners implement on_execute(sql, params, elapsed, many) and
+    on_fetch(rows, elapsed). Everything else is passed through to the
+    real cursor, including attribute assignment (fast_executemany).
+    """
+
+    def __init__(self, cursor, listeners):
+        object.__setattr__(self, "_cursor", cursor)
+        object.__setattr__(self, "_listeners", listeners)
+
+    def execute(self, sql, *params):
+        started = time.perf_counter()
+        self._cursor.execute(sql, *params)
+        elapsed = time.perf_counter() - started
+        for listener in self._listeners:
+            listener.on_execute(sql, params, elapsed, False)
+        return self
+
+    def executemany(self, sql, seq_of_params):
+        started = time.perf_counter()
+        self._cursor.executemany(sql, seq_of_params)
+        elapsed = time.perf_counter() - started
+        for listener in self._listeners:
+            listener.on_execute(sql, seq_of_params, elapsed, True)
+
+    def fetchone(self):
+        started = time.perf_counter()
+        row = self._cursor.fetchone()
+        self._fetched(0 if row is None else 1, started)
+        return row
+
+    def fetchmany(self, size=None):
+        started = time.perf_counter()
+        rows = self._cursor.fetchmany(size) if size is not None else self._cursor.fetchmany()
+        self._fetched(len(rows), started)
+        return rows
+
+    def fetchall(self):
+        started = time.perf_counter()
+        rows = self._cursor.fetchall()
+        self._fetched(len(rows), started)
+        return rows
+
+    def __iter__(self):
+        while True:
+            row = self.fetchone()
+            if row is None:
+                return
+            yield row
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+    def __setattr__(self, name, value):
+        setattr(self._cursor, name, value)
+
+    def _fetched(self, rows, started):
+        elapsed = time.perf_counter() - started
+        for listener in self._listeners:
+            listener.on_fetch(rows, elapsed)
+
+
+class InstrumentedConnection:
+    """
+    Wraps a pyodbc connection so its cursors are instrumented.
+    """
+
+    def __init__(self, conn, listeners):
+        object.__setattr__(self, "_conn", conn)
+        object.__setattr__(self, "_listeners", listeners)
+
+    def cursor(self):
+        return InstrumentedCursor(self._conn.cursor(), self._listeners)
+
+    def __getattr__(self, name):
+        return getattr(self._conn, name)
+
+    def __setattr__(self, name, value):
+        setattr(self._conn, name, value)
@@ -0,0 +1,109 @@
+import atexit
+import logging
+import threading
+
+log = logging.getLogger("write_behind")
+
+
+class WriteBehindExecutor:
+    """
+    Defers non-critical side effects (LastLogin updates, access logging,
+    cache refresh) off the request path.
+
+    Work is submitted under a (kind, key) pair. Pending items with the same
+    pair are coalesced so only the latest value is kept, and a background
+    thread hands each kind's pending items to its flush handler in batches.
+    """
+
+    def __init__(self, flush_interval=2.0, max_pending=10000, logger=None):
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self.log = logger or log
+        self.dropped = 0  # items lost to failed flushes
+        self._handlers = {}
+        self._pending = {}
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stopped = False
+        self._thread = None
+
+    def register(self, kind, handler):
+        """
+        Registers the flush handler for a kind of work.
+        The handler receives a dict of {key: value} and must not raise
+        for a single bad item if the rest of the batch can still be applied.
+        """
+        self._handlers[kind] = handler
+
+    def submit(self, kind, key, value=None):
+        """
+        Queues a side effect. Returns immediately unless the queue is full,
+        in which case the item is applied on the caller's thread so the
+        queue never grows past max_pending.
+        """
+        if kind not in self._handlers:
+            raise KeyError(f"No write-behind handler registered for '{kind}'")
+
+        with self._lock:
+            if self._stopped:
+                run_inline = True
+            else:
+                batch = self._pending.setdefault(kind, {})
+                run_inline = key not in batch and self._size() >= self.max_pending
+                if not run_inline:
+                    batch[key] = value
+                    self._ensure_started()
+
+        if run_inline:
+            self._run_handler(kind, {key: value})
+
+    def flush(self):
+        """
+        Applies everything that is currently pending.
+        """
+        with self._lock:
+            pending, self._pending = self._pending, {}
+
+        for kind, batch in pending.items():
+            if batch:
+                self._run_handler(kind, batch)
+
+    def shutdown(self):
+        """
+        Stops the background thread and drains whatever is still queued.
+        """
+        with self._lock:
+            self._stopped = True
+            thread = self._thread
+        self._wakeup.set()
+        if thread is not None:
+            thread.join()
+        self.flush()
+
+    def pending_count(self):
+        with self._lock:
+            return self._size()
+
+    def _size(self):
+        return sum(len(batch) for batch in self._pending.values())
+
+    def _ensure_started(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="write-behind", daemon=True)
+            self._thread.start()
+            atexit.register(self.shutdown)
+
+    def _run(self):
+        while not self._stopped:
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            self.flush()
+
+    def _run_handler(self, kind, batch):
+        try:
+            self._handlers[kind](batch)
+        except Exception:
+            with self._lock:
+                self.dropped += len(batch)
+            self.log.exception("Write-behind flush for '%s' failed, %d item(s) dropped", kind, len(batch))
+
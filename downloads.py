@@ -0,0 +1,180 @@
+import mimetypes
+import os
+import threading
+import time
+import zipfile
+from collections import OrderedDict
+from urllib.parse import quote
+
+from flask import current_app, request, send_file
+from werkzeug.exceptions import RequestedRangeNotSatisfiable
+
+OFFLOAD_MODES = (None, "x-accel-redirect", "x-sendfile")
+
+# Formats that are already compressed; deflating them again costs CPU for nothing
+STORED_EXTENSIONS = frozenset({"jpg", "jpeg", "png", "pdf", "dcm", "xlsx", "zip", "gz"})
+
+
+class FileMetadataCache:
+    """
+    Bounded LRU of MedicalFiles download metadata by FileID, so repeated
+    downloads skip the database. Entries expire after `ttl` seconds, which
+    bounds how long a delete made by another worker goes unnoticed here.
+    """
+
+    def __init__(self, max_entries=10000, ttl=60.0):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_or_load(self, file_id, load):
+        """
+        Returns the cached metadata for `file_id`, or calls `load(file_id)`
+        and caches its result. A None result (no such file) is not cached.
+        """
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(file_id)
+            if entry is not None:
+                metadata, expires_at = entry
+                if expires_at > now:
+                    self._entries.move_to_end(file_id)
+                    self.hits += 1
+                    return metadata
+                del self._entries[file_id]
+            self.misses += 1
+
+        metadata = load(file_id)
+        if metadata is None:
+            return None
+
+        with self._lock:
+            self._entries[file_id] = (metadata, now + self.ttl)
+            self._entries.move_to_end(file_id)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return metadata
+
+    def invalidate(self, file_id):
+        with self._lock:
+            self._entries.pop(file_id, None)
+
+    def stats(self):
+        with self._lock:
+            return {"size": len(self._entries), "hits": self.hits, "misses": self.misses}
+
+
+def send_stored_file(path, download_name, etag=None):
+    """
+    Sends a file from UPLOAD_FOLDER as an attachment. `etag` should be the
+    content hash when there is one; files without one get werkzeug's
+    mtime-based tag.
+
+    With DOWNLOAD_OFFLOAD unset the worker streams the file itself and
+    answers Range requests with 206. With 'x-accel-redirect' (nginx) or
+    'x-sendfile' (Apache, lighttpd) it only answers conditional requests
+    and hands the transfer, ranges included, to the front proxy.
+    """
+    mode = current_app.config['DOWNLOAD_OFFLOAD']
+    if mode is None:
+        try:
+            response = send_file(path, as_attachment=True, download_name=download_name, etag=etag or True,
+                                 conditional=True)
+        except RequestedRangeNotSatisfiable as e:
+            return e.get_response()
+        if response.status_code == 200:
+            response.accept_ranges = "bytes"  # werkzeug only sets it on 206s
+        return response
+
+    response = current_app.response_class(
+        mimetype=mimetypes.guess_type(download_name)[0] or "application/octet-stream")
+    response.headers.set("Content-Disposition", "attachment", filename=download_name)
+    response.cache_control.no_cache = True
+    if etag:
+        response.set_etag(etag)
+    else:
+        stat = os.stat(path)
+        response.set_etag(f"{stat.st_mtime}-{stat.st_size}")
+    response = response.make_conditional(request.environ)
+    if response.status_code != 200:
+        return response
+
+    if mode == "x-accel-redirect":
+        relative = os.path.relpath(os.path.abspath(path), os.path.abspath(current_app.config['UPLOAD_FOLDER']))
+        response.headers["X-Accel-Redirect"] = (current_app.config['DOWNLOAD_ACCEL_PREFIX'].rstrip("/") + "/"
+                                                + quote(relative.replace(os.sep, "/")))
+    elif mode == "x-sendfile":
+        response.headers["X-Sendfile"] = os.path.abspath(path)
+    else:
+        raise ValueError(f"DOWNLOAD_OFFLOAD must be one of {OFFLOAD_MODES}, not {mode!r}")
+    return response
+
+
+class _ZipSink:
+    """
+    Write-only target for ZipFile. Without tell()/seek() ZipFile writes
+    sizes in data descriptors after each member, so the archive can be
+    sent as it is produced.
+    """
+
+    def __init__(self):
+        self._chunks = []
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def stream_zip(entries, chunk_size=1024 * 1024, stored_extensions=STORED_EXTENSIONS):
+    """
+    Yields a ZIP archive of `entries`, an iterable of (archive name, open
+    binary file), while reading each file, holding no more than one chunk
+    in memory, and closes each file once it is written. Pass a generator
+    to open files only as they are reached. Members whose extension is in
+    `stored_extensions` are stored, others deflated.
+    """
+    sink = _ZipSink()
+    with zipfile.ZipFile(sink, "w", allowZip64=True) as archive:
+        for name, source in entries:
+            stat = os.fstat(source.fileno())
+            info = zipfile.ZipInfo(name, date_time=time.localtime(max(stat.st_mtime, 315532800))[:6])
+            info.file_size = stat.st_size  # lets ZipFile pick Zip64 up front for large studies
+            extension = name.rsplit(".", 1)[-1].lower() if "." in name else ""
+            info.compress_type = zipfile.ZIP_STORED if extension in stored_extensions else zipfile.ZIP_DEFLATED
+
+            with source, archive.open(info, "w") as member:
+                for chunk in iter(lambda: source.read(chunk_size), b""):
+                    member.write(chunk)
+                    data = sink.drain()
+                    if data:
+                        yield data
+            yield sink.drain()
+    yield sink.drain()
+
+
+def archive_names(filenames):
+    """
+    Archive member names for `filenames`, with "name (2).ext" for repeats.
+    """
+    used = set()
+    names = []
+    for filename in filenames:
+        name, count = filename, 1
+        while name.lower() in used:
+            count += 1
+            stem, dot, extension = filename.rpartition(".")
+            name = f"{stem} ({count}).{extension}" if dot else f"{filename} ({count})"
+        used.add(name.lower())
+        names.append(name)
+    return names
@@ -0,0 +1,93 @@
+import threading
+import time
+
+CRITICAL = 0
+NORMAL = 1
+LOW = 2
+
+
+class WindowAverage:
+    """
+    Mean of samples seen in the last `window` seconds, kept in one-second
+    buckets so old samples age out even when no new ones arrive.
+    """
+
+    def __init__(self, window=10):
+        self.window = window
+        self._buckets = [[0, 0.0, 0] for _ in range(window)]  # [second, total, count]
+        self._lock = threading.Lock()
+
+    def add(self, value):
+        second = int(time.monotonic())
+        with self._lock:
+            bucket = self._buckets[second % self.window]
+            if bucket[0] != second:
+                bucket[0], bucket[1], bucket[2] = second, 0.0, 0
+            bucket[1] += value
+            bucket[2] += 1
+
+    def mean(self):
+        oldest = int(time.monotonic()) - self.window
+        total = count = 0
+        with self._lock:
+            for second, bucket_total, bucket_count in self._buckets:
+                if second > oldest:
+                    total += bucket_total
+                    count += bucket_count
+        return total / count if count else 0.0
+
+
+class LoadShedder:
+    """
+    Adaptive admission control.
+
+    Pressure is the worst ratio of in-flight requests, mean DB connection
+    wait and mean request latency to their budgets. Low-priority endpoints
+    are shed once pressure passes 1, normal ones once it passes 2, and
+    critical ones (health check, login, dispense) are never shed.
+    """
+
+    def __init__(self, max_in_flight=64, db_wait_budget=0.5, latency_budget=2.0,
+                 low_priority=(), critical=(), window=10):
+        self.max_in_flight = max_in_flight
+        self.db_wait_budget = db_wait_budget
+        self.latency_budget = latency_budget
+        self.db_wait = WindowAverage(window)
+        self.latency = WindowAverage(window)
+        self.in_flight = 0
+        self.shed_count = 0
+        self._priorities = dict.fromkeys(low_priority, LOW)
+        self._priorities.update(dict.fromkeys(critical, CRITICAL))
+        self._lock = threading.Lock()
+
+    def priority(self, endpoint):
+        return self._priorities.get(endpoint, NORMAL)
+
+    def pressure(self):
+        return max(self.in_flight / self.max_in_flight,
+                   self.db_wait.mean() / self.db_wait_budget,
+                   self.latency.mean() / self.latency_budget)
+
+    def try_enter(self, endpoint):
+        """
+        Returns True and counts the request as in flight if it is admitted.
+        """
+        priority = self.priority(endpoint)
+        if priority != CRITICAL and self.pressure() > (1 if priority == LOW else 2):
+            with self._lock:
+                self.shed_count += 1
+            return False
+
+        with self._lock:
+            self.in_flight += 1
+        return True
+
+    def leave(self, endpoint, elapsed):
+        with self._lock:
+            self.in_flight -= 1
+        # Long-running exports would otherwise make everything look slow
+        if self.priority(endpoint) != LOW:
+            self.latency.add(elapsed)
+
+    def record_db_wait(self, seconds):
+        self.db_wait.add(seconds)
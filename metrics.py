@@ -0,0 +1,157 @@
+import bisect
+import threading
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+BYTES_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216)
+ROWS_BUCKETS = (0, 1, 10, 100, 1000, 10000, 100000)
+
+
+def _labels(names, values):
+    if not names:
+        return ""
+    pairs = ",".join(f'{name}="{str(value)}"' for name, value in zip(names, values))
+    return "{" + pairs + "}"
+
+
+class Histogram:
+    """
+    Prometheus-style cumulative histogram keyed by a tuple of label values.
+    """
+
+    def __init__(self, name, help_text, label_names=(), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = label_names
+        self.buckets = buckets
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, *labels):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                # one slot per bucket, then +Inf, sum
+                series = self._series[labels] = [0] * (len(self.buckets) + 1) + [0.0]
+            series[index] += 1
+            series[-1] += value
+
+    def render(self, lines):
+        lines.append(f"# HELP {self.name} {self.help_text}")
+        lines.append(f"# TYPE {self.name} histogram")
+        with self._lock:
+            items = [(labels, list(series)) for labels, series in self._series.items()]
+        for labels, series in sorted(items):
+            names = self.label_names + ("le",)
+            cumulative = 0
+            for bound, count in zip(self.buckets + ("+Inf",), series):
+                cumulative += count
+                lines.append(f"{self.name}_bucket{_labels(names, labels + (bound,))} {cumulative}")
+            lines.append(f"{self.name}_sum{_labels(self.label_names, labels)} {series[-1]}")
+            lines.append(f"{self.name}_count{_labels(self.label_names, labels)} {cumulative}")
+
+
+class Counter:
+    def __init__(self, name, help_text, label_names=()):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = label_names
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount, *labels):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def render(self, lines):
+        lines.append(f"# HELP {self.name} {self.help_text}")
+        lines.append(f"# TYPE {self.name} counter")
+        with self._lock:
+            items = sorted(self._values.items())
+        for labels, value in items:
+            lines.append(f"{self.name}{_labels(self.label_names, labels)} {value}")
+
+
+class RequestStats:
+    """
+    Per-request totals filled in by the DB listener and the JSON provider.
+    """
+
+    __slots__ = ("execute_time", "fetch_time", "serialize_time", "rows", "statements")
+
+    def __init__(self):
+        self.execute_time = 0.0
+        self.fetch_time = 0.0
+        self.serialize_time = 0.0
+        self.rows = 0
+        self.statements = 0
+
+
+class StatsListener:
+    """
+    DB listener that adds cursor timings to the current request's stats.
+    `get_stats` returns the RequestStats for the active request, or None.
+    """
+
+    def __init__(self, get_stats):
+        self.get_stats = get_stats
+
+    def on_execute(self, sql, params, elapsed, many):
+        stats = self.get_stats()
+        if stats is not None:
+            stats.execute_time += elapsed
+            stats.statements += 1
+
+    def on_fetch(self, rows, elapsed):
+        stats = self.get_stats()
+        if stats is not None:
+            stats.fetch_time += elapsed
+            stats.rows += rows
+
+
+class Metrics:
+    def __init__(self):
+        route = ("route",)
+        self.request_latency = Histogram(
+            "http_request_duration_seconds", "Request latency",
+            ("route", "method", "status"))
+        self.db_execute = Histogram(
+            "db_execute_seconds", "Time per request spent in cursor.execute", route)
+        self.db_fetch = Histogram(
+            "db_fetch_seconds", "Time per request spent in cursor.fetch*", route)
+        self.serialize = Histogram(
+            "response_serialize_seconds", "Time per request spent encoding JSON", route)
+        self.rows = Histogram(
+            "db_rows_fetched", "Rows fetched per request", route, ROWS_BUCKETS)
+        self.response_bytes = Histogram(
+            "http_response_bytes", "Response body size", route, BYTES_BUCKETS)
+        self.db_connect_wait = Histogram(
+            "db_connect_wait_seconds", "Time to obtain a database connection")
+        self.statements = Counter(
+            "db_statements_total", "SQL statements executed", route)
+
+    def observe_request(self, route, method, status, elapsed, response_bytes, stats):
+        self.request_latency.observe(elapsed, route, method, str(status))
+        if response_bytes is not None:
+            self.response_bytes.observe(response_bytes, route)
+        if stats.statements:
+            self.db_execute.observe(stats.execute_time, route)
+            self.db_fetch.observe(stats.fetch_time, route)
+            self.rows.observe(stats.rows, route)
+            self.statements.inc(stats.statements, route)
+        if stats.serialize_time:
+            self.serialize.observe(stats.serialize_time, route)
+
+    def render(self, gauges=None):
+        """
+        Returns all metrics in the Prometheus text exposition format.
+        `gauges` is an optional {name: value} of point-in-time values.
+        """
+        lines = []
+        for metric in (self.request_latency, self.db_execute, self.db_fetch, self.serialize,
+                       self.rows, self.response_bytes, self.db_connect_wait, self.statements):
+            metric.render(lines)
+        for name, value in (gauges or {}).items():
+            lines.append(f"# TYPE {name} gauge")
+            lines.append(f"{name} {value}")
+        return "\n".join(lines) + "\n"
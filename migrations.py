@@ -0,0 +1,186 @@
+import argparse
+import datetime
+import logging
+import os
+import re
+
+# Versioned schema scripts live in schema/<backend>/NNNN_name.sql and are
+# applied in order; the SchemaVersion table records which ones ran.
+
+log = logging.getLogger("migrations")
+
+SCHEMA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "schema")
+
+_FILENAME = re.compile(r"^(\d{4})_(\w+)\.sql$")
+_GO = re.compile(r"^\s*GO\s*$", re.IGNORECASE | re.MULTILINE)
+
+_VERSION_TABLE = {
+    "sqlite": """
+        CREATE TABLE IF NOT EXISTS SchemaVersion (
+            Version INTEGER PRIMARY KEY,
+            Name TEXT NOT NULL,
+            AppliedAt DATETIME NOT NULL
+        )
+    """,
+    "mssql": """
+        IF OBJECT_ID('SchemaVersion', 'U') IS NULL
+        CREATE TABLE SchemaVersion (
+            Version INT PRIMARY KEY,
+            Name NVARCHAR(200) NOT NULL,
+            AppliedAt DATETIME NOT NULL
+        )
+    """,
+}
+
+
+class SchemaVersionError(Exception):
+    pass
+
+
+def available(backend):
+    """
+    Returns [(version, name, path)] for the backend's scripts, in order.
+    """
+    directory = os.path.join(SCHEMA_DIR, backend)
+    scripts = []
+    for filename in sorted(os.listdir(directory)):
+        match = _FILENAME.match(filename)
+        if match:
+            scripts.append((int(match.group(1)), match.group(2), os.path.join(directory, filename)))
+    return scripts
+
+
+def latest_version(backend):
+    scripts = available(backend)
+    return scripts[-1][0] if scripts else 0
+
+
+def current_version(conn, backend):
+    cur = conn.cursor()
+    try:
+        if backend == "sqlite":
+            cur.execute("SELECT COUNT(*) FROM sqlite_master WHERE type = 'table' AND name = 'SchemaVersion'")
+        else:
+            cur.execute("SELECT COUNT(*) FROM sys.tables WHERE name = 'SchemaVersion'")
+        if not cur.fetchone()[0]:
+            return 0
+        cur.execute("SELECT MAX(Version) FROM SchemaVersion")
+        return cur.fetchone()[0] or 0
+    finally:
+        cur.close()
+
+
+def _record(cur, version, name):
+    cur.execute("INSERT INTO SchemaVersion (Version, Name, AppliedAt) VALUES (?, ?, ?)",
+                (version, name, datetime.datetime.now()))
+
+
+def migrate(conn, backend, target=None):
+    """
+    Applies every script newer than the current version (up to `target`),
+    each in its own transaction. Returns the versions applied.
+    """
+    _ensure_version_table(conn, backend)
+    current = current_version(conn, backend)
+    applied = []
+    for version, name, path in available(backend):
+        if version <= current or (target is not None and version > target):
+            continue
+        with open(path, encoding="utf-8") as f:
+            script = f.read()
+
+        if backend == "sqlite":
+            # executescript commits first, so the script and its version row share one transaction
+            try:
+                conn.executescript(f"BEGIN;\n{script}\n;INSERT INTO SchemaVersion (Version, Name, AppliedAt) "
+                                   f"VALUES ({version}, '{name}', datetime('now', 'localtime'));\nCOMMIT;")
+            except Exception:
+                conn.rollback()  # a failing statement leaves the script's BEGIN open
+                raise
+        else:
+            cur = conn.cursor()
+            try:
+                # GO separates batches; CREATE VIEW/PROCEDURE must start one
+                for batch in _GO.split(script):
+                    if batch.strip():
+                        cur.execute(batch)
+                _record(cur, version, name)
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+            finally:
+                cur.close()
+        log.info("Applied migration %04d_%s", version, name)
+        applied.append(version)
+    return applied
+
+
+def baseline(conn, backend, version):
+    """
+    Marks scripts up to `version` as applied without running them, for
+    databases whose schema was created by hand.
+    """
+    _ensure_version_table(conn, backend)
+    current = current_version(conn, backend)
+    cur = conn.cursor()
+    try:
+        for script_version, name, _ in available(backend):
+            if current < script_version <= version:
+                _record(cur, script_version, name)
+        conn.commit()
+    finally:
+        cur.close()
+
+
+def check(conn, backend):
+    """
+    Raises SchemaVersionError unless the database is at the latest version.
+    """
+    current, latest = current_version(conn, backend), latest_version(backend)
+    if current != latest:
+        raise SchemaVersionError(
+            f"Database schema is at version {current}, this code expects {latest}. "
+            f"Run `python migrations.py` to upgrade"
+            + (" (or `--baseline 1` first if the schema was created by hand)." if current == 0 else "."))
+    return current
+
+
+def _ensure_version_table(conn, backend):
+    cur = conn.cursor()
+    try:
+        cur.execute(_VERSION_TABLE[backend])
+        conn.commit()
+    finally:
+        cur.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Apply versioned schema migrations")
+    parser.add_argument("--sqlite", help="SQLite database file (default: the SQL Server database in db.py)")
+    parser.add_argument("--target", type=int, default=None, help="stop at this version")
+    parser.add_argument("--baseline", type=int, default=None,
+                        help="mark versions up to this one as applied without running them")
+    parser.add_argument("--check", action="store_true", help="only report whether the schema is current")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+
+    if args.sqlite:
+        import sqlite_backend
+        backend, conn = "sqlite", sqlite_backend.connect(args.sqlite)
+    else:
+        import db
+        backend, conn = "mssql", db.get_db_connection()
+
+    try:
+        if args.check:
+            current, latest = current_version(conn, backend), latest_version(backend)
+            print(f"Schema version {current}, latest {latest}")
+            raise SystemExit(0 if current == latest else 1)
+        if args.baseline is not None:
+            baseline(conn, backend, args.baseline)
+        applied = migrate(conn, backend, args.target)
+        print(f"Schema at version {current_version(conn, backend)}"
+              + ("" if applied else " (nothing to apply)"))
+    finally:
+        conn.close()
@@ -0,0 +1,117 @@
+import base64
+import hashlib
+import hmac
+import os
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+ALGORITHM = "pbkdf2_sha256"
+
+_SHA256_HEX = re.compile(r"^[0-9a-fA-F]{64}$")
+
+
+class PoolBusy(Exception):
+    """
+    Raised when the hashing pool and its queue are full.
+    """
+
+
+def _b64(raw):
+    return base64.b64encode(raw).decode("ascii").rstrip("=")
+
+
+def _unb64(text):
+    return base64.b64decode(text + "=" * (-len(text) % 4))
+
+
+def _pbkdf2(password, salt, iterations):
+    return hashlib.pbkdf2_hmac("sha256", password.encode(), salt, iterations)
+
+
+def encode_hash(password, iterations, salt=None):
+    salt = salt or os.urandom(16)
+    return f"{ALGORITHM}${iterations}${_b64(salt)}${_b64(_pbkdf2(password, salt, iterations))}"
+
+
+def check_hash(password, stored):
+    """
+    Returns True if `password` matches `stored`, which is either a PBKDF2
+    hash or a legacy value (unsalted SHA-256 hex, or plaintext from before
+    passwords were hashed).
+    """
+    if stored.startswith(ALGORITHM + "$"):
+        _, iterations, salt, expected = stored.split("$")
+        actual = _pbkdf2(password, _unb64(salt), int(iterations))
+        return hmac.compare_digest(actual, _unb64(expected))
+
+    actual = hashlib.sha256(password.encode()).digest()
+    if _SHA256_HEX.match(stored):
+        # Only the password's digest may match: sending the stored hex itself must not
+        return hmac.compare_digest(actual, bytes.fromhex(stored))
+    return hmac.compare_digest(actual, hashlib.sha256(stored.encode()).digest())
+
+
+def needs_upgrade(stored, iterations):
+    if not stored.startswith(ALGORITHM + "$"):
+        return True
+    return int(stored.split("$")[1]) < iterations
+
+
+class PasswordHasher:
+    """
+    Runs PBKDF2 on a dedicated, fixed-size thread pool.
+
+    hashlib releases the GIL while deriving keys, so the pool uses real
+    cores without blocking request threads. At most `workers + max_queue`
+    jobs are admitted; a caller that cannot get a slot within
+    `queue_timeout` seconds gets PoolBusy instead of waiting indefinitely.
+    """
+
+    def __init__(self, iterations=260000, workers=4, max_queue=32, queue_timeout=0.5):
+        self.iterations = iterations
+        self.queue_timeout = queue_timeout
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="password-hash")
+        self._slots = threading.BoundedSemaphore(workers + max_queue)
+        # Matches no password; costs the same to check as a real hash
+        self._dummy_hash = f"{ALGORITHM}${iterations}${_b64(os.urandom(16))}${_b64(os.urandom(32))}"
+
+    def hash(self, password):
+        return self._run(encode_hash, password, self.iterations)
+
+    def verify(self, password, stored):
+        """
+        Checks `password` against `stored`. With `stored` None (no such
+        user) the password is checked against a dummy hash and False is
+        returned, so response time does not reveal which usernames exist.
+        """
+        if stored is None:
+            self._run(check_hash, password, self._dummy_hash)
+            return False
+        return self._run(check_hash, password, stored)
+
+    def needs_upgrade(self, stored):
+        return needs_upgrade(stored, self.iterations)
+
+    def upgrade_later(self, password, on_done):
+        """
+        Hashes `password` in the background and passes the result to
+        `on_done`. Skipped when the pool is busy; the next login retries.
+        """
+        if not self._slots.acquire(blocking=False):
+            return
+
+        def done(future):
+            self._slots.release()
+            if future.exception() is None:
+                on_done(future.result())
+
+        self._pool.submit(encode_hash, password, self.iterations).add_done_callback(done)
+
+    def _run(self, fn, *args):
+        if not self._slots.acquire(timeout=self.queue_timeout):
+            raise PoolBusy("Password hashing pool is full")
+        try:
+            return self._pool.submit(fn, *args).result()
+        finally:
+            self._slots.release()
@@ -0,0 +1,76 @@
+import itertools
+import os
+import re
+import threading
+
+from werkzeug.middleware.profiler import ProfilerMiddleware
+
+
+class SampledProfiler:
+    """
+    WSGI middleware that runs werkzeug's ProfilerMiddleware on a sample of
+    requests instead of all of them.
+
+    A request is profiled when its path starts with one of `routes` and
+    either it is the `every`-th such request or `force(environ)` returns
+    True (an admin asking for a profile). Only one request is profiled at a
+    time since cProfile cannot run in several threads at once; the rest
+    are served normally. The newest `max_files` .prof files are kept.
+
+    ProfilerMiddleware reads the whole response into memory before
+    returning it, so paths matching a regex in `exclude` (file downloads,
+    archives, uploads) are never profiled and keep streaming.
+    """
+
+    def __init__(self, app, profile_dir, every=100, routes=("/",), force=None, max_files=200, exclude=()):
+        self.app = app
+        self.profile_dir = profile_dir
+        self.every = every
+        self.routes = tuple(routes)
+        self.exclude = [re.compile(pattern) for pattern in exclude]
+        self.force = force
+        self.max_files = max_files
+        self._counter = itertools.count(1)
+        self._busy = threading.Lock()
+        self._profiler = ProfilerMiddleware(app, stream=None, profile_dir=profile_dir,
+                                            filename_format=self._filename)
+        os.makedirs(profile_dir, exist_ok=True)
+
+    def __call__(self, environ, start_response):
+        if not self._should_profile(environ) or not self._busy.acquire(blocking=False):
+            return self.app(environ, start_response)
+        try:
+            return self._profiler(environ, start_response)
+        finally:
+            self._busy.release()
+            self._rotate()
+
+    def list_profiles(self):
+        profiles = []
+        for entry in os.scandir(self.profile_dir):
+            if entry.name.endswith(".prof"):
+                stat = entry.stat()
+                profiles.append({"name": entry.name, "size": stat.st_size, "modified": stat.st_mtime})
+        profiles.sort(key=lambda p: p["modified"], reverse=True)
+        return profiles
+
+    def _should_profile(self, environ):
+        path = environ.get("PATH_INFO", "")
+        if not path.startswith(self.routes) or any(pattern.search(path) for pattern in self.exclude):
+            return False
+        if self.force is not None and self.force(environ):
+            return True
+        return next(self._counter) % self.every == 0
+
+    def _filename(self, environ):
+        info = environ["werkzeug.profiler"]
+        path = environ.get("PATH_INFO", "").strip("/").replace("/", ".") or "root"
+        return f"{info['time'] * 1000:.0f}.{environ['REQUEST_METHOD']}.{path}.{info['elapsed']:.0f}ms.prof"
+
+    def _rotate(self):
+        profiles = self.list_profiles()
+        for stale in profiles[self.max_files:]:
+            try:
+                os.remove(os.path.join(self.profile_dir, stale["name"]))
+            except FileNotFoundError:
+                pass
@@ -0,0 +1,128 @@
+import math
+import sqlite3
+import threading
+import time
+
+
+class MemoryBucketStore:
+    """
+    Token buckets held in this process. Each active key costs one small list;
+    buckets that have refilled completely are dropped on the next sweep.
+    """
+
+    def __init__(self, sweep_interval=60.0):
+        self.sweep_interval = sweep_interval
+        self._buckets = {}
+        self._lock = threading.Lock()
+        self._last_sweep = time.monotonic()
+
+    def take(self, key, rate, burst):
+        """
+        Takes one token. Returns 0 if allowed, otherwise the seconds until
+        a token will be available.
+        """
+        now = time.monotonic()
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                bucket = self._buckets[key] = [burst, now, burst / rate]
+            tokens = min(burst, bucket[0] + (now - bucket[1]) * rate)
+            bucket[1] = now
+
+            if now - self._last_sweep >= self.sweep_interval:
+                self._sweep(now)
+
+            if tokens >= 1:
+                bucket[0] = tokens - 1
+                return 0
+            bucket[0] = tokens
+            return (1 - tokens) / rate
+
+    def _sweep(self, now):
+        self._last_sweep = now
+        # bucket[2] is the time a bucket takes to refill from empty
+        idle = [k for k, b in self._buckets.items() if now - b[1] >= b[2]]
+        for key in idle:
+            del self._buckets[key]
+
+
+class SQLiteBucketStore:
+    """
+    Token buckets in a SQLite file, shared by every worker process on the
+    host. Each take is one short IMMEDIATE transaction.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+        conn = self._connection()
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS buckets (
+                key TEXT PRIMARY KEY,
+                tokens REAL NOT NULL,
+                updated REAL NOT NULL
+            )
+        """)
+
+    def take(self, key, rate, burst):
+        now = time.time()
+        conn = self._connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute("SELECT tokens, updated FROM buckets WHERE key = ?", (key,)).fetchone()
+            tokens = burst if row is None else min(burst, row[0] + (now - row[1]) * rate)
+            wait = 0 if tokens >= 1 else (1 - tokens) / rate
+            if not wait:
+                tokens -= 1
+            conn.execute("INSERT OR REPLACE INTO buckets (key, tokens, updated) VALUES (?, ?, ?)",
+                         (key, tokens, now))
+            if row is None:
+                # New keys are rare; use them to clear out buckets idle for an hour
+                conn.execute("DELETE FROM buckets WHERE updated < ?", (now - 3600,))
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return wait
+
+    def _connection(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+        return conn
+
+
+class RateLimiter:
+    """
+    Maps Flask endpoints to named token-bucket rules.
+
+    `rules` is {name: {"per_minute": n, "burst": n, "endpoints": [...]}},
+    with an optional "key" passed to the caller's key function to choose
+    what a rule's buckets are kept per. Requests to endpoints without a
+    rule are never limited.
+    """
+
+    def __init__(self, rules, store=None):
+        self.store = store or MemoryBucketStore()
+        self._by_endpoint = {}
+        for name, rule in rules.items():
+            limit = (name, rule["per_minute"] / 60.0, rule["burst"], rule.get("key"))
+            for endpoint in rule["endpoints"]:
+                self._by_endpoint[endpoint] = limit
+
+    def check(self, endpoint, get_client_key):
+        """
+        Returns None if the request may proceed, otherwise the whole number
+        of seconds to send in Retry-After. `get_client_key(key)` is only
+        called for endpoints that have a rule, with the rule's "key" option
+        (None if it has none).
+        """
+        limit = self._by_endpoint.get(endpoint)
+        if limit is None:
+            return None
+
+        name, rate, burst, key = limit
+        wait = self.store.take(f"{name}:{get_client_key(key)}", rate, burst)
+        return math.ceil(wait) if wait else None
@@ -0,0 +1,332 @@
+import datetime
+import hashlib
+import os
+import re
+import threading
+import time
+import uuid
+
+_UPLOAD_ID = re.compile(r"^[0-9a-f]{32}$")
+_SHA256 = re.compile(r"^[0-9a-fA-F]{64}$")
+
+
+def _is_int(value):
+    return isinstance(value, int) and not isinstance(value, bool)
+
+
+class UploadSessionError(Exception):
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.status = status
+
+
+class PartFile:
+    """
+    An assembled upload, with the commit()/close() interface of
+    uploads.HashingFile that BlobStore.place() expects.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._committed = False
+
+    def commit(self, destination):
+        os.makedirs(os.path.dirname(destination), exist_ok=True)
+        os.replace(self.path, destination)
+        self.path = destination
+        self._committed = True
+
+    def close(self):
+        if not self._committed and os.path.exists(self.path):
+            os.remove(self.path)
+
+
+class ResumableUploads:
+    """
+    Chunked, resumable uploads for files larger than one request may carry.
+
+    A session preallocates <folder>/<upload_id>.part at its final size and
+    every chunk is written in place at its offset, so chunks may arrive in
+    any order, be retried after a dropped connection, or be sent in
+    parallel. Offsets are multiples of `chunk_size`; each chunk's SHA-256 is
+    checked on arrival and recorded in UploadChunks, and checked again when
+    the file is assembled. Sessions idle for `ttl` seconds are removed by a
+    background sweep every `gc_interval` seconds.
+    """
+
+    def __init__(self, connect, folder, chunk_size=8 * 1024 * 1024, max_size=4 * 1024 ** 3,
+                 ttl=24 * 3600, gc_interval=600.0):
+        self.connect = connect
+        self.folder = folder
+        self.chunk_size = chunk_size
+        self.max_size = max_size
+        self.ttl = ttl
+        self.gc_interval = gc_interval
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def part_path(self, upload_id):
+        if not _UPLOAD_ID.match(upload_id):
+            raise UploadSessionError("Upload not found", 404)
+        return os.path.join(self.folder, f"{upload_id}.part")
+
+    def create(self, user_id, patient_id, visit_id, file_type, filename, file_ext, description, size,
+               content_hash=None):
+        self._ensure_started()
+        if not _is_int(size) or size <= 0:
+            raise UploadSessionError("File size must be a positive integer")
+        if content_hash is not None and not (isinstance(content_hash, str) and _SHA256.match(content_hash)):
+            raise UploadSessionError("sha256 must be a hex SHA-256 digest")
+        if size > self.max_size:
+            raise UploadSessionError(f"File exceeds the {self.max_size} byte upload limit", 413)
+
+        upload_id = uuid.uuid4().hex
+        path = self.part_path(upload_id)
+        os.makedirs(self.folder, exist_ok=True)
+        with open(path, "wb") as f:
+            f.truncate(size)  # sparse on most filesystems; chunks fill it in place
+
+        conn = self.connect()
+        cur = conn.cursor()
+        try:
+            cur.execute("""
+                INSERT INTO UploadSessions (UploadID, PatientID, VisitID, UploadedBy, FileType, FileName,
+                                            FileExtension, Description, TotalSize, ChunkSize, ContentHash)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            """, (upload_id, patient_id, visit_id, user_id, file_type, filename, file_ext, description,
+                  size, self.chunk_size, content_hash))
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            os.remove(path)
+            raise
+        finally:
+            cur.close()
+            conn.close()
+
+        return {"upload_id": upload_id, "size": size, "chunk_size": self.chunk_size,
+                "chunks": -(-size // self.chunk_size)}
+
+    def write_chunk(self, upload_id, user_id, offset, data, chunk_hash):
+        """
+        Verifies one chunk against its SHA-256 and writes it at `offset`.
+        Re-sending a chunk overwrites it.
+
+        The session row is claimed (and, until commit, locked) before the
+        file is opened, so assemble() waits for writes in flight and no
+        chunk can land in a file that is being verified or already moved
+        into the blob store.
+        """
+        path = self.part_path(upload_id)
+        if not _is_int(offset):
+            raise UploadSessionError("Offset must be an integer")
+        conn = self.connect()
+        cur = conn.cursor()
+        try:
+            session = self._session(cur, upload_id, user_id)
+            total, chunk_size = session.TotalSize, session.ChunkSize
+            if offset < 0 or offset >= total or offset % chunk_size:
+                raise UploadSessionError(f"Offset must be a multiple of {chunk_size} below {total}")
+            expected = min(chunk_size, total - offset)
+            if len(data) != expected:
+                raise UploadSessionError(f"Chunk at offset {offset} must be {expected} bytes, got {len(data)}")
+            if not chunk_hash or hashlib.sha256(data).hexdigest() != chunk_hash.lower():
+                raise UploadSessionError("Chunk checksum mismatch")
+
+            cur.execute("UPDATE UploadSessions SET UpdatedAt = GETDATE() WHERE UploadID = ? AND Status = 'open'",
+                        upload_id)
+            if cur.rowcount != 1:
+                raise UploadSessionError("Upload is being finalized", 409)
+
+            try:
+                with open(path, "r+b") as f:
+                    f.seek(offset)
+                    f.write(data)
+            except FileNotFoundError:
+                raise UploadSessionError("Upload not found", 404)
+
+            index = offset // chunk_size
+            cur.execute("DELETE FROM UploadChunks WHERE UploadID = ? AND ChunkIndex = ?", (upload_id, index))
+            cur.execute("INSERT INTO UploadChunks (UploadID, ChunkIndex, ChunkHash) VALUES (?, ?, ?)",
+                        (upload_id, index, chunk_hash.lower()))
+            conn.commit()
+            return {"upload_id": upload_id, "offset": offset, "length": len(data)}
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            cur.close()
+            conn.close()
+
+    def status(self, upload_id, user_id):
+        conn = self.connect()
+        cur = conn.cursor()
+        try:
+            session = self._session(cur, upload_id, user_id, any_status=True)
+            received = self._received(cur, upload_id)
+        finally:
+            cur.close()
+            conn.close()
+
+        total, chunk_size = session.TotalSize, session.ChunkSize
+        chunks = -(-total // chunk_size)
+        return {
+            "upload_id": upload_id,
+            "status": session.Status,
+            "size": total,
+            "chunk_size": chunk_size,
+            "received_bytes": sum(min(chunk_size, total - i * chunk_size) for i in received),
+            "missing": [i * chunk_size for i in range(chunks) if i not in received],
+        }
+
+    def assemble(self, upload_id, user_id):
+        """
+        Claims a complete session for finalizing and re-verifies every chunk
+        while hashing the whole file. Returns (session, PartFile, size,
+        sha256); the caller records the file and then calls finish() in the
+        same transaction, or reopen() if that fails.
+        """
+        path = self.part_path(upload_id)
+        conn = self.connect()
+        cur = conn.cursor()
+        try:
+            session = self._session(cur, upload_id, user_id)
+            total, chunk_size = session.TotalSize, session.ChunkSize
+            # Blocks on the row lock of any write_chunk() in flight
+            cur.execute("""
+                UPDATE UploadSessions SET Status = 'finalizing', UpdatedAt = GETDATE()
+                WHERE UploadID = ? AND Status = 'open'
+            """, upload_id)
+            if cur.rowcount != 1:
+                raise UploadSessionError("Upload is being finalized", 409)
+            conn.commit()
+
+            try:
+                cur.execute("SELECT ChunkIndex, ChunkHash FROM UploadChunks WHERE UploadID = ?", upload_id)
+                hashes = dict(cur.fetchall())
+                chunks = -(-total // chunk_size)
+                if len(hashes) != chunks:
+                    raise UploadSessionError(f"{chunks - len(hashes)} chunk(s) missing", 409)
+
+                sha256 = hashlib.sha256()
+                corrupt = []
+                with open(path, "rb") as f:
+                    for index in range(chunks):
+                        data = f.read(chunk_size)
+                        if hashlib.sha256(data).hexdigest() != hashes[index]:
+                            corrupt.append(index)
+                        sha256.update(data)
+                if corrupt:
+                    cur.execute(f"DELETE FROM UploadChunks WHERE UploadID = ? AND ChunkIndex IN "
+                                f"({', '.join('?' * len(corrupt))})", (upload_id, *corrupt))
+                    conn.commit()
+                    raise UploadSessionError(f"{len(corrupt)} chunk(s) failed verification and must be re-sent", 409)
+
+                digest = sha256.hexdigest()
+                if session.ContentHash and session.ContentHash.lower() != digest:
+                    raise UploadSessionError("File checksum mismatch", 409)
+            except Exception:
+                self._set_open(cur, upload_id)
+                conn.commit()
+                raise
+            return session, PartFile(path), total, digest
+        finally:
+            cur.close()
+            conn.close()
+
+    def finish(self, cur, upload_id):
+        cur.execute("DELETE FROM UploadChunks WHERE UploadID = ?", upload_id)
+        cur.execute("DELETE FROM UploadSessions WHERE UploadID = ?", upload_id)
+
+    def reopen(self, upload_id):
+        conn = self.connect()
+        cur = conn.cursor()
+        try:
+            self._set_open(cur, upload_id)
+            conn.commit()
+        finally:
+            cur.close()
+            conn.close()
+
+    def abort(self, upload_id, user_id):
+        path = self.part_path(upload_id)
+        conn = self.connect()
+        cur = conn.cursor()
+        try:
+            self._session(cur, upload_id, user_id)
+            self.finish(cur, upload_id)
+            conn.commit()
+        finally:
+            cur.close()
+            conn.close()
+        if os.path.exists(path):
+            os.remove(path)
+
+    def collect_stale(self):
+        """
+        Deletes sessions idle for longer than `ttl` and their part files.
+        Returns the number removed.
+        """
+        cutoff = datetime.datetime.now() - datetime.timedelta(seconds=self.ttl)
+        conn = self.connect()
+        cur = conn.cursor()
+        removed = 0
+        try:
+            cur.execute("SELECT UploadID FROM UploadSessions WHERE UpdatedAt < ?", cutoff)
+            for (upload_id,) in cur.fetchall():
+                # Claimed first: chunk writes only touch 'open' sessions
+                cur.execute("UPDATE UploadSessions SET Status = 'expired' WHERE UploadID = ? AND UpdatedAt < ?",
+                            (upload_id, cutoff))
+                if cur.rowcount != 1:
+                    conn.rollback()
+                    continue  # touched since the SELECT
+                self.finish(cur, upload_id)
+                conn.commit()
+                path = os.path.join(self.folder, f"{upload_id}.part")
+                if os.path.exists(path):
+                    os.remove(path)
+                removed += 1
+        finally:
+            cur.close()
+            conn.close()
+        return removed
+
+    def _session(self, cur, upload_id, user_id, any_status=False):
+        cur.execute("""
+            SELECT TotalSize, ChunkSize, Status, PatientID, VisitID, FileType, FileName, FileExtension,
+                   Description, ContentHash, UploadedBy
+            FROM UploadSessions WHERE UploadID = ?
+        """, upload_id)
+        row = cur.fetchone()
+        if row is None or row.UploadedBy != user_id:
+            raise UploadSessionError("Upload not found", 404)
+        if row.Status != "open" and not any_status:
+            raise UploadSessionError("Upload is being finalized", 409)
+        return row
+
+    def _received(self, cur, upload_id):
+        cur.execute("SELECT ChunkIndex FROM UploadChunks WHERE UploadID = ?", upload_id)
+        return {row[0] for row in cur.fetchall()}
+
+    def _set_open(self, cur, upload_id):
+        cur.execute("UPDATE UploadSessions SET Status = 'open', UpdatedAt = GETDATE() WHERE UploadID = ?",
+                    upload_id)
+
+    def _ensure_started(self):
+        if self._thread is not None:
+            return
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._thread = threading.Thread(target=self._run, name="upload-session-gc", daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while True:
+            time.sleep(self.gc_interval)
+            try:
+                removed = self.collect_stale()
+                if removed:
+                    print(f"Removed {removed} stale upload session(s)")
+            except Exception as e:
+                print(f"Upload session cleanup failed: {e}")
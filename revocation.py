@@ -0,0 +1,174 @@
+import calendar
+import datetime
+import threading
+import time
+
+
+def to_epoch(value):
+    # RevokedTokens stores naive UTC datetimes; keep the fraction, tokens carry sub-second iat
+    return calendar.timegm(value.timetuple()) + value.microsecond / 1e6
+
+
+class RevocationList:
+    """
+    In-memory view of the RevokedTokens table.
+
+    A row either revokes a single token (Jti set) or every token a user was
+    issued up to RevokedAt (Jti NULL, e.g. on account deactivation). Checks
+    are plain dict lookups. The table is read once before the first check
+    is answered, then a background thread pulls rows by RevokedAt so every
+    worker converges within `sync_interval` seconds; each pull re-reads the
+    last `sync_overlap` seconds, so a revocation whose insert commits late
+    is still seen. Entries are dropped once the tokens they cover have
+    expired.
+
+    On SQL Server, as created by schema/mssql/0006 and 0007:
+
+        CREATE TABLE RevokedTokens (
+            RevokedID  INT IDENTITY PRIMARY KEY,
+            Jti        NVARCHAR(64) NULL,
+            UserID     INT NOT NULL,
+            RevokedAt  DATETIME2 NOT NULL,  -- compared with sub-second iat
+            ExpiresAt  DATETIME NOT NULL    -- only compared to the second
+        )
+    """
+
+    def __init__(self, connect, sync_interval=5.0, purge_interval=3600.0, sync_overlap=60.0):
+        self.connect = connect
+        self.sync_interval = sync_interval
+        self.purge_interval = purge_interval
+        self.sync_overlap = datetime.timedelta(seconds=sync_overlap)
+        self._jtis = {}
+        self._users = {}
+        self._synced_to = None  # newest RevokedAt read so far
+        self._lock = threading.Lock()
+        self._start_lock = threading.Lock()
+        self._thread = None
+
+    def is_revoked(self, claims):
+        self._ensure_started()
+
+        jti = claims.get("jti")
+        if jti is not None and jti in self._jtis:
+            return True
+
+        # iat truncated to the second (tokens from before it was fractional) lands at or
+        # below a cutoff in the same second, so such a token is revoked, not kept
+        cutoff = self._users.get(claims.get("user_id"))
+        return cutoff is not None and claims.get("iat", 0) <= cutoff[0]
+
+    def revoke_token(self, claims):
+        """
+        Revokes a single token (logout). Tokens issued before `jti` was
+        added cannot be told apart, so they revoke all of the user's tokens.
+        """
+        expires_at = datetime.datetime.utcfromtimestamp(claims["exp"])
+        self._persist(claims.get("jti"), claims["user_id"], expires_at)
+
+    def revoke_user(self, user_id, token_lifetime):
+        """
+        Revokes every token issued to a user so far (deactivation).
+        """
+        expires_at = datetime.datetime.utcnow() + token_lifetime
+        self._persist(None, user_id, expires_at)
+
+    def sync(self):
+        """
+        Loads rows revoked since the last sync, less `sync_overlap`, and
+        prunes expired entries. Rows read twice are simply applied again.
+        """
+        conn = self.connect()
+        cur = conn.cursor()
+        try:
+            if self._synced_to is None:
+                cur.execute("""
+                    SELECT Jti, UserID, RevokedAt, ExpiresAt FROM RevokedTokens WHERE ExpiresAt > ?
+                """, datetime.datetime.utcnow())
+            else:
+                # Not by RevokedID: identities are handed out before commit, so a
+                # lower one can become visible after a higher one was read
+                cur.execute("""
+                    SELECT Jti, UserID, RevokedAt, ExpiresAt FROM RevokedTokens
+                    WHERE RevokedAt > ? AND ExpiresAt > ?
+                """, (self._synced_to - self.sync_overlap, datetime.datetime.utcnow()))
+            rows = cur.fetchall()
+        finally:
+            cur.close()
+            conn.close()
+
+        now = time.time()
+        with self._lock:
+            for jti, user_id, revoked_at, expires_at in rows:
+                self._add(jti, user_id, to_epoch(revoked_at), to_epoch(expires_at))
+                if self._synced_to is None or revoked_at > self._synced_to:
+                    self._synced_to = revoked_at
+
+            # Swap in pruned copies so readers never see a dict mid-resize
+            self._jtis = {k: exp for k, exp in self._jtis.items() if exp > now}
+            self._users = {k: v for k, v in self._users.items() if v[1] > now}
+
+    def purge_expired(self):
+        """
+        Deletes rows whose tokens can no longer be presented.
+        """
+        conn = self.connect()
+        cur = conn.cursor()
+        try:
+            cur.execute("DELETE FROM RevokedTokens WHERE ExpiresAt <= ?", datetime.datetime.utcnow())
+            conn.commit()
+        finally:
+            cur.close()
+            conn.close()
+
+    def _persist(self, jti, user_id, expires_at):
+        revoked_at = datetime.datetime.utcnow()
+        conn = self.connect()
+        cur = conn.cursor()
+        try:
+            cur.execute("""
+                INSERT INTO RevokedTokens (Jti, UserID, RevokedAt, ExpiresAt)
+                VALUES (?, ?, ?, ?)
+            """, (jti, user_id, revoked_at, expires_at))
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            cur.close()
+            conn.close()
+
+        # Apply locally right away; other workers pick it up on their next sync
+        with self._lock:
+            self._add(jti, user_id, to_epoch(revoked_at), to_epoch(expires_at))
+
+    def _add(self, jti, user_id, revoked_at, expires_at):
+        if jti is not None:
+            self._jtis[jti] = expires_at
+            return
+
+        current = self._users.get(user_id)
+        if current is None or current[0] < revoked_at:
+            self._users[user_id] = (revoked_at, expires_at)
+
+    def _ensure_started(self):
+        if self._thread is not None:
+            return
+        with self._start_lock:
+            if self._thread is not None:
+                return
+            # No check is answered from an empty list; if this fails the next check retries it
+            self.sync()
+            self._thread = threading.Thread(target=self._run, name="revocation-sync", daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        last_purge = time.monotonic()
+        while True:
+            time.sleep(self.sync_interval)
+            try:
+                self.sync()
+                if time.monotonic() - last_purge >= self.purge_interval:
+                    self.purge_expired()
+                    last_purge = time.monotonic()
+            except Exception as e:
+                print(f"Revocation sync failed: {e}")
@@ -0,0 +1,96 @@
+import collections
+import os
+import sys
+import threading
+import time
+
+
+def _frame_label(code):
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+class StackSampler:
+    """
+    Statistical profiler: a background thread snapshots every thread's
+    stack `hz` times a second via sys._current_frames().
+
+    Samples are counted per second as tuples of code objects, which is
+    cheap enough to leave running; labels are only built when a window
+    is dumped in collapsed-stack format ("root;child;leaf count"), the
+    input flamegraph.pl and speedscope expect.
+    """
+
+    def __init__(self, hz=100, retention=600):
+        self.interval = 1.0 / hz
+        self.retention = retention
+        self._seconds = collections.deque()  # (second, Counter of stacks)
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="stack-sampler", daemon=True)
+            self._thread.start()
+
+    def collapsed(self, seconds=60):
+        """
+        Returns stacks sampled during the last `seconds` seconds.
+        """
+        since = int(time.time()) - seconds
+        totals = collections.Counter()
+        with self._lock:
+            for second, counts in self._seconds:
+                if second > since:
+                    totals.update(counts)
+
+        labels = {}
+        lines = []
+        for stack, count in totals.most_common():
+            names = []
+            for code in stack:
+                label = labels.get(code)
+                if label is None:
+                    label = labels[code] = _frame_label(code)
+                names.append(label)
+            lines.append(f"{';'.join(names)} {count}")
+        return "\n".join(lines) + "\n"
+
+    def _run(self):
+        me = threading.get_ident()
+        next_tick = time.perf_counter()
+        failing = False
+        while True:
+            try:
+                self._sample(me)
+                failing = False
+            except Exception as e:
+                if not failing:  # once per run of failures, not 100 times a second
+                    print(f"Stack sample failed: {e}")
+                failing = True
+            next_tick += self.interval
+            delay = next_tick - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            else:
+                # Fell behind (e.g. GIL contention); skip missed ticks instead of bursting
+                next_tick = time.perf_counter()
+
+    def _sample(self, me):
+        stacks = []
+        for thread_id, frame in sys._current_frames().items():
+            if thread_id == me:
+                continue
+            stack = []
+            while frame is not None:
+                stack.append(frame.f_code)
+                frame = frame.f_back
+            stack.reverse()
+            stacks.append(tuple(stack))
+
+        second = int(time.time())
+        with self._lock:
+            if not self._seconds or self._seconds[-1][0] != second:
+                self._seconds.append((second, collections.Counter()))
+                while self._seconds[0][0] <= second - self.retention:
+                    self._seconds.popleft()
+            self._seconds[-1][1].update(stacks)
@@ -0,0 +1,197 @@
+-- Tables, view and stored procedures app.py expects.
+-- Databases created before migrations existed already have these objects:
+-- mark this version as applied with `python migrations.py --baseline 1`.
+
+CREATE TABLE Patients (
+    PatientID INT IDENTITY(1,1) PRIMARY KEY,
+    PatientName NVARCHAR(100) NOT NULL,
+    Email NVARCHAR(100),
+    Gender NVARCHAR(10),
+    DateOfBirth DATE,
+    PhoneNumber NVARCHAR(20),
+    Address NVARCHAR(255),
+    BloodGroup NVARCHAR(5),
+    EmergencyContact NVARCHAR(20),
+    EmergencyContactName NVARCHAR(100),
+    IsActive BIT NOT NULL DEFAULT 1,
+    CreatedAt DATETIME NOT NULL DEFAULT GETDATE()
+);
+
+CREATE TABLE Doctors (
+    DoctorID INT IDENTITY(1,1) PRIMARY KEY,
+    DoctorName NVARCHAR(100) NOT NULL,
+    Email NVARCHAR(100),
+    Specialty NVARCHAR(100),
+    PhoneNumber NVARCHAR(20),
+    LicenseNumber NVARCHAR(50),
+    YearsOfExperience INT,
+    IsActive BIT NOT NULL DEFAULT 1,
+    CreatedAt DATETIME NOT NULL DEFAULT GETDATE()
+);
+
+CREATE TABLE Pharmacists (
+    PharmacistID INT IDENTITY(1,1) PRIMARY KEY,
+    PharmacistName NVARCHAR(100) NOT NULL,
+    Email NVARCHAR(100),
+    PhoneNumber NVARCHAR(20),
+    IsActive BIT NOT NULL DEFAULT 1
+);
+
+CREATE TABLE Users (
+    UserID INT IDENTITY(1,1) PRIMARY KEY,
+    Username NVARCHAR(50) NOT NULL,
+    PasswordHash NVARCHAR(255) NOT NULL,
+    Email NVARCHAR(100),
+    Role NVARCHAR(20) NOT NULL,
+    PatientID INT REFERENCES Patients(PatientID),
+    DoctorID INT REFERENCES Doctors(DoctorID),
+    PharmacistID INT REFERENCES Pharmacists(PharmacistID),
+    IsActive BIT NOT NULL DEFAULT 1,
+    LastLogin DATETIME,
+    CreatedAt DATETIME NOT NULL DEFAULT GETDATE()
+);
+
+CREATE TABLE Visits (
+    VisitID INT IDENTITY(1,1) PRIMARY KEY,
+    PatientID INT NOT NULL REFERENCES Patients(PatientID),
+    DoctorID INT NOT NULL REFERENCES Doctors(DoctorID),
+    VisitDate DATETIME NOT NULL DEFAULT GETDATE(),
+    ReasonForVisit NVARCHAR(500),
+    VitalSigns NVARCHAR(500),
+    Notes NVARCHAR(MAX),
+    Status NVARCHAR(20) NOT NULL DEFAULT 'Scheduled'
+);
+
+CREATE TABLE Diagnoses (
+    DiagnosisID INT IDENTITY(1,1) PRIMARY KEY,
+    VisitID INT NOT NULL REFERENCES Visits(VisitID),
+    DiagnosisName NVARCHAR(200) NOT NULL,
+    Description NVARCHAR(MAX),
+    IsChronic BIT NOT NULL DEFAULT 0,
+    Severity NVARCHAR(20),
+    DiagnosedAt DATETIME NOT NULL DEFAULT GETDATE()
+);
+
+CREATE TABLE Prescriptions (
+    PrescriptionID INT IDENTITY(1,1) PRIMARY KEY,
+    VisitID INT NOT NULL REFERENCES Visits(VisitID),
+    MedicineName NVARCHAR(200) NOT NULL,
+    Dosage NVARCHAR(100),
+    Frequency NVARCHAR(100),
+    Duration NVARCHAR(100),
+    Instructions NVARCHAR(500),
+    IsDispensed BIT NOT NULL DEFAULT 0,
+    DispensedBy INT REFERENCES Pharmacists(PharmacistID),
+    DispensedDate DATETIME,
+    PrescribedAt DATETIME NOT NULL DEFAULT GETDATE()
+);
+
+CREATE TABLE LabTests (
+    TestID INT IDENTITY(1,1) PRIMARY KEY,
+    VisitID INT NOT NULL REFERENCES Visits(VisitID),
+    TestName NVARCHAR(200) NOT NULL,
+    Status NVARCHAR(20) NOT NULL DEFAULT 'Pending',
+    Result NVARCHAR(MAX),
+    OrderedAt DATETIME NOT NULL DEFAULT GETDATE()
+);
+
+CREATE TABLE MedicalFiles (
+    FileID INT IDENTITY(1,1) PRIMARY KEY,
+    PatientID INT NOT NULL REFERENCES Patients(PatientID),
+    VisitID INT REFERENCES Visits(VisitID),
+    UploadedBy INT REFERENCES Users(UserID),
+    FileType NVARCHAR(50),
+    FileName NVARCHAR(255) NOT NULL,
+    FileExtension NVARCHAR(10),
+    FilePath NVARCHAR(500) NOT NULL,
+    FileSize BIGINT,
+    Description NVARCHAR(500),
+    UploadedAt DATETIME NOT NULL DEFAULT GETDATE()
+);
+
+CREATE TABLE ImportHistory (
+    ImportID INT IDENTITY(1,1) PRIMARY KEY,
+    ImportedBy INT REFERENCES Users(UserID),
+    FileName NVARCHAR(255),
+    TotalRecords INT,
+    SuccessfulRecords INT,
+    FailedRecords INT,
+    ErrorLog NVARCHAR(MAX),
+    ImportedAt DATETIME NOT NULL DEFAULT GETDATE()
+);
+GO
+
+CREATE VIEW vw_DashboardStats AS
+SELECT
+    (SELECT COUNT(*) FROM Patients WHERE IsActive = 1) AS TotalPatients,
+    (SELECT COUNT(*) FROM Doctors WHERE IsActive = 1) AS TotalDoctors,
+    (SELECT COUNT(*) FROM Visits
+     WHERE VisitDate >= CAST(GETDATE() AS DATE)
+       AND VisitDate < DATEADD(DAY, 1, CAST(GETDATE() AS DATE))) AS TodayVisits,
+    (SELECT COUNT(*) FROM Prescriptions WHERE IsDispensed = 0) AS PendingPrescriptions,
+    (SELECT COUNT(*) FROM LabTests WHERE Status = 'Pending') AS PendingTests;
+GO
+
+CREATE PROCEDURE sp_GetAllRecords
+AS
+BEGIN
+    SET NOCOUNT ON;
+    SELECT v.VisitID, v.VisitDate, p.PatientID, p.PatientName, p.BloodGroup,
+           d.DoctorName, d.Specialty, dg.DiagnosisName, dg.Severity, dg.IsChronic,
+           pr.MedicineName, pr.Dosage, pr.IsDispensed
+    FROM Visits v
+    JOIN Patients p ON v.PatientID = p.PatientID
+    JOIN Doctors d ON v.DoctorID = d.DoctorID
+    LEFT JOIN Diagnoses dg ON dg.VisitID = v.VisitID
+    LEFT JOIN Prescriptions pr ON pr.VisitID = v.VisitID
+    ORDER BY v.VisitDate DESC;
+END
+GO
+
+CREATE PROCEDURE sp_GetPatientRecords
+    @PatientID INT
+AS
+BEGIN
+    SET NOCOUNT ON;
+    SELECT v.VisitID, v.VisitDate, p.PatientID, p.PatientName, p.BloodGroup,
+           d.DoctorName, d.Specialty, dg.DiagnosisName, dg.Severity, dg.IsChronic,
+           pr.MedicineName, pr.Dosage, pr.IsDispensed
+    FROM Visits v
+    JOIN Patients p ON v.PatientID = p.PatientID
+    JOIN Doctors d ON v.DoctorID = d.DoctorID
+    LEFT JOIN Diagnoses dg ON dg.VisitID = v.VisitID
+    LEFT JOIN Prescriptions pr ON pr.VisitID = v.VisitID
+    WHERE v.PatientID = @PatientID
+    ORDER BY v.VisitDate DESC;
+END
+GO
+
+CREATE PROCEDURE sp_GetPrescriptionsForPharmacy
+    @OnlyPending BIT
+AS
+BEGIN
+    SET NOCOUNT ON;
+    SELECT pr.PrescriptionID, p.PatientID, p.PatientName, pr.MedicineName, pr.Dosage,
+           pr.Frequency, pr.Duration, pr.Instructions, pr.IsDispensed, pr.DispensedDate,
+           d.DoctorName, v.VisitDate
+    FROM Prescriptions pr
+    JOIN Visits v ON pr.VisitID = v.VisitID
+    JOIN Patients p ON v.PatientID = p.PatientID
+    JOIN Doctors d ON v.DoctorID = d.DoctorID
+    WHERE (@OnlyPending = 0 OR pr.IsDispensed = 0)
+    ORDER BY v.VisitDate DESC;
+END
+GO
+
+CREATE PROCEDURE sp_GetPatientFiles
+    @PatientID INT
+AS
+BEGIN
+    SET NOCOUNT ON;
+    SELECT f.FileID, f.FileType, f.FileName, f.FileExtension, f.FileSize, f.Description,
+           f.UploadedAt, u.Username AS UploadedByUsername
+    FROM MedicalFiles f
+    LEFT JOIN Users u ON f.UploadedBy = u.UserID
+    WHERE f.PatientID = @PatientID
+    ORDER BY f.UploadedAt DESC;
+END
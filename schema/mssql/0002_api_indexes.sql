@@ -0,0 +1,29 @@
+-- Covering indexes for the API's hot lookups; keep in step with sqlite/0002_api_indexes.sql
+
+-- Login by username reads the whole account row
+CREATE INDEX IX_Users_Username ON Users (Username, IsActive)
+    INCLUDE (PasswordHash, Email, Role, PatientID, DoctorID, PharmacistID);
+
+-- Registration duplicate check on Username OR Email
+CREATE INDEX IX_Users_Email ON Users (Email);
+
+-- Patient list ordered by CreatedAt; import duplicate check by Email
+CREATE INDEX IX_Patients_IsActive_CreatedAt ON Patients (IsActive, CreatedAt DESC);
+CREATE INDEX IX_Patients_Email ON Patients (Email);
+
+-- Visit listings ordered by VisitDate, a patient's own records, today's visits
+CREATE INDEX IX_Visits_VisitDate ON Visits (VisitDate DESC) INCLUDE (PatientID, DoctorID);
+CREATE INDEX IX_Visits_PatientID_VisitDate ON Visits (PatientID, VisitDate DESC) INCLUDE (DoctorID);
+
+-- Record joins by visit
+CREATE INDEX IX_Diagnoses_VisitID ON Diagnoses (VisitID) INCLUDE (DiagnosisName, Severity, IsChronic);
+CREATE INDEX IX_Prescriptions_VisitID ON Prescriptions (VisitID) INCLUDE (MedicineName, Dosage, IsDispensed);
+
+-- Pending prescriptions (dashboard count and pharmacy queue)
+CREATE INDEX IX_Prescriptions_Pending ON Prescriptions (VisitID)
+    INCLUDE (MedicineName, Dosage, Frequency, Duration, Instructions)
+    WHERE IsDispensed = 0;
+
+-- Files by patient, newest first
+CREATE INDEX IX_MedicalFiles_PatientID_UploadedAt ON MedicalFiles (PatientID, UploadedAt DESC)
+    INCLUDE (FileType, FileName, FileExtension, FileSize, Description, UploadedBy);
@@ -0,0 +1,19 @@
+-- Content-addressed medical file store; keep in step with sqlite/0003_file_blobs.sql
+
+-- One row per distinct file content (SHA-256 hex). RefCount is the number of
+-- MedicalFiles rows pointing at it, -1 while the blob is being collected.
+CREATE TABLE FileBlobs (
+    ContentHash CHAR(64) PRIMARY KEY,
+    FileSize BIGINT NOT NULL,
+    RefCount INT NOT NULL DEFAULT 0,
+    CreatedAt DATETIME NOT NULL DEFAULT GETDATE()
+);
+
+-- Unreferenced blobs for the collector
+CREATE INDEX IX_FileBlobs_RefCount ON FileBlobs (RefCount) WHERE RefCount <= 0;
+
+-- NULL for files stored before the blob store, which keep their own FilePath
+ALTER TABLE MedicalFiles ADD ContentHash CHAR(64) NULL REFERENCES FileBlobs(ContentHash);
+GO
+
+CREATE INDEX IX_MedicalFiles_ContentHash ON MedicalFiles (ContentHash) WHERE ContentHash IS NOT NULL;
@@ -0,0 +1,31 @@
+-- Resumable chunked uploads; keep in step with sqlite/0004_upload_sessions.sql
+
+-- One row per upload in progress. UploadID also names the .part file the
+-- chunks are written into; Status is 'open' or 'finalizing'.
+CREATE TABLE UploadSessions (
+    UploadID CHAR(32) PRIMARY KEY,
+    PatientID INT NOT NULL REFERENCES Patients(PatientID),
+    VisitID INT REFERENCES Visits(VisitID),
+    UploadedBy INT NOT NULL REFERENCES Users(UserID),
+    FileType NVARCHAR(50),
+    FileName NVARCHAR(255) NOT NULL,
+    FileExtension NVARCHAR(10),
+    Description NVARCHAR(500),
+    TotalSize BIGINT NOT NULL,
+    ChunkSize INT NOT NULL,
+    ContentHash CHAR(64),
+    Status VARCHAR(20) NOT NULL DEFAULT 'open',
+    CreatedAt DATETIME NOT NULL DEFAULT GETDATE(),
+    UpdatedAt DATETIME NOT NULL DEFAULT GETDATE()
+);
+
+-- Stale session sweep
+CREATE INDEX IX_UploadSessions_UpdatedAt ON UploadSessions (UpdatedAt);
+
+-- Chunks received so far, with the SHA-256 each was verified against
+CREATE TABLE UploadChunks (
+    UploadID CHAR(32) NOT NULL REFERENCES UploadSessions(UploadID),
+    ChunkIndex INT NOT NULL,
+    ChunkHash CHAR(64) NOT NULL,
+    PRIMARY KEY (UploadID, ChunkIndex)
+);
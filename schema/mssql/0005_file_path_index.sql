@@ -0,0 +1,2 @@
+-- Reference checks when a file moves or is deleted; keep in step with sqlite/0005_file_path_index.sql
+CREATE INDEX IX_MedicalFiles_FilePath ON MedicalFiles (FilePath);
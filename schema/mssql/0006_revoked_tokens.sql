@@ -0,0 +1,18 @@
+-- Token revocations (revocation.py); keep in step with sqlite/0006_revoked_tokens.sql
+-- Not part of 0001: databases baselined at version 1 were built before
+-- revocation existed. Guarded for those whose table was added by hand.
+
+IF OBJECT_ID('RevokedTokens', 'U') IS NULL
+CREATE TABLE RevokedTokens (
+    RevokedID INT IDENTITY(1,1) PRIMARY KEY,
+    Jti NVARCHAR(64),
+    UserID INT NOT NULL,
+    RevokedAt DATETIME NOT NULL,
+    ExpiresAt DATETIME NOT NULL
+);
+GO
+
+-- Revocation sync and purge
+IF NOT EXISTS (SELECT 1 FROM sys.indexes WHERE name = 'IX_RevokedTokens_ExpiresAt'
+               AND object_id = OBJECT_ID('RevokedTokens'))
+CREATE INDEX IX_RevokedTokens_ExpiresAt ON RevokedTokens (ExpiresAt);
@@ -0,0 +1,7 @@
+-- Revocation sync by RevokedAt; keep in step with sqlite/0007_revoked_tokens_revoked_at.sql
+
+-- Token iat is compared against RevokedAt below the second; DATETIME rounds to 3 ms
+ALTER TABLE RevokedTokens ALTER COLUMN RevokedAt DATETIME2 NOT NULL;
+GO
+
+CREATE INDEX IX_RevokedTokens_RevokedAt ON RevokedTokens (RevokedAt) INCLUDE (Jti, UserID, ExpiresAt);
@@ -0,0 +1,129 @@
+-- Tables and views app.py expects, mirroring the SQL Server schema
+
+CREATE TABLE Patients (
+    PatientID INTEGER PRIMARY KEY AUTOINCREMENT,
+    PatientName TEXT NOT NULL,
+    Email TEXT,
+    Gender TEXT,
+    DateOfBirth DATE,
+    PhoneNumber TEXT,
+    Address TEXT,
+    BloodGroup TEXT,
+    EmergencyContact TEXT,
+    EmergencyContactName TEXT,
+    IsActive INTEGER NOT NULL DEFAULT 1,
+    CreatedAt DATETIME NOT NULL DEFAULT (datetime('now', 'localtime'))
+);
+
+CREATE TABLE Doctors (
+    DoctorID INTEGER PRIMARY KEY AUTOINCREMENT,
+    DoctorName TEXT NOT NULL,
+    Email TEXT,
+    Specialty TEXT,
+    PhoneNumber TEXT,
+    LicenseNumber TEXT,
+    YearsOfExperience INTEGER,
+    IsActive INTEGER NOT NULL DEFAULT 1,
+    CreatedAt DATETIME NOT NULL DEFAULT (datetime('now', 'localtime'))
+);
+
+CREATE TABLE Pharmacists (
+    PharmacistID INTEGER PRIMARY KEY AUTOINCREMENT,
+    PharmacistName TEXT NOT NULL,
+    Email TEXT,
+    PhoneNumber TEXT,
+    IsActive INTEGER NOT NULL DEFAULT 1
+);
+
+CREATE TABLE Users (
+    UserID INTEGER PRIMARY KEY AUTOINCREMENT,
+    Username TEXT NOT NULL,
+    PasswordHash TEXT NOT NULL,
+    Email TEXT,
+    Role TEXT NOT NULL,
+    PatientID INTEGER REFERENCES Patients(PatientID),
+    DoctorID INTEGER REFERENCES Doctors(DoctorID),
+    PharmacistID INTEGER REFERENCES Pharmacists(PharmacistID),
+    IsActive INTEGER NOT NULL DEFAULT 1,
+    LastLogin DATETIME,
+    CreatedAt DATETIME NOT NULL DEFAULT (datetime('now', 'localtime'))
+);
+
+CREATE TABLE Visits (
+    VisitID INTEGER PRIMARY KEY AUTOINCREMENT,
+    PatientID INTEGER NOT NULL REFERENCES Patients(PatientID),
+    DoctorID INTEGER NOT NULL REFERENCES Doctors(DoctorID),
+    VisitDate DATETIME NOT NULL DEFAULT (datetime('now', 'localtime')),
+    ReasonForVisit TEXT,
+    VitalSigns TEXT,
+    Notes TEXT,
+    Status TEXT NOT NULL DEFAULT 'Scheduled'
+);
+
+CREATE TABLE Diagnoses (
+    DiagnosisID INTEGER PRIMARY KEY AUTOINCREMENT,
+    VisitID INTEGER NOT NULL REFERENCES Visits(VisitID),
+    DiagnosisName TEXT NOT NULL,
+    Description TEXT,
+    IsChronic INTEGER NOT NULL DEFAULT 0,
+    Severity TEXT,
+    DiagnosedAt DATETIME NOT NULL DEFAULT (datetime('now', 'localtime'))
+);
+
+CREATE TABLE Prescriptions (
+    PrescriptionID INTEGER PRIMARY KEY AUTOINCREMENT,
+    VisitID INTEGER NOT NULL REFERENCES Visits(VisitID),
+    MedicineName TEXT NOT NULL,
+    Dosage TEXT,
+    Frequency TEXT,
+    Duration TEXT,
+    Instructions TEXT,
+    IsDispensed INTEGER NOT NULL DEFAULT 0,
+    DispensedBy INTEGER REFERENCES Pharmacists(PharmacistID),
+    DispensedDate DATETIME,
+    PrescribedAt DATETIME NOT NULL DEFAULT (datetime('now', 'localtime'))
+);
+
+CREATE TABLE LabTests (
+    TestID INTEGER PRIMARY KEY AUTOINCREMENT,
+    VisitID INTEGER NOT NULL REFERENCES Visits(VisitID),
+    TestName TEXT NOT NULL,
+    Status TEXT NOT NULL DEFAULT 'Pending',
+    Result TEXT,
+    OrderedAt DATETIME NOT NULL DEFAULT (datetime('now', 'localtime'))
+);
+
+CREATE TABLE MedicalFiles (
+    FileID INTEGER PRIMARY KEY AUTOINCREMENT,
+    PatientID INTEGER NOT NULL REFERENCES Patients(PatientID),
+    VisitID INTEGER REFERENCES Visits(VisitID),
+    UploadedBy INTEGER REFERENCES Users(UserID),
+    FileType TEXT,
+    FileName TEXT NOT NULL,
+    FileExtension TEXT,
+    FilePath TEXT NOT NULL,
+    FileSize INTEGER,
+    Description TEXT,
+    UploadedAt DATETIME NOT NULL DEFAULT (datetime('now', 'localtime'))
+);
+
+CREATE TABLE ImportHistory (
+    ImportID INTEGER PRIMARY KEY AUTOINCREMENT,
+    ImportedBy INTEGER REFERENCES Users(UserID),
+    FileName TEXT,
+    TotalRecords INTEGER,
+    SuccessfulRecords INTEGER,
+    FailedRecords INTEGER,
+    ErrorLog TEXT,
+    ImportedAt DATETIME NOT NULL DEFAULT (datetime('now', 'localtime'))
+);
+
+CREATE VIEW vw_DashboardStats AS
+SELECT
+    (SELECT COUNT(*) FROM Patients WHERE IsActive = 1) AS TotalPatients,
+    (SELECT COUNT(*) FROM Doctors WHERE IsActive = 1) AS TotalDoctors,
+    (SELECT COUNT(*) FROM Visits
+     WHERE VisitDate >= date('now', 'localtime')
+       AND VisitDate < date('now', 'localtime', '+1 day')) AS TodayVisits,
+    (SELECT COUNT(*) FROM Prescriptions WHERE IsDispensed = 0) AS PendingPrescriptions,
+    (SELECT COUNT(*) FROM LabTests WHERE Status = 'Pending') AS PendingTests;
@@ -0,0 +1,23 @@
+-- Indexes for the API's hot lookups; keep in step with mssql/0002_api_indexes.sql
+
+-- Login by username; registration duplicate check on Username OR Email
+CREATE INDEX IX_Users_Username ON Users (Username, IsActive);
+CREATE INDEX IX_Users_Email ON Users (Email);
+
+-- Patient list ordered by CreatedAt; import duplicate check by Email
+CREATE INDEX IX_Patients_IsActive_CreatedAt ON Patients (IsActive, CreatedAt);
+CREATE INDEX IX_Patients_Email ON Patients (Email);
+
+-- Visit listings ordered by VisitDate, a patient's own records, today's visits
+CREATE INDEX IX_Visits_VisitDate ON Visits (VisitDate);
+CREATE INDEX IX_Visits_PatientID_VisitDate ON Visits (PatientID, VisitDate);
+
+-- Record joins by visit
+CREATE INDEX IX_Diagnoses_VisitID ON Diagnoses (VisitID);
+CREATE INDEX IX_Prescriptions_VisitID ON Prescriptions (VisitID);
+
+-- Pending prescriptions
+CREATE INDEX IX_Prescriptions_IsDispensed ON Prescriptions (IsDispensed, VisitID);
+
+-- Files by patient, newest first
+CREATE INDEX IX_MedicalFiles_PatientID_UploadedAt ON MedicalFiles (PatientID, UploadedAt);
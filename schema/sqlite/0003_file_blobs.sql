@@ -0,0 +1,17 @@
+-- Content-addressed medical file store; keep in step with mssql/0003_file_blobs.sql
+
+-- One row per distinct file content (SHA-256 hex). RefCount is the number of
+-- MedicalFiles rows pointing at it, -1 while the blob is being collected.
+CREATE TABLE FileBlobs (
+    ContentHash TEXT PRIMARY KEY,
+    FileSize INTEGER NOT NULL,
+    RefCount INTEGER NOT NULL DEFAULT 0,
+    CreatedAt DATETIME NOT NULL DEFAULT (datetime('now', 'localtime'))
+);
+
+-- Unreferenced blobs for the collector
+CREATE INDEX IX_FileBlobs_RefCount ON FileBlobs (RefCount);
+
+-- NULL for files stored before the blob store, which keep their own FilePath
+ALTER TABLE MedicalFiles ADD COLUMN ContentHash TEXT REFERENCES FileBlobs(ContentHash);
+CREATE INDEX IX_MedicalFiles_ContentHash ON MedicalFiles (ContentHash);
@@ -0,0 +1,31 @@
+-- Resumable chunked uploads; keep in step with mssql/0004_upload_sessions.sql
+
+-- One row per upload in progress. UploadID also names the .part file the
+-- chunks are written into; Status is 'open' or 'finalizing'.
+CREATE TABLE UploadSessions (
+    UploadID TEXT PRIMARY KEY,
+    PatientID INTEGER NOT NULL REFERENCES Patients(PatientID),
+    VisitID INTEGER REFERENCES Visits(VisitID),
+    UploadedBy INTEGER NOT NULL REFERENCES Users(UserID),
+    FileType TEXT,
+    FileName TEXT NOT NULL,
+    FileExtension TEXT,
+    Description TEXT,
+    TotalSize INTEGER NOT NULL,
+    ChunkSize INTEGER NOT NULL,
+    ContentHash TEXT,
+    Status TEXT NOT NULL DEFAULT 'open',
+    CreatedAt DATETIME NOT NULL DEFAULT (datetime('now', 'localtime')),
+    UpdatedAt DATETIME NOT NULL DEFAULT (datetime('now', 'localtime'))
+);
+
+-- Stale session sweep
+CREATE INDEX IX_UploadSessions_UpdatedAt ON UploadSessions (UpdatedAt);
+
+-- Chunks received so far, with the SHA-256 each was verified against
+CREATE TABLE UploadChunks (
+    UploadID TEXT NOT NULL REFERENCES UploadSessions(UploadID),
+    ChunkIndex INTEGER NOT NULL,
+    ChunkHash TEXT NOT NULL,
+    PRIMARY KEY (UploadID, ChunkIndex)
+);
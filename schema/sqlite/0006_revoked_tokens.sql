@@ -0,0 +1,12 @@
+-- Token revocations (revocation.py); keep in step with mssql/0006_revoked_tokens.sql
+
+CREATE TABLE IF NOT EXISTS RevokedTokens (
+    RevokedID INTEGER PRIMARY KEY AUTOINCREMENT,
+    Jti TEXT,
+    UserID INTEGER NOT NULL,
+    RevokedAt DATETIME NOT NULL,
+    ExpiresAt DATETIME NOT NULL
+);
+
+-- Revocation sync and purge
+CREATE INDEX IF NOT EXISTS IX_RevokedTokens_ExpiresAt ON RevokedTokens (ExpiresAt);
@@ -0,0 +1,2 @@
+-- Revocation sync by RevokedAt; keep in step with mssql/0007_revoked_tokens_revoked_at.sql
+CREATE INDEX IX_RevokedTokens_RevokedAt ON RevokedTokens (RevokedAt);
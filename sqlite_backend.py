@@ -0,0 +1,197 @@
+import collections
+import datetime
+import re
+import sqlite3
+from functools import lru_cache
+
+import migrations
+
+# SQLite stand-in for the SQL Server database, used for local benchmarks and
+# offline development. It accepts the same SQL app.py sends to pyodbc and
+# rewrites the few T-SQL constructs the API relies on.
+
+# Bodies of the stored procedures app.py calls with EXEC
+PROCEDURES = {
+    "sp_GetAllRecords": """
+        SELECT v.VisitID, v.VisitDate, p.PatientID, p.PatientName, p.BloodGroup,
+               d.DoctorName, d.Specialty, dg.DiagnosisName, dg.Severity, dg.IsChronic,
+               pr.MedicineName, pr.Dosage, pr.IsDispensed
+        FROM Visits v
+        JOIN Patients p ON v.PatientID = p.PatientID
+        JOIN Doctors d ON v.DoctorID = d.DoctorID
+        LEFT JOIN Diagnoses dg ON dg.VisitID = v.VisitID
+        LEFT JOIN Prescriptions pr ON pr.VisitID = v.VisitID
+        ORDER BY v.VisitDate DESC
+    """,
+    "sp_GetPatientRecords": """
+        SELECT v.VisitID, v.VisitDate, p.PatientID, p.PatientName, p.BloodGroup,
+               d.DoctorName, d.Specialty, dg.DiagnosisName, dg.Severity, dg.IsChronic,
+               pr.MedicineName, pr.Dosage, pr.IsDispensed
+        FROM Visits v
+        JOIN Patients p ON v.PatientID = p.PatientID
+        JOIN Doctors d ON v.DoctorID = d.DoctorID
+        LEFT JOIN Diagnoses dg ON dg.VisitID = v.VisitID
+        LEFT JOIN Prescriptions pr ON pr.VisitID = v.VisitID
+        WHERE v.PatientID = ?
+        ORDER BY v.VisitDate DESC
+    """,
+    "sp_GetPrescriptionsForPharmacy": """
+        SELECT pr.PrescriptionID, p.PatientID, p.PatientName, pr.MedicineName, pr.Dosage,
+               pr.Frequency, pr.Duration, pr.Instructions, pr.IsDispensed, pr.DispensedDate,
+               d.DoctorName, v.VisitDate
+        FROM Prescriptions pr
+        JOIN Visits v ON pr.VisitID = v.VisitID
+        JOIN Patients p ON v.PatientID = p.PatientID
+        JOIN Doctors d ON v.DoctorID = d.DoctorID
+        WHERE (? = 0 OR pr.IsDispensed = 0)
+        ORDER BY v.VisitDate DESC
+    """,
+    "sp_GetPatientFiles": """
+        SELECT f.FileID, f.FileType, f.FileName, f.FileExtension, f.FileSize, f.Description,
+               f.UploadedAt, u.Username AS UploadedByUsername
+        FROM MedicalFiles f
+        LEFT JOIN Users u ON f.UploadedBy = u.UserID
+        WHERE f.PatientID = ?
+        ORDER BY f.UploadedAt DESC
+    """,
+}
+
+_EXEC = re.compile(r"^\s*EXEC\s+(\w+)", re.IGNORECASE)
+_OUTPUT = re.compile(r"\s+OUTPUT\s+INSERTED\.(\w+)\s+", re.IGNORECASE)
+_GETDATE = re.compile(r"\bGETDATE\(\)", re.IGNORECASE)
+_PLAIN_TYPES = (int, float, str, bytes, type(None))
+
+
+@lru_cache(maxsize=512)
+def translate(sql):
+    """
+    Rewrites the T-SQL used by app.py into SQLite: EXEC of a known stored
+    procedure, OUTPUT INSERTED.<col> (as RETURNING) and GETDATE().
+    """
+    match = _EXEC.match(sql)
+    if match:
+        return PROCEDURES[match.group(1)]
+
+    returning = _OUTPUT.search(sql)
+    if returning:
+        sql = _OUTPUT.sub(" ", sql).rstrip() + f" RETURNING {returning.group(1)}"
+
+    return _GETDATE.sub("datetime('now', 'localtime')", sql)
+
+
+@lru_cache(maxsize=512)
+def _row_class(names):
+    return collections.namedtuple("Row", names, rename=True)
+
+
+def _plain(value):
+    # pandas hands over numpy scalars, which sqlite3 cannot bind
+    if isinstance(value, _PLAIN_TYPES) or isinstance(value, (datetime.date, datetime.datetime)):
+        return value
+    return value.item() if hasattr(value, "item") else value
+
+
+def _parse_datetime(raw):
+    text = raw.decode()
+    try:
+        return datetime.datetime.fromisoformat(text)
+    except ValueError:
+        return text
+
+
+def _parse_date(raw):
+    text = raw.decode()
+    try:
+        return datetime.date.fromisoformat(text[:10])
+    except ValueError:
+        return text
+
+
+sqlite3.register_adapter(datetime.datetime, lambda value: value.isoformat(" "))
+sqlite3.register_adapter(datetime.date, lambda value: value.isoformat())
+sqlite3.register_converter("DATETIME", _parse_datetime)
+sqlite3.register_converter("DATE", _parse_date)
+
+
+class SQLiteCursor:
+    """
+    Cursor with pyodbc's calling conventions: scalar or sequence parameters,
+    rows readable by index, by attribute and by unpacking.
+    """
+
+    def __init__(self, cursor):
+        self._cursor = cursor
+        self._row = None
+        self.fast_executemany = False
+
+    def execute(self, sql, *params):
+        if len(params) == 1 and isinstance(params[0], (list, tuple)):
+            params = params[0]
+        self._cursor.execute(translate(sql), [_plain(p) for p in params])
+        description = self._cursor.description
+        self._row = _row_class(tuple(c[0] for c in description)) if description else None
+        return self
+
+    def executemany(self, sql, seq_of_params):
+        self._cursor.executemany(translate(sql), ([_plain(p) for p in params] for params in seq_of_params))
+
+    def fetchone(self):
+        row = self._cursor.fetchone()
+        return None if row is None else self._row._make(row)
+
+    def fetchmany(self, size=None):
+        rows = self._cursor.fetchmany(size) if size is not None else self._cursor.fetchmany()
+        return [self._row._make(row) for row in rows]
+
+    def fetchall(self):
+        make = self._row._make if self._row is not None else tuple
+        return [make(row) for row in self._cursor.fetchall()]
+
+    @property
+    def description(self):
+        return self._cursor.description
+
+    @property
+    def rowcount(self):
+        return self._cursor.rowcount
+
+    def close(self):
+        self._cursor.close()
+
+
+class SQLiteConnection:
+    def __init__(self, conn):
+        self._conn = conn
+        self.autocommit = False
+
+    def cursor(self):
+        return SQLiteCursor(self._conn.cursor())
+
+    def commit(self):
+        self._conn.commit()
+
+    def rollback(self):
+        self._conn.rollback()
+
+    def close(self):
+        self._conn.close()
+
+    def executescript(self, script):
+        self._conn.executescript(script)
+
+    def executemany(self, sql, rows):
+        # Bulk-load path: plain SQLite SQL, parameters already in storage form
+        self._conn.executemany(sql, rows)
+
+
+def connect(path):
+    conn = sqlite3.connect(path, timeout=30, detect_types=sqlite3.PARSE_DECLTYPES,
+                           check_same_thread=False)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    return SQLiteConnection(conn)
+
+
+def create_schema(conn):
+    # Same versioned scripts as production, from schema/sqlite
+    migrations.migrate(conn, "sqlite")
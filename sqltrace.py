@@ -0,0 +1,108 @@
+import json
+import logging
+import re
+from functools import lru_cache
+
+slow_log = logging.getLogger("sql.slow")
+repeat_log = logging.getLogger("sql.repeated")
+
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r"\b\d+(?:\.\d+)?\b")
+_SPACE = re.compile(r"\s+")
+
+
+@lru_cache(maxsize=1024)
+def normalize_sql(sql):
+    """
+    Collapses whitespace and replaces literals with '?' so statements that
+    differ only by inlined values group together.
+    """
+    sql = _STRING.sub("?", sql)
+    sql = _NUMBER.sub("?", sql)
+    return _SPACE.sub(" ", sql).strip()
+
+
+def param_shape(params, many=False):
+    """
+    Describes parameters by type only, e.g. "(int, str)" or "many[500](int)",
+    so nothing patient-identifying ends up in the logs.
+    """
+    if many:
+        rows = params if isinstance(params, (list, tuple)) else list(params)
+        first = param_shape(rows[0]) if rows else "()"
+        return f"many[{len(rows)}]{first}"
+
+    if len(params) == 1 and isinstance(params[0], (list, tuple)):
+        params = params[0]
+    return "(" + ", ".join(type(p).__name__ for p in params) + ")"
+
+
+class RequestTrace:
+    """
+    Statements run during one request, grouped by normalized SQL.
+    """
+
+    def __init__(self):
+        self.statements = {}  # normalized sql -> [count, total seconds]
+        self.total_time = 0.0
+        self.count = 0
+
+    def add(self, sql, elapsed):
+        entry = self.statements.get(sql)
+        if entry is None:
+            entry = self.statements[sql] = [0, 0.0]
+        entry[0] += 1
+        entry[1] += elapsed
+        self.count += 1
+        self.total_time += elapsed
+
+    def repeated(self, threshold):
+        return {sql: entry for sql, entry in self.statements.items() if entry[0] > threshold}
+
+    def summary(self, threshold):
+        return (f"statements={self.count}; distinct={len(self.statements)}; "
+                f"time_ms={self.total_time * 1000:.1f}; repeated={len(self.repeated(threshold))}")
+
+
+class SqlTraceListener:
+    """
+    DB listener that writes slow statements to the `sql.slow` log and
+    records every statement on the current request's RequestTrace.
+    """
+
+    def __init__(self, get_trace, slow_threshold=0.5):
+        self.get_trace = get_trace
+        self.slow_threshold = slow_threshold
+
+    def on_execute(self, sql, params, elapsed, many):
+        normalized = normalize_sql(sql)
+
+        if elapsed >= self.slow_threshold:
+            slow_log.warning(json.dumps({
+                "event": "slow_query",
+                "sql": normalized,
+                "params": param_shape(params, many),
+                "ms": round(elapsed * 1000, 1),
+            }))
+
+        trace = self.get_trace()
+        if trace is not None:
+            trace.add(normalized, elapsed)
+
+    def on_fetch(self, rows, elapsed):
+        pass
+
+
+def report_repeats(trace, route, threshold):
+    """
+    Logs statements that ran more than `threshold` times in one request,
+    the usual sign of a per-row (N+1) query loop.
+    """
+    for sql, (count, total) in trace.repeated(threshold).items():
+        repeat_log.warning(json.dumps({
+            "event": "repeated_statement",
+            "route": route,
+            "sql": sql,
+            "count": count,
+            "ms": round(total * 1000, 1),
+        }))
@@ -0,0 +1,10 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from tools.query_plans import run_checks  # noqa: E402
+
+
+def test_hot_path_statements_use_indexes():
+    assert run_checks() == []
@@ -0,0 +1,80 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+
+
+class TokenCache:
+    """
+    Bounded LRU cache of verified JWT claims.
+
+    Entries are keyed by a SHA-256 digest of the raw token, so the tokens
+    themselves are never held in memory, and are dropped once the token's
+    `exp` has passed. Concurrent misses on the same token share a single
+    verification.
+    """
+
+    def __init__(self, max_entries=10000):
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._in_flight = {}
+        self._lock = threading.Lock()
+
+    def get_or_verify(self, token, verify):
+        """
+        Returns the cached claims for `token`, or calls `verify(token)` and
+        caches its result. Exceptions from `verify` propagate and nothing is
+        cached. Callers arriving while the same token is being verified wait
+        for that result instead of verifying it again.
+        """
+        key = hashlib.sha256(token.encode()).digest()
+        now = time.time()
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                claims, expires_at = entry
+                if expires_at > now:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return dict(claims)
+                del self._entries[key]
+            self.misses += 1
+            future = self._in_flight.get(key)
+            leader = future is None
+            if leader:
+                future = self._in_flight[key] = Future()
+
+        if not leader:
+            return dict(future.result())
+
+        try:
+            claims = verify(token)
+        except BaseException as e:
+            with self._lock:
+                del self._in_flight[key]
+            future.set_exception(e)
+            raise
+
+        expires_at = claims.get("exp")
+        with self._lock:
+            del self._in_flight[key]
+            if expires_at is not None:
+                self._entries[key] = (dict(claims), expires_at)
+                self._entries.move_to_end(key)
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+        future.set_result(dict(claims))
+
+        return claims
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            return {"size": len(self._entries), "hits": self.hits, "misses": self.misses}
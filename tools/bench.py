@@ -0,0 +1,493 @@
+"""
+Benchmarks every API route against a seeded local SQLite database.
+
+    python -m tools.bench --patients 5000 --requests 200 --concurrency 4
+    python -m tools.bench --server --out results/after.json --baseline results/before.json
+
+Results (throughput and p50/p95/p99 latency per route) are written as JSON
+so runs can be compared; with --baseline the run fails if any route's p95
+regressed by more than --max-regression.
+"""
+import argparse
+import cProfile
+import datetime
+import hashlib
+import http.client
+import io
+import json
+import logging
+import math
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from tools import datagen  # noqa: E402
+
+
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return 0.0
+    # nearest-rank
+    rank = math.ceil(pct / 100.0 * len(sorted_values))
+    return sorted_values[max(rank, 1) - 1]
+
+
+# =================================================
+# TRANSPORTS
+# =================================================
+class TestClientTransport:
+    """
+    Calls the app in-process through Flask's test client.
+    """
+
+    def __init__(self, app):
+        self.app = app
+        self._local = threading.local()
+
+    def send(self, req):
+        client = getattr(self._local, "client", None)
+        if client is None:
+            client = self._local.client = self.app.test_client()
+
+        kwargs = {"headers": req.get("headers", {})}
+        if "json" in req:
+            kwargs["json"] = req["json"]
+        if "data" in req:
+            kwargs["data"] = req["data"]
+        if "files" in req:
+            data = dict(req.get("form", {}))
+            for field, (filename, content) in req["files"].items():
+                data[field] = (io.BytesIO(content), filename)
+            kwargs["data"] = data
+            kwargs["content_type"] = "multipart/form-data"
+        response = client.open(req["path"], method=req["method"], **kwargs)
+        try:
+            return response.status_code, len(response.get_data())
+        finally:
+            response.close()  # as a WSGI server would; runs call_on_close callbacks
+
+
+class HTTPTransport:
+    """
+    Sends real HTTP requests over one keep-alive connection per thread.
+    """
+
+    def __init__(self, host, port):
+        self.host = host
+        self.port = port
+        self._local = threading.local()
+
+    def send(self, req):
+        status, data = self.fetch(req)
+        return status, len(data)
+
+    def fetch(self, req):
+        """
+        Like send(), but returns the response body instead of its size.
+        """
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._local.conn = http.client.HTTPConnection(self.host, self.port, timeout=60)
+
+        headers = dict(req.get("headers", {}))
+        body = None
+        if "json" in req:
+            body = json.dumps(req["json"]).encode()
+            headers["Content-Type"] = "application/json"
+        elif "data" in req:
+            body = req["data"]
+        elif "files" in req:
+            body, headers["Content-Type"] = encode_multipart(req.get("form", {}), req["files"])
+
+        try:
+            conn.request(req["method"], req["path"], body=body, headers=headers)
+            response = conn.getresponse()
+            data = response.read()
+        except (http.client.HTTPException, OSError):
+            conn.close()
+            self._local.conn = None
+            raise
+        return response.status, data
+
+
+def encode_multipart(form, files):
+    boundary = uuid.uuid4().hex
+    parts = []
+    for name, value in form.items():
+        parts.append(f'--{boundary}\r\nContent-Disposition: form-data; name="{name}"\r\n\r\n{value}\r\n'.encode())
+    for name, (filename, content) in files.items():
+        parts.append(f'--{boundary}\r\nContent-Disposition: form-data; name="{name}"; filename="{filename}"\r\n'
+                     f'Content-Type: application/octet-stream\r\n\r\n'.encode() + content + b"\r\n")
+    parts.append(f"--{boundary}--\r\n".encode())
+    return b"".join(parts), f"multipart/form-data; boundary={boundary}"
+
+
+# =================================================
+# ROUTES
+# =================================================
+def build_scenarios(hospital, counts, tokens):
+    """
+    Returns [(name, make_request)] covering every route in app.py.
+    make_request(i) builds the i-th request for that route.
+    """
+    patients = counts["Patients"]
+    visits = counts["Visits"]
+    diagnoses = counts["Diagnoses"]
+    prescriptions = counts["Prescriptions"]
+    files = counts["MedicalFiles"]
+
+    def auth(role):
+        return {"Authorization": f"Bearer {tokens[role]}"}
+
+    def fresh_token(i):
+        # logout revokes the token it is called with, so each call needs its own
+        return hospital.jwt.encode({
+            "user_id": 1, "role": "Admin", "jti": uuid.uuid4().hex,
+            "iat": datetime.datetime.utcnow(),
+            "exp": datetime.datetime.utcnow() + datetime.timedelta(hours=1),
+        }, hospital.SECRET_KEY, algorithm="HS256")
+
+    csv_body = "Name,Email,Gender,DOB,Phone,Address,BloodGroup\n"
+    unique = uuid.uuid4().hex[:8]
+
+    def import_request(i):
+        rows = "".join(f"Imported {i}-{n},import{unique}-{i}-{n}@hospital.test,Female,1990-01-01,"
+                       f"555-0000,1 Road,O+\n" for n in range(20))
+        return {"method": "POST", "path": "/api/admin/import-patients", "headers": auth("admin"),
+                "files": {"file": (f"import_{i}.csv", (csv_body + rows).encode())}}
+
+    # Chunked uploads: sessions are set up directly, outside the timed request
+    doctor_user_id = hospital.decode_token(tokens["doctor"])["user_id"]
+    chunk = b"DICM" + os.urandom(64 * 1024 - 4)
+    chunk_hash = hashlib.sha256(chunk).hexdigest()
+
+    def upload_session(i, received=False):
+        upload_id = hospital.resumable_uploads.create(
+            doctor_user_id, i % patients + 1, None, "Imaging", f"study_{i}.dcm", "dcm", "", len(chunk))["upload_id"]
+        if received:
+            hospital.resumable_uploads.write_chunk(upload_id, doctor_user_id, 0, chunk, chunk_hash)
+        return upload_id
+
+    status_upload_id = upload_session(0, received=True)
+
+    # Patients with at least one file; the archive of one without is a 404
+    conn = hospital.get_db_connection()
+    cur = conn.cursor()
+    cur.execute("SELECT DISTINCT PatientID FROM MedicalFiles ORDER BY PatientID")
+    patients_with_files = [row[0] for row in cur.fetchall()] or [1]
+    cur.close()
+    conn.close()
+
+    # A profile to download, named the way SampledProfiler names them
+    profile_name = "0.GET.api.bench.0ms.prof"
+    os.makedirs(hospital.app.config['PROFILE_DIR'], exist_ok=True)
+    cProfile.Profile().dump_stats(os.path.join(hospital.app.config['PROFILE_DIR'], profile_name))
+
+    return [
+        ("GET /", lambda i: {"method": "GET", "path": "/"}),
+        ("POST /api/auth/login", lambda i: {
+            "method": "POST", "path": "/api/auth/login",
+            "json": {"username": f"patient{i % patients + 1}", "password": datagen.SEED_PASSWORD}}),
+        ("POST /api/auth/register", lambda i: {
+            "method": "POST", "path": "/api/auth/register",
+            "json": {"username": f"bench{unique}{i}", "password": "secret", "email": f"bench{unique}{i}@x.test",
+                     "name": "Bench User", "gender": "Male", "dob": "1990-01-01", "phone": "555",
+                     "address": "1 Road", "blood_group": "O+"}}),
+        ("POST /api/auth/logout", lambda i: {
+            "method": "POST", "path": "/api/auth/logout",
+            "headers": {"Authorization": f"Bearer {fresh_token(i)}"}}),
+        ("GET /api/dashboard/stats", lambda i: {
+            "method": "GET", "path": "/api/dashboard/stats", "headers": auth("admin")}),
+        ("GET /api/patients", lambda i: {"method": "GET", "path": "/api/patients", "headers": auth("doctor")}),
+        ("GET /api/patients/<pid>", lambda i: {
+            "method": "GET", "path": f"/api/patients/{i % patients + 1}", "headers": auth("doctor")}),
+        ("PUT /api/patients/<pid>", lambda i: {
+            "method": "PUT", "path": f"/api/patients/{i % patients + 1}", "headers": auth("admin"),
+            "json": {"name": f"Patient {i % patients + 1}", "phone": "555", "address": "2 Road",
+                     "emergency_contact": "555", "emergency_contact_name": "Contact"}}),
+        ("GET /api/doctors", lambda i: {"method": "GET", "path": "/api/doctors", "headers": auth("doctor")}),
+        ("GET /api/visits", lambda i: {"method": "GET", "path": "/api/visits", "headers": auth("doctor")}),
+        ("POST /api/visits", lambda i: {
+            "method": "POST", "path": "/api/visits", "headers": auth("doctor"),
+            "json": {"patient_id": i % patients + 1, "doctor_id": 1, "reason": "Follow-up"}}),
+        ("GET /api/records/all", lambda i: {
+            "method": "GET", "path": "/api/records/all", "headers": auth("doctor")}),
+        ("GET /api/records/my", lambda i: {"method": "GET", "path": "/api/records/my", "headers": auth("patient")}),
+        ("POST /api/diagnosis", lambda i: {
+            "method": "POST", "path": "/api/diagnosis", "headers": auth("doctor"),
+            "json": {"visit_id": i % visits + 1, "name": "Influenza"}}),
+        ("PUT /api/diagnosis/<did>", lambda i: {
+            "method": "PUT", "path": f"/api/diagnosis/{i % diagnoses + 1}", "headers": auth("doctor"),
+            "json": {"name": "Influenza", "severity": "Moderate"}}),
+        ("DELETE /api/diagnosis/<did>", lambda i: {
+            "method": "DELETE", "path": f"/api/diagnosis/{diagnoses - i}", "headers": auth("doctor")}),
+        ("GET /api/prescriptions", lambda i: {
+            "method": "GET", "path": "/api/prescriptions", "headers": auth("pharmacist")}),
+        ("GET /api/prescriptions?pending=1", lambda i: {
+            "method": "GET", "path": "/api/prescriptions?pending=1", "headers": auth("pharmacist")}),
+        ("POST /api/prescriptions", lambda i: {
+            "method": "POST", "path": "/api/prescriptions", "headers": auth("doctor"),
+            "json": {"visit_id": i % visits + 1, "medicine": "Paracetamol", "dosage": "500mg"}}),
+        ("POST /api/prescriptions/<pid>/dispense", lambda i: {
+            "method": "POST", "path": f"/api/prescriptions/{i % prescriptions + 1}/dispense",
+            "headers": auth("pharmacist")}),
+        ("POST /api/files/upload", lambda i: {
+            "method": "POST", "path": "/api/files/upload", "headers": auth("doctor"),
+            "form": {"patient_id": str(i % patients + 1), "file_type": "Lab Report"},
+            "files": {"file": (f"scan_{i}.pdf", b"%PDF-1.4\n" + os.urandom(64 * 1024))}}),
+        ("POST /api/files/uploads", lambda i: {
+            "method": "POST", "path": "/api/files/uploads", "headers": auth("doctor"),
+            "json": {"patient_id": i % patients + 1, "filename": f"study_{i}.dcm", "file_type": "Imaging",
+                     "size": len(chunk)}}),
+        ("PUT /api/files/uploads/<upload_id>", lambda i: {
+            "method": "PUT", "path": f"/api/files/uploads/{upload_session(i)}?offset=0",
+            "headers": {**auth("doctor"), "X-Chunk-SHA256": chunk_hash}, "data": chunk}),
+        ("GET /api/files/uploads/<upload_id>", lambda i: {
+            "method": "GET", "path": f"/api/files/uploads/{status_upload_id}", "headers": auth("doctor")}),
+        ("POST /api/files/uploads/<upload_id>/complete", lambda i: {
+            "method": "POST", "path": f"/api/files/uploads/{upload_session(i, received=True)}/complete",
+            "headers": auth("doctor")}),
+        ("DELETE /api/files/uploads/<upload_id>", lambda i: {
+            "method": "DELETE", "path": f"/api/files/uploads/{upload_session(i)}", "headers": auth("doctor")}),
+        ("GET /api/files/patient/<pid>", lambda i: {
+            "method": "GET", "path": f"/api/files/patient/{i % patients + 1}", "headers": auth("doctor")}),
+        ("GET /api/files/patient/<pid>/archive", lambda i: {
+            "method": "GET", "path": f"/api/files/patient/{patients_with_files[i % len(patients_with_files)]}/archive",
+            "headers": auth("doctor")}),
+        ("GET /api/files/download/<fid>", lambda i: {
+            "method": "GET", "path": f"/api/files/download/{i % max(files, 1) + 1}", "headers": auth("doctor")}),
+        ("DELETE /api/files/<fid>", lambda i: {
+            "method": "DELETE", "path": f"/api/files/{files - i}", "headers": auth("doctor")}),
+        ("POST /api/admin/import-patients", import_request),
+        ("POST /api/admin/users/<uid>/deactivate", lambda i: {
+            "method": "POST", "path": f"/api/admin/users/{counts['Users'] - i}/deactivate",
+            "headers": auth("admin")}),
+        ("GET /api/admin/profiles", lambda i: {
+            "method": "GET", "path": "/api/admin/profiles", "headers": auth("admin")}),
+        ("GET /api/admin/profiles/<name>", lambda i: {
+            "method": "GET", "path": f"/api/admin/profiles/{profile_name}", "headers": auth("admin")}),
+        ("GET /api/admin/profiles/samples", lambda i: {
+            "method": "GET", "path": "/api/admin/profiles/samples?seconds=5", "headers": auth("admin")}),
+        ("GET /metrics", lambda i: {"method": "GET", "path": "/metrics"}),
+    ]
+
+
+def run_scenario(transport, make_request, requests, concurrency, warmup):
+    for i in range(warmup):
+        transport.send(make_request(requests + i))
+
+    latencies = []
+    statuses = {}
+    sizes = []
+    lock = threading.Lock()
+
+    def one(i):
+        req = make_request(i)
+        started = time.perf_counter()
+        try:
+            status, size = transport.send(req)
+        except Exception:
+            status, size = "exception", 0
+        elapsed = time.perf_counter() - started
+        with lock:
+            latencies.append(elapsed)
+            statuses[str(status)] = statuses.get(str(status), 0) + 1
+            sizes.append(size)
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(one, range(requests)))
+    wall = time.perf_counter() - started
+
+    latencies.sort()
+    errors = sum(count for status, count in statuses.items() if not status.startswith(("2", "3")))
+    return {
+        "requests": requests,
+        "errors": errors,
+        "statuses": statuses,
+        "throughput_rps": round(requests / wall, 2) if wall else 0.0,
+        "mean_ms": round(sum(latencies) / len(latencies) * 1000, 3),
+        "p50_ms": round(percentile(latencies, 50) * 1000, 3),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 3),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 3),
+        "mean_bytes": int(sum(sizes) / len(sizes)) if sizes else 0,
+    }
+
+
+def compare(results, baseline, max_regression):
+    """
+    Returns a list of human-readable regressions against a baseline run.
+    """
+    regressions = []
+    for name, current in results["routes"].items():
+        previous = baseline.get("routes", {}).get(name)
+        if not previous or not previous["p95_ms"]:
+            continue
+        change = (current["p95_ms"] - previous["p95_ms"]) / previous["p95_ms"]
+        if change > max_regression:
+            regressions.append(f"{name}: p95 {previous['p95_ms']}ms -> {current['p95_ms']}ms (+{change:.0%})")
+    return regressions
+
+
+# =================================================
+# SETUP
+# =================================================
+def prepare_app(workdir, args):
+    """
+    Imports app.py, points it at a freshly seeded SQLite database inside
+    `workdir` and turns off rate limiting and load shedding unless asked to
+    keep them, so each route is measured on its own.
+    """
+    os.chdir(workdir)
+    import app as hospital
+    from passwords import encode_hash
+    from ratelimit import RateLimiter
+    from loadshed import LoadShedder
+
+    db_path = os.path.join(workdir, "bench.db")
+    upload_folder = os.path.join(workdir, "uploads")
+    for sub in ("medical_files", "patient_imports"):
+        os.makedirs(os.path.join(upload_folder, sub), exist_ok=True)
+
+    hospital.app.config.update(DB_BACKEND="sqlite", SQLITE_PATH=db_path, UPLOAD_FOLDER=upload_folder,
+                               TRACING_ENABLED=args.trace)
+    hospital.blob_store.root = os.path.join(upload_folder, "medical_files")
+    hospital.resumable_uploads.folder = os.path.join(upload_folder, "incoming")
+    if not args.keep_limits:
+        hospital.rate_limiter = RateLimiter({})
+        hospital.load_shedder = LoadShedder(max_in_flight=float("inf"), db_wait_budget=float("inf"),
+                                            latency_budget=float("inf"))
+
+    conn = hospital.get_db_connection()
+    hospital.sqlite_backend.create_schema(conn)
+    password_hash = encode_hash(datagen.SEED_PASSWORD, hospital.app.config['PASSWORD_HASH_ITERATIONS'])
+    counts = datagen.seed(conn, password_hash, patients=args.patients, doctors=args.doctors,
+                          visits_per_patient=args.visits_per_patient,
+                          prescriptions_per_visit=args.prescriptions_per_visit,
+                          files_per_patient=args.files_per_patient,
+                          upload_dir=os.path.join(upload_folder, "medical_files"), seed_value=args.seed)
+    conn.close()
+    # The once-per-worker schema check, here rather than inside the first route measured
+    hospital.verify_schema()
+    hospital._schema_verified.set()
+
+    def token(user_id, role, **ids):
+        return hospital.jwt.encode({
+            "user_id": user_id, "role": role, "jti": uuid.uuid4().hex,
+            "iat": datetime.datetime.utcnow(),
+            "exp": datetime.datetime.utcnow() + datetime.timedelta(hours=8), **ids,
+        }, hospital.SECRET_KEY, algorithm="HS256")
+
+    # datagen creates admin, then doctors, then pharmacists, then patients
+    pharmacist_user = 1 + args.doctors + 1
+    patient_user = 1 + args.doctors + counts["Pharmacists"] + 1
+    tokens = {
+        "admin": token(1, "Admin"),
+        "doctor": token(2, "Doctor", doctor_id=1),
+        "pharmacist": token(pharmacist_user, "Pharmacist", pharmacist_id=1),
+        "patient": token(patient_user, "Patient", patient_id=1),
+    }
+    return hospital, counts, tokens
+
+
+def git_revision():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT,
+                                       stderr=subprocess.DEVNULL).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--patients", type=int, default=2000)
+    parser.add_argument("--doctors", type=int, default=20)
+    parser.add_argument("--visits-per-patient", type=float, default=3)
+    parser.add_argument("--prescriptions-per-visit", type=float, default=1)
+    parser.add_argument("--files-per-patient", type=float, default=1)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--requests", type=int, default=100, help="measured requests per route")
+    parser.add_argument("--warmup", type=int, default=5)
+    parser.add_argument("--concurrency", type=int, default=1)
+    parser.add_argument("--only", default=None, help="only run routes whose name contains this text")
+    parser.add_argument("--server", action="store_true", help="benchmark over HTTP against a local server")
+    parser.add_argument("--trace", action="store_true", help="leave span tracing on")
+    parser.add_argument("--keep-limits", action="store_true", help="leave rate limiting and load shedding on")
+    parser.add_argument("--sampler", action="store_true", help="run the stack sampler, to measure its overhead")
+    parser.add_argument("--out", default=None, help="results file (default results/bench-<time>.json)")
+    parser.add_argument("--baseline", default=None, help="earlier results file to compare against")
+    parser.add_argument("--max-regression", type=float, default=0.2, help="allowed p95 increase, e.g. 0.2 = 20%%")
+    args = parser.parse_args()
+
+    out = os.path.abspath(args.out or os.path.join(
+        "results", f"bench-{datetime.datetime.now().strftime('%Y%m%d_%H%M%S')}.json"))
+    baseline_path = os.path.abspath(args.baseline) if args.baseline else None
+
+    with tempfile.TemporaryDirectory(prefix="hms-bench-") as workdir:
+        hospital, counts, tokens = prepare_app(workdir, args)
+        if args.sampler:
+            hospital.stack_sampler.start()
+
+        server = None
+        if args.server:
+            from werkzeug.serving import make_server
+            logging.getLogger("werkzeug").setLevel(logging.WARNING)
+            server = make_server("127.0.0.1", 0, hospital.app, threaded=True)
+            threading.Thread(target=server.serve_forever, daemon=True).start()
+            transport = HTTPTransport("127.0.0.1", server.server_port)
+        else:
+            transport = TestClientTransport(hospital.app)
+
+        results = {
+            "meta": {
+                "timestamp": datetime.datetime.now().isoformat(timespec="seconds"),
+                "git_revision": git_revision(),
+                "python": platform.python_version(),
+                "platform": platform.platform(),
+                "mode": "server" if args.server else "test_client",
+                "sampler": args.sampler,
+                "requests": args.requests,
+                "concurrency": args.concurrency,
+                "dataset": counts,
+            },
+            "routes": {},
+        }
+
+        for name, make_request in build_scenarios(hospital, counts, tokens):
+            if args.only and args.only not in name:
+                continue
+            stats = run_scenario(transport, make_request, args.requests, args.concurrency, args.warmup)
+            results["routes"][name] = stats
+            print(f"{name:45} {stats['throughput_rps']:>9.1f} req/s  p50 {stats['p50_ms']:>8.2f}ms  "
+                  f"p95 {stats['p95_ms']:>8.2f}ms  p99 {stats['p99_ms']:>8.2f}ms  errors {stats['errors']}")
+
+        if server is not None:
+            server.shutdown()
+        hospital.write_behind.shutdown()
+        os.chdir(ROOT)
+
+    os.makedirs(os.path.dirname(out), exist_ok=True)
+    with open(out, "w") as f:
+        json.dump(results, f, indent=2)
+    print(f"Results written to {out}")
+
+    if baseline_path:
+        with open(baseline_path) as f:
+            regressions = compare(results, json.load(f), args.max_regression)
+        for line in regressions:
+            print(f"REGRESSION {line}")
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""
+Compares list serialization: the old per-value isoformat loop feeding
+Flask's DefaultJSONProvider against FastJSONProvider.rows_response(), as
+objects and in the columnar format.
+
+    python -m tools.bench_json --rows 1000 10000 100000
+"""
+import argparse
+import datetime
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from flask import Flask  # noqa: E402
+from flask.json.provider import DefaultJSONProvider  # noqa: E402
+
+from fastjson import COLUMNAR_MIMETYPE, FastJSONProvider  # noqa: E402
+
+COLUMNS = ["PatientID", "PatientName", "Email", "Gender", "DateOfBirth", "PhoneNumber", "Address",
+           "BloodGroup", "EmergencyContact", "EmergencyContactName", "CreatedAt"]
+
+
+def make_rows(count):
+    created = datetime.datetime(2024, 1, 1, 9, 30)
+    return [(i, f"Patient {i}", f"patient{i}@hospital.test", "Female", datetime.date(1980, 1, 1 + i % 28),
+             f"557-{i:07d}", f"{i} Main Street", "O+", f"558-{i:07d}", f"Contact {i}",
+             created + datetime.timedelta(minutes=i)) for i in range(count)]
+
+
+def old_path(provider, cols, rows):
+    patients = []
+    for row in rows:
+        patient = {}
+        for i, col in enumerate(cols):
+            val = row[i]
+            if isinstance(val, (datetime.datetime, datetime.date)):
+                val = val.isoformat()
+            patient[col] = val
+        patients.append(patient)
+    return provider.response(patients).get_data()
+
+
+def new_path(provider, cols, rows):
+    return provider.rows_response(cols, rows).get_data()
+
+
+def timed(fns, repeat):
+    """
+    Best-of-`repeat` CPU time per function, runs interleaved so machine
+    noise hits every variant alike. Returns [(seconds, body size)].
+    """
+    best = [float("inf")] * len(fns)
+    sizes = [0] * len(fns)
+    for _ in range(repeat):
+        for i, fn in enumerate(fns):
+            started = time.process_time()
+            sizes[i] = len(fn())
+            best[i] = min(best[i], time.process_time() - started)
+    return list(zip(best, sizes))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--repeat", type=int, default=10, help="best of N runs")
+    args = parser.parse_args()
+
+    app = Flask(__name__)
+    default, fast = DefaultJSONProvider(app), FastJSONProvider(app)
+    plain = app.test_request_context()
+    columnar = app.test_request_context(headers={"Accept": COLUMNAR_MIMETYPE})
+
+    def in_context(context, fn):
+        with context:
+            return fn()
+
+    for count in args.rows:
+        rows = make_rows(count)
+        results = timed([
+            lambda: in_context(plain, lambda: old_path(default, COLUMNS, rows)),
+            lambda: in_context(plain, lambda: new_path(fast, COLUMNS, rows)),
+            lambda: in_context(columnar, lambda: new_path(fast, COLUMNS, rows)),
+        ], args.repeat)
+        old = results[0][0]
+        print(f"{count:>8} rows  " + "  ".join(
+            f"{name} {seconds * 1000:>8.1f}ms {size / 1e6:>5.1f} MB {old / seconds:>5.2f}x"
+            for name, (seconds, size) in zip(["old", "new", "columnar"], results)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,358 @@
+"""
+Generates synthetic hospital data and bulk-loads it into the schema app.py uses.
+
+    python -m tools.datagen --sqlite bench.db --patients 1000000
+    python -m tools.datagen --mssql "DRIVER=...;SERVER=...;DATABASE=..." --patients 10000
+    python -m tools.datagen --import-file patients.xlsx --import-rows 50000
+
+Output is fully determined by --seed and --now, the date every timestamp
+is generated relative to (a fixed day by default, not the clock). Rows are generated and inserted in
+batches, so memory stays flat at any volume. Visit counts are skewed
+(chronic patients visit far more often), doctors have weighted
+specialties, and dispensed/pending prescription and chronic diagnosis
+ratios are configurable. Dummy medical files are written into the blob
+store layout the API uses, each with its FileBlobs row. Target tables must
+be empty: IDs are not sent, so they are assumed to be assigned 1..N in
+insertion order.
+"""
+import argparse
+import bisect
+import csv
+import datetime
+import functools
+import hashlib
+import itertools
+import os
+import random
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import sqlite_backend  # noqa: E402
+from blobstore import BlobStore  # noqa: E402
+
+SPECIALTIES = [("General Medicine", 35), ("Pediatrics", 15), ("Cardiology", 12), ("Orthopedics", 12),
+               ("Dermatology", 8), ("Neurology", 6), ("ENT", 6), ("Gynecology", 6)]
+BLOOD_GROUPS = [("O+", 37), ("A+", 28), ("B+", 20), ("AB+", 5), ("O-", 4), ("A-", 3), ("B-", 2), ("AB-", 1)]
+CHRONIC_DIAGNOSES = ["Hypertension", "Type 2 Diabetes", "Asthma", "COPD", "Chronic Kidney Disease",
+                     "Hypothyroidism", "Rheumatoid Arthritis"]
+ACUTE_DIAGNOSES = ["Influenza", "Upper Respiratory Infection", "Gastroenteritis", "Migraine", "Sprain",
+                   "Urinary Tract Infection", "Conjunctivitis", "Fracture"]
+MEDICINES = [("Paracetamol", "500mg"), ("Amoxicillin", "250mg"), ("Metformin", "500mg"),
+             ("Atorvastatin", "20mg"), ("Omeprazole", "20mg"), ("Amlodipine", "5mg"),
+             ("Salbutamol", "100mcg"), ("Levothyroxine", "50mcg"), ("Ibuprofen", "400mg")]
+FILE_TYPES = [("Lab Report", "pdf"), ("X-Ray", "jpg"), ("MRI", "dcm"), ("Prescription", "pdf")]
+FIRST_NAMES = ["Aarav", "Diya", "Ishaan", "Ananya", "Rohan", "Priya", "Vikram", "Meera", "Arjun", "Kavya",
+               "Sanjay", "Lakshmi", "Rahul", "Sneha", "Karthik", "Divya"]
+LAST_NAMES = ["Sharma", "Reddy", "Iyer", "Patel", "Nair", "Gupta", "Rao", "Menon", "Singh", "Kumar"]
+SEVERITIES = ["Mild", "Moderate", "Severe"]
+
+# Every seeded account uses this password
+SEED_PASSWORD = "password123"
+
+# Default --now: seeded timestamps are relative to this, so runs with the same seed are identical
+DEFAULT_NOW = "2025-01-01"
+
+
+class WeightedChoice:
+    def __init__(self, weighted):
+        self.values = [value for value, _ in weighted]
+        self.cumulative = list(itertools.accumulate(weight for _, weight in weighted))
+
+    def pick(self, rng):
+        return self.values[bisect.bisect_right(self.cumulative, rng.random() * self.cumulative[-1])]
+
+
+class Loader:
+    """
+    Bulk insert into either the SQLite backend or a pyodbc connection.
+    """
+
+    def __init__(self, conn):
+        self.conn = conn
+        # pyodbc connections have no executescript; SQLite ones (possibly wrapped) do
+        self.sqlite = hasattr(conn, "executescript")
+        self.rows = 0
+        if self.sqlite:
+            conn.executescript("PRAGMA synchronous=OFF;")
+        else:
+            self.cursor = conn.cursor()
+            self.cursor.fast_executemany = True
+
+    def insert(self, table, columns, rows):
+        if not rows:
+            return
+        sql = f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))})"
+        if self.sqlite:
+            self.conn.executemany(sql, rows)
+        else:
+            self.cursor.executemany(sql, rows)
+        self.rows += len(rows)
+
+    def commit(self):
+        self.conn.commit()
+
+
+@functools.lru_cache(maxsize=4096)
+def _day(day):
+    return (datetime.date(1970, 1, 1) + datetime.timedelta(days=day)).isoformat()
+
+
+def _epoch(day):
+    return (datetime.date.fromisoformat(day) - datetime.date(1970, 1, 1)).days * 86400
+
+
+def _timestamp(epoch):
+    # strftime per row is the generator's hottest call; only the date part varies slowly
+    day, seconds = divmod(epoch, 86400)
+    return f"{_day(day)} {seconds // 3600:02d}:{seconds // 60 % 60:02d}:{seconds % 60:02d}"
+
+
+def seed(conn, password_hash, patients=1000, doctors=20, pharmacists=2, visits_per_patient=3,
+         prescriptions_per_visit=1, dispensed_ratio=0.8, chronic_ratio=0.15, files_per_patient=0,
+         file_bytes=20000, upload_dir=None, patient_accounts=None, seed_value=42, batch_size=10000,
+         now=DEFAULT_NOW, progress=None):
+    """
+    Fills empty tables and returns the number of rows written per table.
+
+    Accounts: admin, doctor1..N, pharmacist1..N and patient1..N (the first
+    `patient_accounts` patients, all of them by default). Visit counts per
+    patient are exponentially distributed around `visits_per_patient`,
+    with chronic patients weighted three times heavier. Patients are
+    created over the five years before `now` (an ISO date) and visits run
+    up to two weeks after it.
+    """
+    rng = random.Random(seed_value)
+    loader = Loader(conn)
+    counts = dict.fromkeys(["Doctors", "Pharmacists", "Patients", "Users", "Visits", "Diagnoses",
+                            "Prescriptions", "FileBlobs", "MedicalFiles"], 0)
+    now = _epoch(now)
+    year = 365 * 24 * 3600
+    patient_accounts = patients if patient_accounts is None else patient_accounts
+
+    specialty = WeightedChoice(SPECIALTIES)
+    blood_group = WeightedChoice(BLOOD_GROUPS)
+    file_type = WeightedChoice([(t, 1) for t in FILE_TYPES])
+
+    loader.insert("Doctors", ["DoctorName", "Email", "Specialty", "PhoneNumber", "LicenseNumber",
+                              "YearsOfExperience"],
+                  [(f"Dr. {rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}", f"doctor{i}@hospital.test",
+                    specialty.pick(rng), f"555-{i:07d}", f"LIC{i:07d}", rng.randint(1, 35))
+                   for i in range(1, doctors + 1)])
+    loader.insert("Pharmacists", ["PharmacistName", "Email", "PhoneNumber"],
+                  [(f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}", f"pharmacist{i}@hospital.test",
+                    f"556-{i:07d}") for i in range(1, pharmacists + 1)])
+    user_columns = ["Username", "PasswordHash", "Email", "Role", "PatientID", "DoctorID", "PharmacistID",
+                    "CreatedAt"]
+    opened = _timestamp(now - 5 * year)
+    staff = [("admin", password_hash, "admin@hospital.test", "Admin", None, None, None, opened)]
+    staff += [(f"doctor{i}", password_hash, f"doctor{i}@hospital.test", "Doctor", None, i, None, opened)
+              for i in range(1, doctors + 1)]
+    staff += [(f"pharmacist{i}", password_hash, f"pharmacist{i}@hospital.test", "Pharmacist", None, None, i,
+               opened) for i in range(1, pharmacists + 1)]
+    loader.insert("Users", user_columns, staff)
+    counts.update(Doctors=doctors, Pharmacists=pharmacists, Users=len(staff))
+
+    # Weights 3 (chronic) and 1 (other) must average out to visits_per_patient
+    base_visits = visits_per_patient / (chronic_ratio * 3 + (1 - chronic_ratio))
+    file_body = b"%PDF-1.4\n" + bytes(rng.getrandbits(8) for _ in range(max(file_bytes - 9, 0)))
+    store = BlobStore(upload_dir) if files_per_patient and upload_dir else None
+
+    # random() arithmetic instead of randint()/choice(): several times cheaper per call
+    rand = rng.random
+    visit_id = 0
+    started = time.perf_counter()
+    for first in range(1, patients + 1, batch_size):
+        last = min(first + batch_size, patients + 1)
+        patient_rows, user_rows, visit_rows, diagnosis_rows, prescription_rows = [], [], [], [], []
+        blob_rows, file_rows = [], []
+
+        for patient_id in range(first, last):
+            chronic = rand() < chronic_ratio
+            created = now - int(rand() * 5 * year)
+            patient_rows.append((
+                f"{FIRST_NAMES[int(rand() * len(FIRST_NAMES))]} {LAST_NAMES[int(rand() * len(LAST_NAMES))]}",
+                f"patient{patient_id}@hospital.test", "Female" if rand() < 0.51 else "Male",
+                _day(int(rand() * 31000) - 7000), f"557-{patient_id:07d}", f"{int(rand() * 999) + 1} Main Street",
+                blood_group.pick(rng), f"558-{patient_id:07d}",
+                f"{FIRST_NAMES[int(rand() * len(FIRST_NAMES))]} {LAST_NAMES[int(rand() * len(LAST_NAMES))]}", _timestamp(created)))
+            if patient_id <= patient_accounts:
+                user_rows.append((f"patient{patient_id}", password_hash, f"patient{patient_id}@hospital.test",
+                                  "Patient", patient_id, None, None, _timestamp(created)))
+
+            # Chronic patients mostly see the same doctor
+            primary_doctor = int(rand() * doctors) + 1
+            chronic_condition = CHRONIC_DIAGNOSES[int(rand() * len(CHRONIC_DIAGNOSES))] if chronic else None
+            visits = int(rng.expovariate(1.0 / (base_visits * (3 if chronic else 1))) + 0.5)
+            for _ in range(visits):
+                visit_id += 1
+                visit_time = created + int(rand() * (now + 14 * 24 * 3600 - created))
+                completed = visit_time < now
+                doctor_id = primary_doctor if chronic and rand() < 0.7 else int(rand() * doctors) + 1
+                visit_rows.append((patient_id, doctor_id, _timestamp(visit_time), "Consultation",
+                                   f"BP {100 + int(rand() * 60)}/{60 + int(rand() * 40)}", "",
+                                   "Completed" if completed else "Scheduled"))
+                if not completed:
+                    continue
+
+                is_chronic = chronic_condition is not None and rand() < 0.6
+                diagnosis_rows.append((
+                    visit_id, chronic_condition if is_chronic else ACUTE_DIAGNOSES[int(rand() * len(ACUTE_DIAGNOSES))],
+                    "", int(is_chronic), SEVERITIES[int(rand() * 3)]))
+
+                for _ in range(int(rng.expovariate(1.0 / prescriptions_per_visit) + 0.5)):
+                    medicine, dosage = MEDICINES[int(rand() * len(MEDICINES))]
+                    dispensed = rand() < dispensed_ratio
+                    prescription_rows.append((
+                        visit_id, medicine, dosage, "Twice daily", f"{3 + int(rand() * 28)} days", "",
+                        int(dispensed), int(rand() * pharmacists) + 1 if dispensed and pharmacists else None,
+                        _timestamp(visit_time + 600 + int(rand() * 86400)) if dispensed else None))
+
+            if store:
+                for n in range(int(rng.expovariate(1.0 / files_per_patient) + 0.5)):
+                    kind, extension = file_type.pick(rng)
+                    # A distinct header per file, so each one is its own blob as real uploads would be
+                    header = f"%PDF-1.4\n%{patient_id}.{n}\n".encode()
+                    body = header + file_body[len(header):]
+                    content_hash = hashlib.sha256(body).hexdigest()
+                    path = store.path(content_hash)
+                    os.makedirs(os.path.dirname(path), exist_ok=True)
+                    with open(path, "wb") as f:
+                        f.write(body)
+                    blob_rows.append((content_hash, len(body), 1, _timestamp(created)))
+                    file_rows.append((patient_id, 1, kind, f"{kind.lower().replace(' ', '_')}_{n}.{extension}",
+                                      extension, path, len(body), "", _timestamp(created), content_hash))
+
+        loader.insert("Patients", ["PatientName", "Email", "Gender", "DateOfBirth", "PhoneNumber", "Address",
+                                   "BloodGroup", "EmergencyContact", "EmergencyContactName", "CreatedAt"],
+                      patient_rows)
+        loader.insert("Users", user_columns, user_rows)
+        loader.insert("Visits", ["PatientID", "DoctorID", "VisitDate", "ReasonForVisit", "VitalSigns", "Notes",
+                                 "Status"], visit_rows)
+        loader.insert("Diagnoses", ["VisitID", "DiagnosisName", "Description", "IsChronic", "Severity"],
+                      diagnosis_rows)
+        loader.insert("Prescriptions", ["VisitID", "MedicineName", "Dosage", "Frequency", "Duration",
+                                        "Instructions", "IsDispensed", "DispensedBy", "DispensedDate"],
+                      prescription_rows)
+        loader.insert("FileBlobs", ["ContentHash", "FileSize", "RefCount", "CreatedAt"], blob_rows)
+        loader.insert("MedicalFiles", ["PatientID", "UploadedBy", "FileType", "FileName", "FileExtension",
+                                       "FilePath", "FileSize", "Description", "UploadedAt", "ContentHash"], file_rows)
+        loader.commit()
+
+        counts["Patients"] += len(patient_rows)
+        counts["Users"] += len(user_rows)
+        counts["Visits"] += len(visit_rows)
+        counts["Diagnoses"] += len(diagnosis_rows)
+        counts["Prescriptions"] += len(prescription_rows)
+        counts["FileBlobs"] += len(blob_rows)
+        counts["MedicalFiles"] += len(file_rows)
+        if progress:
+            elapsed = time.perf_counter() - started
+            progress(f"{counts['Patients']}/{patients} patients, {loader.rows} rows, "
+                     f"{loader.rows / elapsed:,.0f} rows/s")
+
+    return counts
+
+
+IMPORT_COLUMNS = ["Name", "Email", "Gender", "DOB", "Phone", "Address", "BloodGroup"]
+
+
+def import_records(rows, seed_value=42, duplicate_ratio=0.0, existing_patients=0):
+    """
+    Rows shaped for /api/admin/import-patients, in IMPORT_COLUMNS order.
+    A `duplicate_ratio` share of rows reuse the email of an already seeded
+    patient to exercise the import's duplicate path.
+    """
+    rng = random.Random(seed_value)
+    blood_group = WeightedChoice(BLOOD_GROUPS)
+    records = []
+    for n in range(1, rows + 1):
+        if existing_patients and rng.random() < duplicate_ratio:
+            email = f"patient{rng.randint(1, existing_patients)}@hospital.test"
+        else:
+            email = f"import{seed_value}-{n}@hospital.test"
+        records.append((f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}", email,
+                        rng.choice(["Male", "Female"]),
+                        datetime.date.fromordinal(711858 + rng.randint(0, 31000)).isoformat(),
+                        f"559-{n:07d}", f"{rng.randint(1, 999)} Lake Road", blood_group.pick(rng)))
+    return records
+
+
+def write_import_file(path, rows, seed_value=42, duplicate_ratio=0.0, existing_patients=0):
+    """
+    Writes import_records() as a CSV or XLSX, chosen by extension.
+    """
+    records = import_records(rows, seed_value, duplicate_ratio, existing_patients)
+    if path.endswith((".xlsx", ".xls")):
+        import pandas as pd
+        pd.DataFrame.from_records(records, columns=IMPORT_COLUMNS).to_excel(path, index=False)
+    else:
+        with open(path, "w", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(IMPORT_COLUMNS)
+            writer.writerows(records)
+
+
+def main():
+    from passwords import encode_hash
+
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    target = parser.add_mutually_exclusive_group()
+    target.add_argument("--sqlite", help="SQLite database file to create and load")
+    target.add_argument("--mssql", help="pyodbc connection string of an already migrated database")
+    parser.add_argument("--patients", type=int, default=10000)
+    parser.add_argument("--doctors", type=int, default=50)
+    parser.add_argument("--pharmacists", type=int, default=5)
+    parser.add_argument("--visits-per-patient", type=float, default=3, help="mean; skewed per patient")
+    parser.add_argument("--prescriptions-per-visit", type=float, default=1.2, help="mean per completed visit")
+    parser.add_argument("--dispensed-ratio", type=float, default=0.8)
+    parser.add_argument("--chronic-ratio", type=float, default=0.15)
+    parser.add_argument("--files-per-patient", type=float, default=0, help="mean dummy files per patient")
+    parser.add_argument("--file-bytes", type=int, default=20000)
+    parser.add_argument("--upload-dir", default=os.path.join("uploads", "medical_files"),
+                        help="the API's blob store, UPLOAD_FOLDER/medical_files")
+    parser.add_argument("--patient-accounts", type=int, default=None, help="default: one per patient")
+    parser.add_argument("--batch-size", type=int, default=10000, help="patients per insert batch")
+    parser.add_argument("--import-file", help="also write a .csv/.xlsx for import_patients")
+    parser.add_argument("--import-rows", type=int, default=1000)
+    parser.add_argument("--import-duplicates", type=float, default=0.0, help="share of rows with taken emails")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--now", default=DEFAULT_NOW, help="ISO date the seeded timestamps lead up to")
+    args = parser.parse_args()
+
+    if args.sqlite or args.mssql:
+        if args.sqlite:
+            conn = sqlite_backend.connect(args.sqlite)
+            sqlite_backend.create_schema(conn)
+        else:
+            import pyodbc
+            conn = pyodbc.connect(args.mssql, autocommit=False)
+
+        started = time.perf_counter()
+        # A salt from the seed too, so the same seed gives byte-identical databases
+        password_hash = encode_hash(SEED_PASSWORD, 260000, salt=random.Random(args.seed).randbytes(16))
+        counts = seed(conn, password_hash, patients=args.patients, doctors=args.doctors,
+                      pharmacists=args.pharmacists, visits_per_patient=args.visits_per_patient,
+                      prescriptions_per_visit=args.prescriptions_per_visit,
+                      dispensed_ratio=args.dispensed_ratio, chronic_ratio=args.chronic_ratio,
+                      files_per_patient=args.files_per_patient, file_bytes=args.file_bytes,
+                      upload_dir=args.upload_dir, patient_accounts=args.patient_accounts,
+                      seed_value=args.seed, batch_size=args.batch_size, now=args.now, progress=print)
+        conn.close()
+
+        elapsed = time.perf_counter() - started
+        for table, count in counts.items():
+            print(f"{table}: {count}")
+        print(f"{sum(counts.values())} rows in {elapsed:.1f}s")
+
+    if args.import_file:
+        write_import_file(args.import_file, args.import_rows, seed_value=args.seed,
+                          duplicate_ratio=args.import_duplicates,
+                          existing_patients=args.patients if (args.sqlite or args.mssql) else 0)
+        print(f"Wrote {args.import_rows} import rows to {args.import_file}")
+
+
+if __name__ == "__main__":
+    main()
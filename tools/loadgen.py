@@ -0,0 +1,273 @@
+"""
+Replays the clinic's role flows (as App.tsx drives them) against a server.
+
+    python -m tools.loadgen --local --rate 20 --duration 60
+    python -m tools.loadgen --url http://127.0.0.1:5000 --mix patient=60,doctor=30,pharmacist=9,admin=1
+
+Sessions arrive as a Poisson process at --rate per second; each picks a
+role by --mix weight and runs that role's flow step by step over HTTP
+with one keep-alive connection per worker. Accounts are the ones
+tools.datagen seeds. --local seeds a temporary SQLite database and serves
+app.py on a local port. Reports throughput, latency percentiles and error
+rate per step, plus how long sessions waited for a free worker.
+"""
+import argparse
+import base64
+import csv
+import datetime
+import io
+import json
+import logging
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+import urllib.parse
+from concurrent.futures import ThreadPoolExecutor
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from tools import datagen  # noqa: E402
+from tools.bench import HTTPTransport, percentile, prepare_app  # noqa: E402
+
+
+class StepStats:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.latencies = {}
+        self.errors = {}
+        self.queue_delays = []
+
+    def record(self, step, elapsed, ok):
+        with self._lock:
+            self.latencies.setdefault(step, []).append(elapsed)
+            if not ok:
+                self.errors[step] = self.errors.get(step, 0) + 1
+
+    def record_queue_delay(self, delay):
+        with self._lock:
+            self.queue_delays.append(delay)
+
+    def summary(self, wall):
+        steps = {}
+        for step, values in sorted(self.latencies.items()):
+            values = sorted(values)
+            errors = self.errors.get(step, 0)
+            steps[step] = {
+                "requests": len(values),
+                "errors": errors,
+                "error_rate": round(errors / len(values), 4),
+                "throughput_rps": round(len(values) / wall, 2) if wall else 0.0,
+                "p50_ms": round(percentile(values, 50) * 1000, 3),
+                "p95_ms": round(percentile(values, 95) * 1000, 3),
+                "p99_ms": round(percentile(values, 99) * 1000, 3),
+            }
+        delays = sorted(self.queue_delays)
+        return {"steps": steps, "sessions": len(delays),
+                "queue_delay_p95_ms": round(percentile(delays, 95) * 1000, 3)}
+
+
+class Session:
+    """
+    One user's visit to the app: log in, then the calls their screens make.
+    """
+
+    def __init__(self, transport, stats, rng, think):
+        self.transport = transport
+        self.stats = stats
+        self.rng = rng
+        self.think = think
+        self.headers = {}
+        self.claims = {}
+
+    def call(self, step, method, path, **req):
+        req.update(method=method, path=path)
+        req["headers"] = {**self.headers, **req.get("headers", {})}
+        started = time.perf_counter()
+        try:
+            status, body = self.transport.fetch(req)
+        except Exception:
+            status, body = None, b""
+        ok = status is not None and status < 400
+        self.stats.record(step, time.perf_counter() - started, ok)
+        if self.think:
+            time.sleep(self.rng.expovariate(1.0 / self.think))
+        if not ok:
+            return None
+        try:
+            return json.loads(body)
+        except ValueError:
+            return body
+
+    def login(self, username):
+        data = self.call("login", "POST", "/api/auth/login",
+                         json={"username": username, "password": datagen.SEED_PASSWORD})
+        if not data:
+            return False
+        token = data["token"]
+        self.headers = {"Authorization": f"Bearer {token}"}
+        payload = token.split(".")[1]
+        self.claims = json.loads(base64.urlsafe_b64decode(payload + "=" * (-len(payload) % 4)))
+        return True
+
+
+def patient_flow(s, accounts):
+    if not s.login(f"patient{s.rng.randint(1, accounts['patient'])}"):
+        return
+    s.call("dashboard", "GET", "/api/dashboard/stats")
+    s.call("records/my", "GET", "/api/records/my")
+    files = s.call("files/patient", "GET", f"/api/files/patient/{s.claims['patient_id']}")
+    if files:
+        s.call("files/download", "GET", f"/api/files/download/{s.rng.choice(files)['FileID']}")
+
+
+def doctor_flow(s, accounts):
+    if not s.login(f"doctor{s.rng.randint(1, accounts['doctor'])}"):
+        return
+    s.call("dashboard", "GET", "/api/dashboard/stats")
+    s.call("records/all", "GET", "/api/records/all")
+    s.call("patients", "GET", "/api/patients")
+    visit = s.call("visits/create", "POST", "/api/visits", json={
+        "patient_id": s.rng.randint(1, accounts["patients"]), "doctor_id": s.claims["doctor_id"],
+        "reason": "Follow-up", "vital_signs": "BP 120/80", "status": "Completed"})
+    if not visit:
+        return
+    s.call("diagnosis/create", "POST", "/api/diagnosis", json={
+        "visit_id": visit["visit_id"], "name": s.rng.choice(datagen.ACUTE_DIAGNOSES), "severity": "Mild"})
+    for _ in range(s.rng.randint(1, 3)):
+        medicine, dosage = s.rng.choice(datagen.MEDICINES)
+        s.call("prescriptions/create", "POST", "/api/prescriptions", json={
+            "visit_id": visit["visit_id"], "medicine": medicine, "dosage": dosage,
+            "frequency": "Twice daily", "duration": "5 days"})
+
+
+def pharmacist_flow(s, accounts):
+    if not s.login(f"pharmacist{s.rng.randint(1, accounts['pharmacist'])}"):
+        return
+    s.call("dashboard", "GET", "/api/dashboard/stats")
+    pending = s.call("prescriptions/pending", "GET", "/api/prescriptions?pending=1")
+    for prescription in s.rng.sample(pending, min(len(pending), 3)) if pending else []:
+        s.call("prescriptions/dispense", "POST", f"/api/prescriptions/{prescription['PrescriptionID']}/dispense")
+
+
+def admin_flow(s, accounts):
+    if not s.login("admin"):
+        return
+    s.call("dashboard", "GET", "/api/dashboard/stats")
+    seed_value = s.rng.getrandbits(32)
+    out = io.StringIO()
+    writer = csv.writer(out)
+    writer.writerow(datagen.IMPORT_COLUMNS)
+    writer.writerows(datagen.import_records(accounts["import_rows"], seed_value=seed_value))
+    s.call("admin/import", "POST", "/api/admin/import-patients",
+           files={"file": (f"import_{seed_value}.csv", out.getvalue().encode())})
+
+
+FLOWS = {"patient": patient_flow, "doctor": doctor_flow, "pharmacist": pharmacist_flow, "admin": admin_flow}
+
+
+def parse_mix(text):
+    mix = {}
+    for part in text.split(","):
+        role, _, weight = part.partition("=")
+        if role.strip() not in FLOWS:
+            raise argparse.ArgumentTypeError(f"unknown role {role!r}; expected one of {', '.join(FLOWS)}")
+        mix[role.strip()] = float(weight)
+    return mix
+
+
+def run(transport, mix, accounts, rate, duration, workers, think, seed_value):
+    """
+    Starts sessions at Poisson arrival times for `duration` seconds, then
+    waits for them to finish. Returns the StepStats summary.
+    """
+    rng = random.Random(seed_value)
+    roles, weights = list(mix), list(mix.values())
+    stats = StepStats()
+
+    def session(role, scheduled, session_seed):
+        stats.record_queue_delay(time.perf_counter() - scheduled)
+        FLOWS[role](Session(transport, stats, random.Random(session_seed), think), accounts)
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        next_arrival = started
+        while next_arrival - started < duration:
+            delay = next_arrival - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            pool.submit(session, rng.choices(roles, weights)[0], next_arrival, rng.getrandbits(32))
+            next_arrival += rng.expovariate(rate)
+    return stats.summary(time.perf_counter() - started)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    target = parser.add_mutually_exclusive_group(required=True)
+    target.add_argument("--url", help="base URL of a running server seeded by tools.datagen")
+    target.add_argument("--local", action="store_true", help="seed a temporary database and serve it locally")
+    parser.add_argument("--mix", type=parse_mix, default=parse_mix("patient=60,doctor=30,pharmacist=9,admin=1"),
+                        help="role weights")
+    parser.add_argument("--rate", type=float, default=10, help="session arrivals per second")
+    parser.add_argument("--duration", type=float, default=30, help="seconds to keep starting sessions")
+    parser.add_argument("--workers", type=int, default=32, help="concurrent sessions")
+    parser.add_argument("--think", type=float, default=0.0, help="mean pause between a session's steps (s)")
+    parser.add_argument("--import-rows", type=int, default=50, help="rows per admin import")
+    parser.add_argument("--patients", type=int, default=2000)
+    parser.add_argument("--doctors", type=int, default=20)
+    parser.add_argument("--pharmacists", type=int, default=2)
+    parser.add_argument("--patient-accounts", type=int, default=None, help="default: --patients")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--out", default=None, help="write the JSON report here as well")
+    # Only used with --local, to seed the database the way tools.bench does
+    parser.add_argument("--visits-per-patient", type=float, default=3, help=argparse.SUPPRESS)
+    parser.add_argument("--prescriptions-per-visit", type=float, default=1, help=argparse.SUPPRESS)
+    parser.add_argument("--files-per-patient", type=float, default=1, help=argparse.SUPPRESS)
+    parser.add_argument("--trace", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--keep-limits", action="store_true", help="with --local, leave rate limiting and shedding on")
+    args = parser.parse_args()
+
+    accounts = {"patient": args.patient_accounts or args.patients, "patients": args.patients,
+                "doctor": args.doctors, "pharmacist": args.pharmacists, "import_rows": args.import_rows}
+    out = os.path.abspath(args.out) if args.out else None
+
+    workdir = server = None
+    if args.local:
+        from werkzeug.serving import make_server
+        workdir = tempfile.TemporaryDirectory(prefix="hms-loadgen-")
+        hospital, counts, _ = prepare_app(workdir.name, args)
+        accounts.update(patient=counts["Patients"], patients=counts["Patients"], pharmacist=counts["Pharmacists"])
+        logging.getLogger("werkzeug").setLevel(logging.WARNING)
+        server = make_server("127.0.0.1", 0, hospital.app, threaded=True)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        transport = HTTPTransport("127.0.0.1", server.server_port)
+    else:
+        url = urllib.parse.urlsplit(args.url)
+        transport = HTTPTransport(url.hostname, url.port or 80)
+
+    report = run(transport, args.mix, accounts, args.rate, args.duration, args.workers, args.think, args.seed)
+    report["meta"] = {"timestamp": datetime.datetime.now().isoformat(timespec="seconds"),
+                      "mix": args.mix, "rate": args.rate, "duration": args.duration, "workers": args.workers}
+
+    if server is not None:
+        server.shutdown()
+        hospital.write_behind.shutdown()
+        os.chdir(ROOT)
+        workdir.cleanup()
+
+    for step, s in report["steps"].items():
+        print(f"{step:25} {s['requests']:>7} req  {s['throughput_rps']:>8.1f} req/s  p50 {s['p50_ms']:>8.2f}ms  "
+              f"p95 {s['p95_ms']:>8.2f}ms  p99 {s['p99_ms']:>8.2f}ms  errors {s['error_rate']:.1%}")
+    print(f"{report['sessions']} sessions, queue delay p95 {report['queue_delay_p95_ms']:.2f}ms")
+    if out:
+        os.makedirs(os.path.dirname(out), exist_ok=True)
+        with open(out, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"Report written to {out}")
+
+
+if __name__ == "__main__":
+    main()
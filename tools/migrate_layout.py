@@ -0,0 +1,217 @@
+"""
+Moves uploads into the sharded on-disk layout while the API keeps running.
+
+    python -m tools.migrate_layout
+    python -m tools.migrate_layout --sqlite hospital.db --batch-size 200 --pause 0.5
+
+Medical files end up in the blob store, uploads/medical_files/ab/cd/<sha256>.
+Blobs that were stored flat are moved there. Per-upload copies from before
+the blob store are hashed and become blob references like a new upload.
+Each row's FilePath (and ContentHash) is rewritten in its own transaction,
+only once the file is at the new path, and the old file is removed only
+when no row refers to it any more, so every file stays downloadable
+throughout; workers holding a cached old path look it up again.
+
+Patient import files, which no row refers to, are renamed into
+uploads/patient_imports/ab/cd/<name>, sharded by content hash.
+
+Rows are read in FileID order, a batch at a time with a pause in between,
+and rows already in the layout are skipped, so the command can be stopped
+and run again at any point.
+"""
+import argparse
+import hashlib
+import os
+import shutil
+import sqlite3
+import sys
+import time
+import uuid
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import migrations  # noqa: E402
+from blobstore import BlobStore  # noqa: E402
+from uploads import sharded_path  # noqa: E402
+
+# One batch of MedicalFiles rows after a FileID, in FileID order
+_BATCH_SQL = {
+    "sqlite": "SELECT FileID, FilePath, ContentHash FROM MedicalFiles WHERE FileID > ? ORDER BY FileID LIMIT ?",
+    "mssql": "SELECT FileID, FilePath, ContentHash FROM MedicalFiles WHERE FileID > ? ORDER BY FileID "
+             "OFFSET 0 ROWS FETCH NEXT ? ROWS ONLY",
+}
+
+
+def file_sha256(path):
+    sha256 = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            sha256.update(chunk)
+    return sha256.hexdigest()
+
+
+def same_path(a, b):
+    # Not os.path.samefile: the hard links made below must still count as two paths
+    return os.path.realpath(a) == os.path.realpath(b)
+
+
+def link_into_place(source, destination):
+    """
+    Makes `source` also reachable at `destination`: a hard link where the
+    filesystem allows it, else a copy renamed into place once complete.
+    Returns False if `destination` already existed.
+    """
+    os.makedirs(os.path.dirname(destination), exist_ok=True)
+    try:
+        os.link(source, destination)
+        return True
+    except FileExistsError:
+        return False
+    except OSError:
+        pass
+    temp = f"{destination}.{uuid.uuid4().hex}.tmp"
+    shutil.copyfile(source, temp)
+    os.replace(temp, destination)
+    return True
+
+
+def remove_if_unreferenced(conn, path, keep):
+    if same_path(path, keep):
+        return False
+    cur = conn.cursor()
+    try:
+        cur.execute("SELECT COUNT(*) FROM MedicalFiles WHERE FilePath = ?", path)
+        if cur.fetchone()[0]:
+            return False
+    finally:
+        cur.close()
+    try:
+        os.remove(path)
+    except OSError:
+        return False  # gone already, or open for a download on Windows; left behind
+    return True
+
+
+def migrate_medical_file(conn, store, file_id, path, content_hash):
+    """
+    Moves one MedicalFiles row's file into the blob store. Returns
+    'skipped', 'missing', 'raced' (the row changed meanwhile) or 'moved'.
+    """
+    if content_hash and same_path(path, store.path(content_hash)):
+        return "skipped"
+    if not os.path.exists(path):
+        return "missing"
+
+    legacy = not content_hash
+    if legacy:
+        content_hash = file_sha256(path)
+    target = store.path(content_hash)
+    linked = False
+    if same_path(path, target):
+        legacy = False  # already in place, only the row lacks the hash
+    elif not os.path.exists(target):
+        linked = link_into_place(path, target)
+
+    cur = conn.cursor()
+    try:
+        if legacy:
+            store.acquire(cur, content_hash, os.path.getsize(path))
+        cur.execute("UPDATE MedicalFiles SET FilePath = ?, ContentHash = ? WHERE FileID = ? AND FilePath = ?",
+                    (target, content_hash, file_id, path))
+        if cur.rowcount != 1:
+            conn.rollback()
+            if linked:
+                # The row was deleted or moved meanwhile; drop the copy unless an upload now owns the blob
+                cur.execute("SELECT COUNT(*) FROM FileBlobs WHERE ContentHash = ?", content_hash)
+                if not cur.fetchone()[0]:
+                    os.remove(target)
+            return "raced"
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cur.close()
+
+    # The collector may have taken an unreferenced blob between the link and the commit
+    if not os.path.exists(target):
+        link_into_place(path, target)
+    remove_if_unreferenced(conn, path, target)
+    return "moved"
+
+
+def migrate_medical_files(conn, backend, store, batch_size, pause):
+    counts = {"skipped": 0, "missing": 0, "raced": 0, "moved": 0}
+    last_id = 0
+    while True:
+        cur = conn.cursor()
+        try:
+            cur.execute(_BATCH_SQL[backend], (last_id, batch_size))
+            rows = cur.fetchall()
+        finally:
+            cur.close()
+        if not rows:
+            break
+
+        for file_id, path, content_hash in rows:
+            counts[migrate_medical_file(conn, store, file_id, path, content_hash)] += 1
+            last_id = file_id
+        print(f"medical_files: up to FileID {last_id}, "
+              + ", ".join(f"{count} {state}" for state, count in counts.items()))
+        time.sleep(pause)
+    return counts
+
+
+def migrate_imports(folder, batch_size, pause):
+    """
+    Renames the flat files in `folder` into content-hash shards.
+    """
+    moved = 0
+    while True:
+        with os.scandir(folder) as entries:
+            batch = [entry.path for entry in entries if entry.is_file()][:batch_size]
+        if not batch:
+            break
+        for path in batch:
+            destination = sharded_path(folder, file_sha256(path), os.path.basename(path))
+            os.makedirs(os.path.dirname(destination), exist_ok=True)
+            os.replace(path, destination)
+            moved += 1
+        print(f"patient_imports: {moved} moved")
+        time.sleep(pause)
+    return moved
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sqlite", help="SQLite database file (default: the SQL Server database in db.py)")
+    parser.add_argument("--upload-folder", default="uploads", help="the API's UPLOAD_FOLDER")
+    parser.add_argument("--batch-size", type=int, default=500)
+    parser.add_argument("--pause", type=float, default=0.1, help="seconds between batches")
+    args = parser.parse_args()
+
+    if args.sqlite:
+        import sqlite_backend
+        backend, conn = "sqlite", sqlite_backend.connect(args.sqlite)
+        integrity_errors = (sqlite3.IntegrityError,)
+    else:
+        import db
+        import pyodbc
+        backend, conn = "mssql", db.get_db_connection()
+        integrity_errors = (pyodbc.IntegrityError,)
+
+    try:
+        migrations.check(conn, backend)
+        store = BlobStore(os.path.join(args.upload_folder, "medical_files"), integrity_errors=integrity_errors)
+        counts = migrate_medical_files(conn, backend, store, args.batch_size, args.pause)
+        moved = migrate_imports(os.path.join(args.upload_folder, "patient_imports"), args.batch_size, args.pause)
+    finally:
+        conn.close()
+
+    print(f"Done: {counts['moved']} medical file(s) and {moved} import file(s) moved, "
+          f"{counts['missing']} row(s) whose file is missing")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,203 @@
+"""
+Checks the query plan of every SQL statement the API issues.
+
+    python -m tools.query_plans
+    python -m tools.query_plans --verbose
+    python -m tools.query_plans --mssql "DRIVER=...;SERVER=...;DATABASE=..."
+
+Statements are captured by driving every route once (the tools.bench
+scenarios) against a seeded SQLite database, with their real parameters.
+Each one is then explained, with EXPLAIN QUERY PLAN on that database or the
+SQL Server showplan when --mssql is given. A statement on a hot route fails
+the check if its plan scans a whole table or sorts into a temporary
+structure, unless EXPECTED lists that as intended. Exits 1 on failure;
+tests can call run_checks() and assert the result is empty.
+"""
+import argparse
+import os
+import re
+import sys
+import tempfile
+import xml.etree.ElementTree as ET
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from tools.bench import TestClientTransport, build_scenarios, prepare_app  # noqa: E402
+
+# Admin and diagnostics routes, run rarely enough that scans are acceptable
+COLD_ROUTES = {
+    "POST /api/admin/import-patients",
+    "POST /api/admin/users/<int:uid>/deactivate",
+    "GET /api/admin/profiles",
+    "GET /api/admin/profiles/<name>",
+    "GET /api/admin/profiles/samples",
+    "GET /metrics",
+}
+
+# (route, table or alias as the plan names it) -> why a full scan there is by design;
+# table None covers temp sorts
+EXPECTED = {
+    ("GET /api/dashboard/stats", "Patients"): "counts every active patient",
+    ("GET /api/dashboard/stats", "Doctors"): "counts every active doctor",
+    ("GET /api/dashboard/stats", "LabTests"): "not written by the API, stays small",
+    ("GET /api/dashboard/stats", "vw_DashboardStats"): "the view's single computed row",
+    ("GET /api/doctors", "Doctors"): "staff-sized table, listed in full",
+    ("GET /api/doctors", None): "staff-sized table, listed in full",
+    ("GET /api/patients", "Patients"): "lists every active patient",
+}
+
+_SQLITE_SCAN = re.compile(r"^SCAN (?:TABLE )?(\w+)(?: AS \w+)?$")
+_SQLITE_TEMP = re.compile(r"USE TEMP B-TREE FOR (.+)$")
+_SHOWPLAN_NS = "{http://schemas.microsoft.com/sqlserver/2004/07/showplan}"
+_MSSQL_PROBLEMS = {"Table Scan", "Clustered Index Scan", "Index Scan", "Sort"}
+
+
+class StatementCapture:
+    """
+    DB listener that keeps the first execution of each statement per route.
+    """
+
+    def __init__(self):
+        self.statements = {}  # (route, sql) -> params
+
+    def on_execute(self, sql, params, elapsed, many):
+        from flask import has_request_context, request
+        if many or not has_request_context() or request.url_rule is None:
+            return
+        if len(params) == 1 and isinstance(params[0], (list, tuple)):
+            params = params[0]
+        self.statements.setdefault((f"{request.method} {request.url_rule.rule}", sql), tuple(params))
+
+    def on_fetch(self, rows, elapsed):
+        pass
+
+
+def capture_statements(hospital, counts, tokens):
+    """
+    Runs every bench scenario once and returns {(route, sql): params}.
+    """
+    capture = StatementCapture()
+    hospital.db_listeners.append(capture)
+    try:
+        transport = TestClientTransport(hospital.app)
+        for _, make_request in build_scenarios(hospital, counts, tokens):
+            transport.send(make_request(0))
+    finally:
+        hospital.db_listeners.remove(capture)
+    return capture.statements
+
+
+def explain_sqlite(conn, sql, params):
+    """
+    Returns [(table or None, problem)] for one statement on SQLite, plus the
+    raw plan lines.
+    """
+    import sqlite_backend
+    cur = conn.cursor()
+    try:
+        cur.execute("EXPLAIN QUERY PLAN " + sqlite_backend.translate(sql), params)
+        plan = [row[3] for row in cur.fetchall()]
+    finally:
+        cur.close()
+
+    problems = []
+    for line in plan:
+        scan = _SQLITE_SCAN.match(line)
+        if scan:
+            problems.append((scan.group(1), "full table scan"))
+        temp = _SQLITE_TEMP.search(line)
+        if temp:
+            problems.append((None, f"temp sort ({temp.group(1)})"))
+    return problems, plan
+
+
+def explain_mssql(conn, sql, params):
+    """
+    Same as explain_sqlite() using SET SHOWPLAN_XML on SQL Server; the
+    statement is compiled, not executed.
+    """
+    cur = conn.cursor()
+    try:
+        cur.execute("SET SHOWPLAN_XML ON")
+        cur.execute(sql, params)
+        xml = "".join(row[0] for row in cur.fetchall())
+        cur.execute("SET SHOWPLAN_XML OFF")
+    finally:
+        cur.close()
+
+    problems, plan = [], []
+    for op in ET.fromstring(xml).iter(f"{_SHOWPLAN_NS}RelOp"):
+        physical = op.get("PhysicalOp")
+        objects = [o.get("Table", "").strip("[]") for o in op.iter(f"{_SHOWPLAN_NS}Object")]
+        table = objects[0] if objects and physical != "Sort" else None
+        plan.append(f"{physical} {table or ''}".strip())
+        if physical in _MSSQL_PROBLEMS:
+            problems.append((table, "temp sort" if physical == "Sort" else physical.lower()))
+    return problems, plan
+
+
+def check(statements, explain, expected=EXPECTED, cold_routes=COLD_ROUTES, verbose=False):
+    """
+    Returns human-readable failures for hot-route statements.
+    """
+    failures = []
+    for (route, sql), params in sorted(statements.items()):
+        problems, plan = explain(sql, params)
+        if verbose:
+            print(f"{route}\n  {' '.join(sql.split())}\n" + "".join(f"    {line}\n" for line in plan))
+        if route in cold_routes:
+            continue
+        for table, problem in problems:
+            if (route, table) in expected:
+                continue
+            failures.append(f"{route}: {problem}{f' on {table}' if table else ''} in: {' '.join(sql.split())}")
+    return failures
+
+
+def run_checks(patients=200, mssql=None, verbose=False):
+    """
+    Seeds a temporary database, captures the API's statements and returns
+    the list of plan failures (empty when everything is indexed).
+    """
+    args = argparse.Namespace(patients=patients, doctors=10, visits_per_patient=3, prescriptions_per_visit=1,
+                              files_per_patient=1, seed=42, trace=False, keep_limits=False)
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory(prefix="hms-plans-") as workdir:
+        try:
+            hospital, counts, tokens = prepare_app(workdir, args)
+            statements = capture_statements(hospital, counts, tokens)
+            hospital.write_behind.flush()
+
+            if mssql:
+                import pyodbc
+                conn = pyodbc.connect(mssql)
+                explain = lambda sql, params: explain_mssql(conn, sql, params)  # noqa: E731
+            else:
+                conn = hospital.get_db_connection()
+                explain = lambda sql, params: explain_sqlite(conn, sql, params)  # noqa: E731
+            try:
+                return check(statements, explain, verbose=verbose)
+            finally:
+                conn.close()
+        finally:
+            os.chdir(cwd)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--patients", type=int, default=200, help="size of the seeded SQLite database")
+    parser.add_argument("--mssql", help="explain on this SQL Server database instead of SQLite")
+    parser.add_argument("--verbose", action="store_true", help="print every statement's plan")
+    args = parser.parse_args()
+
+    failures = run_checks(args.patients, args.mssql, args.verbose)
+    for line in failures:
+        print(f"PLAN {line}")
+    if failures:
+        sys.exit(1)
+    print("All hot-path statements use indexes")
+
+
+if __name__ == "__main__":
+    main()
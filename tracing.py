@@ -0,0 +1,302 @@
+import atexit
+import contextvars
+import json
+import os
+import queue
+import re
+import secrets
+import threading
+import time
+import urllib.request
+
+from sqltrace import normalize_sql
+
+SPAN_KIND_INTERNAL = 1
+SPAN_KIND_SERVER = 2
+
+_TRACEPARENT = re.compile(r"^00-([0-9a-f]{32})-([0-9a-f]{16})-([0-9a-f]{2})$")
+_current_span = contextvars.ContextVar("current_span", default=None)
+
+
+def parse_traceparent(header):
+    """
+    Returns (trace_id, parent_span_id, trace_flags) from a W3C traceparent
+    header, or None if it is missing or malformed.
+    """
+    match = _TRACEPARENT.match((header or "").strip().lower())
+    if not match or match.group(1) == "0" * 32 or match.group(2) == "0" * 16:
+        return None
+    return match.group(1), match.group(2), match.group(3)
+
+
+class Span:
+    __slots__ = ("name", "kind", "trace_id", "span_id", "parent_id", "flags", "start_ns", "end_ns",
+                 "attributes", "error")
+
+    def __init__(self, name, trace_id, parent_id=None, kind=SPAN_KIND_INTERNAL, attributes=None,
+                 start_ns=None, flags="01"):
+        self.name = name
+        self.kind = kind
+        self.trace_id = trace_id
+        self.span_id = secrets.token_hex(8)
+        self.parent_id = parent_id
+        self.flags = flags  # the caller's sampling decision, passed on unchanged
+        self.start_ns = start_ns or time.time_ns()
+        self.end_ns = None
+        self.attributes = attributes or {}
+        self.error = False
+
+    def traceparent(self):
+        return f"00-{self.trace_id}-{self.span_id}-{self.flags}"
+
+    def to_otlp(self):
+        span = {
+            "traceId": self.trace_id,
+            "spanId": self.span_id,
+            "name": self.name,
+            "kind": self.kind,
+            "startTimeUnixNano": str(self.start_ns),
+            "endTimeUnixNano": str(self.end_ns),
+            "attributes": [_otlp_attribute(k, v) for k, v in self.attributes.items()],
+            "status": {"code": 2 if self.error else 1},
+        }
+        if self.parent_id:
+            span["parentSpanId"] = self.parent_id
+        return span
+
+
+def _otlp_attribute(key, value):
+    if isinstance(value, bool):
+        return {"key": key, "value": {"boolValue": value}}
+    if isinstance(value, int):
+        return {"key": key, "value": {"intValue": str(value)}}
+    if isinstance(value, float):
+        return {"key": key, "value": {"doubleValue": value}}
+    return {"key": key, "value": {"stringValue": str(value)}}
+
+
+def otlp_document(service_name, spans):
+    """
+    Wraps spans in an OTLP/JSON ExportTraceServiceRequest.
+    """
+    return {"resourceSpans": [{
+        "resource": {"attributes": [_otlp_attribute("service.name", service_name)]},
+        "scopeSpans": [{"scope": {"name": service_name}, "spans": [s.to_otlp() for s in spans]}],
+    }]}
+
+
+class FileSpanExporter:
+    """
+    Appends one OTLP/JSON document per batch to a local file, the same
+    layout the OpenTelemetry collector's file exporter uses. Once the file
+    passes `max_bytes` it is renamed to <path>.1, replacing the previous
+    one, so at most about twice that is kept on disk.
+    """
+
+    def __init__(self, path, service_name, max_bytes=100 * 1024 * 1024):
+        self.path = path
+        self.service_name = service_name
+        self.max_bytes = max_bytes
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    def export(self, spans):
+        line = json.dumps(otlp_document(self.service_name, spans), separators=(",", ":"))
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write(line + "\n")
+            size = f.tell()
+        if size > self.max_bytes:
+            os.replace(self.path, f"{self.path}.1")
+
+
+class OTLPHttpExporter:
+    """
+    POSTs batches to an OTLP/HTTP JSON endpoint such as
+    http://localhost:4318/v1/traces.
+    """
+
+    def __init__(self, endpoint, service_name, timeout=5):
+        self.endpoint = endpoint
+        self.service_name = service_name
+        self.timeout = timeout
+
+    def export(self, spans):
+        body = json.dumps(otlp_document(self.service_name, spans)).encode()
+        req = urllib.request.Request(self.endpoint, data=body, method="POST",
+                                     headers={"Content-Type": "application/json"})
+        with urllib.request.urlopen(req, timeout=self.timeout):
+            pass
+
+
+class Tracer:
+    """
+    Creates spans and hands finished ones to a background thread that
+    exports them in batches. When the queue is full, spans are dropped
+    rather than slowing requests down. Spans still queued at exit are
+    exported by shutdown().
+    """
+
+    def __init__(self, exporter, batch_size=512, flush_interval=2.0, max_queue=8192):
+        self.exporter = exporter
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.dropped = 0
+        self._queue = queue.Queue(max_queue)
+        self._stopped = threading.Event()
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def current_span(self):
+        return _current_span.get()
+
+    def start_span(self, name, kind=SPAN_KIND_INTERNAL, attributes=None, traceparent=None, start_ns=None):
+        """
+        Starts a child of the current span, or a root span continuing
+        `traceparent` (or a new trace) when there is none.
+        """
+        parent = _current_span.get()
+        if parent is not None:
+            trace_id, parent_id, flags = parent.trace_id, parent.span_id, parent.flags
+        else:
+            trace_id, parent_id, flags = parse_traceparent(traceparent) or (secrets.token_hex(16), None, "01")
+        return Span(name, trace_id, parent_id, kind, attributes, start_ns, flags)
+
+    def activate(self, span):
+        """
+        Makes `span` the current span; returns a token for deactivate().
+        """
+        return _current_span.set(span)
+
+    def deactivate(self, token):
+        _current_span.reset(token)
+
+    def span(self, name, **attributes):
+        """
+        Context manager for a child span of the current span. Outside a
+        trace it does nothing and yields None.
+        """
+        return _ActiveSpan(self, name, attributes)
+
+    def record(self, name, elapsed, attributes=None):
+        """
+        Records an already finished child span that took `elapsed` seconds
+        and ended just now. Does nothing outside a trace.
+        """
+        if _current_span.get() is None:
+            return
+        end_ns = time.time_ns()
+        span = self.start_span(name, attributes=attributes, start_ns=end_ns - int(elapsed * 1e9))
+        self.finish(span, end_ns)
+
+    def finish(self, span, end_ns=None):
+        span.end_ns = end_ns or time.time_ns()
+        self._ensure_started()
+        try:
+            self._queue.put_nowait(span)
+        except queue.Full:
+            self.dropped += 1
+
+    def shutdown(self):
+        """
+        Stops the exporter thread and exports whatever is still queued.
+        """
+        self._stopped.set()
+        thread = self._thread
+        if thread is not None:
+            try:
+                self._queue.put_nowait(None)  # wakes the thread; a full queue means it is not waiting
+            except queue.Full:
+                pass
+            thread.join(self.flush_interval + 5)
+        while True:
+            batch = []
+            while len(batch) < self.batch_size:
+                try:
+                    span = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if span is not None:
+                    batch.append(span)
+            if not batch:
+                return
+            self._export(batch)
+
+    def _ensure_started(self):
+        if self._thread is not None:
+            return
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="span-exporter", daemon=True)
+                self._thread.start()
+                atexit.register(self.shutdown)
+
+    def _run(self):
+        while not self._stopped.is_set():
+            batch = []
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.batch_size:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    span = self._queue.get(timeout=timeout)
+                except queue.Empty:
+                    break
+                if span is None:
+                    break
+                batch.append(span)
+            if batch:
+                self._export(batch)
+
+    def _export(self, batch):
+        try:
+            self.exporter.export(batch)
+        except Exception as e:
+            print(f"Span export failed ({len(batch)} spans): {e}")
+
+
+class _ActiveSpan:
+    def __init__(self, tracer, name, attributes):
+        self.tracer = tracer
+        self.name = name
+        self.attributes = attributes
+
+    def __enter__(self):
+        if self.tracer.current_span() is None:
+            self.span = None
+            return None
+        self.span = self.tracer.start_span(self.name, attributes=self.attributes)
+        self.token = self.tracer.activate(self.span)
+        return self.span
+
+    def __exit__(self, exc_type, exc, tb):
+        if self.span is None:
+            return False
+        self.tracer.deactivate(self.token)
+        if exc_type is not None:
+            self.span.error = True
+            self.span.attributes["exception.type"] = exc_type.__name__
+        self.tracer.finish(self.span)
+        return False
+
+
+class TraceListener:
+    """
+    DB listener that records a span per statement and per fetch.
+    """
+
+    def __init__(self, tracer, db_system="mssql"):
+        self.tracer = tracer
+        self.db_system = db_system
+
+    def on_execute(self, sql, params, elapsed, many):
+        if self.tracer.current_span() is None:
+            return
+        attributes = {"db.system": self.db_system, "db.statement": normalize_sql(sql)}
+        if many and isinstance(params, (list, tuple)):
+            attributes["db.batch_size"] = len(params)
+        self.tracer.record("db.execute", elapsed, attributes)
+
+    def on_fetch(self, rows, elapsed):
+        self.tracer.record("db.fetch", elapsed, {"db.rows": rows})
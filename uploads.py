@@ -0,0 +1,93 @@
+import hashlib
+import os
+import uuid
+
+from flask import Request, current_app
+
+
+class HashingFile:
+    """
+    Spool target for one multipart file part: a file in the incoming
+    folder, next to its final location, that hashes and counts bytes as
+    werkzeug writes them. commit() renames it into place, so the upload is
+    written to disk exactly once; uncommitted parts are deleted on close.
+    """
+
+    def __init__(self, directory):
+        os.makedirs(directory, exist_ok=True)
+        self.path = os.path.join(directory, f"{uuid.uuid4().hex}.part")
+        self.size = 0
+        self._sha256 = hashlib.sha256()
+        self._file = open(self.path, "w+b")
+        self._committed = False
+
+    def write(self, data):
+        self._sha256.update(data)
+        self.size += len(data)
+        return self._file.write(data)
+
+    def hexdigest(self):
+        return self._sha256.hexdigest()
+
+    def commit(self, destination):
+        self._file.close()
+        os.makedirs(os.path.dirname(destination), exist_ok=True)
+        os.replace(self.path, destination)
+        self.path = destination
+        self._committed = True
+
+    def close(self):
+        self._file.close()
+        if not self._committed and os.path.exists(self.path):
+            os.remove(self.path)
+
+    def __getattr__(self, name):
+        # read/seek/tell/flush for werkzeug and FileStorage
+        return getattr(self._file, name)
+
+
+def _incoming_folder():
+    return os.path.join(current_app.config['UPLOAD_FOLDER'], 'incoming')
+
+
+class StreamingUploadRequest(Request):
+    """
+    Request class whose multipart file parts are streamed into HashingFile
+    spools under UPLOAD_FOLDER/incoming instead of a system temp file.
+    """
+
+    def _get_file_stream(self, total_content_length, content_type, filename=None, content_length=None):
+        spool = HashingFile(_incoming_folder())
+        # Tracked here too: a part that fails mid-parse never reaches request.files
+        self.__dict__.setdefault("_spools", []).append(spool)
+        return spool
+
+    def close(self):
+        super().close()
+        for spool in self.__dict__.pop("_spools", []):
+            spool.close()
+
+
+def sharded_path(root, key, name=None):
+    """
+    <root>/<key[:2]>/<key[2:4]>/<name or key>. Keyed by a hex digest that is
+    65,536 directories, so none grows past a few hundred entries even with
+    tens of millions of files.
+    """
+    return os.path.join(root, key[:2], key[2:4], name or key)
+
+
+def spool_upload(file):
+    """
+    Returns the uploaded FileStorage's bytes as a HashingFile, whose size
+    and hexdigest() are known before the file is put anywhere. Streams
+    from other sources are copied into a new spool.
+    """
+    stream = file.stream
+    if isinstance(stream, HashingFile):
+        return stream
+
+    spool = HashingFile(_incoming_folder())
+    for chunk in iter(lambda: stream.read(1024 * 1024), b""):
+        spool.write(chunk)
+    return spool